@@ -0,0 +1,408 @@
+# ─────────────────────────────────────────────────────────────────────────────
+# Planner semanal/mensual/anual con categorías, recurrencias, prioridades,
+# sugerencias de horario (heurística) y tema oscuro con switch (esta raro).
+#
+# Punto de entrada Streamlit: toda la lógica vive en el paquete calendario.
+#   streamlit run app.py
+#
+# Requisitos:
+#   pip install -r requirements.txt
+# ─────────────────────────────────────────────────────────────────────────────
+
+import io
+import uuid
+import calendar
+from datetime import datetime, date, time, timedelta
+
+import pandas as pd
+import streamlit as st
+
+from calendario import (MATERIALIZE_OCCURRENCES, WEEKDAYS_ES, init_db, ensure_user, list_categories,
+                        upsert_category, delete_category, add_event_punctual, add_event_recurring,
+                        add_events_bulk, delete_event, list_events_raw, get_priorities, upsert_priorities,
+                        week_start, next_occurrences, expand_events_for_range, expand_events_for_week, rebuild_occurrences,
+                        suggest_slots, plan_batch, find_conflicts, iter_ics, iter_csv, import_calendar,
+                        occurrences_frame, occurrences_from_frame, daily_load, month_css, month_html, year_html,
+                        year_heatmap_figure, week_timeline_figure, profile_rerun, timed, prefetch_week,
+                        prefetch_month)
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Config UI y Tema
+# ─────────────────────────────────────────────────────────────────────────────
+def inject_dark_css(dark: bool):
+    if not dark:
+        return
+    st.markdown("""
+    <style>
+      :root, .stApp { background-color: #0e1117 !important; color: #e8eaed !important; }
+      .stMarkdown, .stText, .stRadio, .stSelectbox, .stDateInput, .stTimeInput, .stNumberInput, .stButton {
+          color: #e8eaed !important;
+      }
+      .st-bh, .st-bk, .st-bq { background: #161a23 !important; }
+      .stAlert, .stDataFrame { background: #161a23 !important; }
+      .stButton>button { background:#1f6feb; color:white; border-radius:8px; }
+    </style>
+    """, unsafe_allow_html=True)
+
+@timed("render.month_grid")
+def render_month_grid(user_id: str, focus: date, dark: bool):
+    st.markdown(month_css(dark) + month_html(user_id, focus.year, focus.month), unsafe_allow_html=True)
+
+@timed("render.year_grid")
+def render_year_grid(user_id: str, year: int, dark: bool):
+    st.markdown(month_css(dark) + year_html(user_id, year), unsafe_allow_html=True)
+
+def render_conflicts(user_id: str, row: dict):
+    conflicts = find_conflicts(user_id, row)
+    if not conflicts:
+        return
+    lines = [f"Se solapa con {len(conflicts)} actividad(es):"]
+    for c in conflicts[:10]:
+        extra = f" (y {c['count'] - 1} fecha(s) más)" if c["count"] > 1 else ""
+        lines.append(f"- {c['title']} {'[REC] ' if c['recurring'] else ''}• {c['date'].isoformat()} "
+                     f"{c['start_time']}–{c['end_time']}{extra}")
+    if len(conflicts) > 10:
+        lines.append(f"- … y {len(conflicts) - 10} más")
+    st.warning("\n".join(lines))
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Interfaz (Streamlit)
+# ─────────────────────────────────────────────────────────────────────────────
+def render_debug_panel(panel, rec: dict):
+    with panel.expander("🐞 Perfil del último rerun", expanded=False):
+        st.caption(f"{rec['total_ms']:.1f} ms • {rec['queries']} consultas • ~{rec['vm_steps']} pasos SQLite • "
+                   f"caché {rec['cache']['hits']}/{rec['cache']['hits'] + rec['cache']['misses']}")
+        if rec["stages"]:
+            st.dataframe(pd.DataFrame([{"Etapa": k, "ms": v["ms"], "Llamadas": v["calls"], "Filas/ocurr.": v["items"]}
+                                       for k, v in rec["stages"].items()]),
+                         hide_index=True, use_container_width=True)
+        st.caption("Las etapas se anidan: sus ms no se suman entre sí.")
+
+def page():
+    # Toggle de tema oscuro
+    if "dark_mode" not in st.session_state:
+        st.session_state.dark_mode = False
+    st.session_state.dark_mode = st.sidebar.toggle("🌙 Tema oscuro", value=st.session_state.dark_mode)
+    inject_dark_css(st.session_state.dark_mode)
+    PLOTLY_TEMPLATE = "plotly_dark" if st.session_state.dark_mode else "plotly"
+
+    # ─────────────────────────────────────────────────────────────────────────
+    # Sidebar: Usuario y semana
+    # ─────────────────────────────────────────────────────────────────────────
+    init_db()
+    user_id = st.sidebar.text_input("Usuario (ID único):")
+    if not user_id:
+        st.info("🔐 Escribe tu usuario en la barra lateral para empezar.")
+        st.stop()
+    ensure_user(user_id)
+
+    today = date.today()
+    sel_date = st.sidebar.date_input("Semana de (elige un día):", today)
+    wk0 = week_start(sel_date)
+    st.sidebar.caption(f"Semana: {wk0.isoformat()} → {(wk0 + timedelta(days=6)).isoformat()}")
+
+    # ─────────────────────────────────────────────────────────────────────────
+    # Categorías
+    # ─────────────────────────────────────────────────────────────────────────
+    st.sidebar.subheader("🎨 Categorías")
+    cats = list_categories(user_id)
+    with st.sidebar.expander("Agregar / editar categoría"):
+        new_name = st.text_input("Nombre de categoría")
+        new_color = st.color_picker("Color", value="#4C78A8")
+        if st.button("Guardar categoría"):
+            if new_name.strip():
+                upsert_category(user_id, new_name.strip(), new_color)
+                st.rerun()
+    if cats:
+        with st.sidebar.expander("Eliminar categoría"):
+            cat_opt = st.selectbox("Selecciona", options=cats, format_func=lambda c: f"{c['name']} ({c['color']})")
+            if st.button("Eliminar categoría seleccionada"):
+                delete_category(user_id, cat_opt["id"])
+                st.rerun()
+    else:
+        st.sidebar.info("Crea una categoría arriba.")
+    with st.sidebar.expander("📤 Exportar"):
+        exp_fmt = st.radio("Formato", ["ICS", "CSV"], horizontal=True, key="exp_fmt")
+        # El archivo se genera recién al hacer clic (en un hilo aparte) y no queda en la sesión
+        gen = iter_ics if exp_fmt == "ICS" else iter_csv
+        st.download_button(f"Descargar .{exp_fmt.lower()}", lambda: "".join(gen(user_id)).encode("utf-8"),
+                           file_name=f"calendario_{user_id}.{exp_fmt.lower()}",
+                           mime="text/calendar" if exp_fmt == "ICS" else "text/csv", on_click="ignore")
+    with st.sidebar.expander("📥 Importar"):
+        up = st.file_uploader("Archivo .ics o .csv", type=["ics", "csv"])
+        if up is not None and st.button("Importar archivo"):
+            fmt = "ics" if up.name.lower().endswith(".ics") else "csv"
+            with st.spinner("Importando…"):
+                res = import_calendar(user_id, io.TextIOWrapper(up, encoding="utf-8-sig", newline=""), fmt)
+            st.success(f"{res['inserted']} importados, {res['duplicates']} duplicados, {res['skipped']} omitidos "
+                       f"({res['events_per_s']} eventos/s).")
+    if MATERIALIZE_OCCURRENCES:
+        with st.sidebar.expander("🛠️ Mantenimiento"):
+            if st.button("Reconstruir ocurrencias"):
+                n = rebuild_occurrences(user_id)
+                st.success(f"{n} ocurrencias regeneradas.")
+
+    # ─────────────────────────────────────────────────────────────────────────
+    # Calendario: Semana / Mes / Año
+    # ─────────────────────────────────────────────────────────────────────────
+    st.header("📅 Calendario")
+    vista = st.radio("Vista", ["Semana", "Mes", "Año"], horizontal=True)
+
+    if vista == "Semana":
+        fig = week_timeline_figure(user_id, wk0, PLOTLY_TEMPLATE)
+        if fig is None:
+            st.info("No hay actividades en esta semana.")
+        else:
+            st.plotly_chart(fig, use_container_width=True)
+
+    elif vista == "Mes":
+
+        focus_month = st.date_input("Mes a visualizar", wk0.replace(day=1))
+        start_m = focus_month.replace(day=1)
+        last_day = calendar.monthrange(start_m.year, start_m.month)[1]
+        end_m = focus_month.replace(day=last_day)
+        occ_m = occurrences_frame(user_id, start_m, end_m)
+        cats_by_id = {c["id"]: c for c in cats}
+        st.subheader(f"{start_m.strftime('%B %Y').title()}")
+        render_month_grid(user_id, start_m, st.session_state.dark_mode)
+        dia_detalle = st.date_input("Ver detalle del día", start_m, min_value=start_m, max_value=end_m, key="mes_detalle")
+        det = occurrences_from_frame(occ_m[occ_m["start"].dt.date == dia_detalle], cats_by_id)
+        if det:
+            st.markdown(f"**Eventos el {dia_detalle.isoformat()}:**")
+            for o in det:
+                st.write(f"- {o['title']} • {o['start'].strftime('%H:%M')}–{o['end'].strftime('%H:%M')} ({o['category']['name'] if o['category'] else 'Sin categoría'})")
+        else:
+            st.caption("Sin eventos ese día.")
+
+    else:
+        year_sel = st.number_input("Año", min_value=2000, max_value=2100, value=date.today().year, step=1)
+        start_y = date(year_sel,1,1); end_y = date(year_sel,12,31)
+        modo_anio = st.radio("Mostrar", ["Heatmap", "Meses"], horizontal=True, key="anio_modo")
+        if modo_anio == "Heatmap":
+            hm_c1, hm_c2 = st.columns(2)
+            with hm_c1:
+                metrica = st.radio("Medida", ["Actividades", "Minutos"], horizontal=True, key="anio_metrica")
+            with hm_c2:
+                por_cat = st.toggle("Por categoría", key="anio_por_cat")
+            fig = year_heatmap_figure(daily_load(user_id, year_sel), year_sel, PLOTLY_TEMPLATE,
+                                      "count" if metrica == "Actividades" else "minutes", por_cat,
+                                      {c["id"]: c for c in cats})
+            st.plotly_chart(fig, use_container_width=True)
+        else:
+            render_year_grid(user_id, year_sel, st.session_state.dark_mode)
+
+        day_pick = st.date_input("Día a detallar", date.today(), min_value=start_y, max_value=end_y, key="anio_detalle")
+        det = expand_events_for_range(user_id, day_pick, day_pick)
+
+        if det:
+            st.markdown(f"**Eventos el {day_pick.isoformat()}:**")
+            for o in det:
+                cat = o["category"]["name"] if o.get("category") else "Sin categoría"
+                st.write(f"- {o['title']} • {o['start'].strftime('%H:%M')}–{o['end'].strftime('%H:%M')} ({cat})")
+            else:
+                st.caption("Sin eventos ese día.")
+
+    # ─────────────────────────────────────────────────────────────────────────
+    # Próximas actividades
+    # ─────────────────────────────────────────────────────────────────────────
+    st.header("⏰ Próximas actividades")
+    upcoming = next_occurrences(user_id, datetime.now().replace(second=0, microsecond=0), 8)
+    if not upcoming:
+        st.info("No hay actividades próximas.")
+    else:
+        for x in upcoming:
+            st.write(f"• {x['title']} — {x['start'].strftime('%a %d %b %H:%M')} → {x['end'].strftime('%H:%M')} ({x['category']['name'] if x['category'] else 'Sin categoría'})")
+
+    # ─────────────────────────────────────────────────────────────────────────
+    # Prioridades / Objetivos semanales
+    # ─────────────────────────────────────────────────────────────────────────
+    st.header("🎯 Prioridades de la semana")
+    pr = get_priorities(user_id, wk0)
+    c1, c2 = st.columns([2,1])
+    with c1:
+        goals = st.text_area("Objetivos semanales (resumen)", value=pr["goals"], height=100)
+    with c2:
+        st.caption("Top 3 prioridades")
+        p1 = st.text_input("Prioridad 1", value=pr["p1"])
+        p1_done = st.checkbox("Completada 1", value=bool(pr["p1_done"]))
+        p2 = st.text_input("Prioridad 2", value=pr["p2"])
+        p2_done = st.checkbox("Completada 2", value=bool(pr["p2_done"]))
+        p3 = st.text_input("Prioridad 3", value=pr["p3"])
+        p3_done = st.checkbox("Completada 3", value=bool(pr["p3_done"]))
+    if st.button("Guardar prioridades"):
+        upsert_priorities(user_id, wk0, goals, p1, p1_done, p2, p2_done, p3, p3_done)
+        st.success("Prioridades guardadas.")
+    progress = (int(p1_done) + int(p2_done) + int(p3_done)) / 3 if any([p1, p2, p3]) else 0
+    st.progress(progress)
+
+    # ─────────────────────────────────────────────────────────────────────────
+    # Crear actividad
+    # ─────────────────────────────────────────────────────────────────────────
+    st.header("➕ Agregar actividad")
+    colA, colB = st.columns(2)
+    with colA:
+        title = st.text_input("Título")
+        if cats:
+            cat_sel = st.selectbox("Categoría", options=cats, format_func=lambda c: c["name"])
+            cat_id = cat_sel["id"]
+        else:
+            st.warning("Primero crea una categoría en la barra lateral.")
+            cat_id = None
+    with colB:
+        mode = st.radio("Tipo", ["Puntual", "Recurrente"], horizontal=True)
+
+    if mode == "Puntual":
+        d = st.date_input("Fecha", wk0)
+        c1, c2 = st.columns(2)
+        with c1:
+            s_t = st.time_input("Inicio", time(9, 0))
+        with c2:
+            e_t = st.time_input("Fin", time(10, 0))
+        if e_t > s_t:
+            render_conflicts(user_id, {"date": d, "start": s_t, "end": e_t})
+        if st.button("Agregar evento puntual", use_container_width=True, disabled=not (title and cat_id)):
+            if e_t <= s_t:
+                st.error("La hora de fin debe ser posterior a la de inicio.")
+            else:
+                add_event_punctual(user_id, title, cat_id, d, s_t, e_t)
+                st.success("Evento puntual agregado.")
+                st.rerun()
+    else:
+        c1, c2 = st.columns(2)
+        with c1:
+            start_date = st.date_input("Desde", wk0)
+        with c2:
+            end_date = st.date_input("Hasta", wk0 + timedelta(days=28))
+        st.caption("Días de la semana (0=Lun ... 6=Dom)")
+        days_cols = st.columns(7)
+        sel_days = []
+        for i, col in enumerate(days_cols):
+            if col.checkbox(WEEKDAYS_ES[i], value=(i < 5)):
+                sel_days.append(i)
+        c3, c4 = st.columns(2)
+        with c3:
+            s_t = st.time_input("Inicio (rec)", time(18, 0), key="rec_s")
+        with c4:
+            e_t = st.time_input("Fin (rec)", time(19, 0), key="rec_e")
+        if e_t > s_t and sel_days and end_date >= start_date:
+            render_conflicts(user_id, {"days": sel_days, "start_date": start_date, "end_date": end_date,
+                                       "start": s_t, "end": e_t})
+        if st.button("Agregar evento recurrente", use_container_width=True, disabled=not (title and cat_id)):
+            if e_t <= s_t:
+                st.error("La hora de fin debe ser posterior a la de inicio.")
+            elif not sel_days:
+                st.error("Selecciona al menos un día.")
+            elif end_date < start_date:
+                st.error("Rango de fechas inválido.")
+            else:
+                add_event_recurring(user_id, title, cat_id, start_date, end_date, sel_days, s_t, e_t)
+                st.success("Evento recurrente agregado.")
+                st.rerun()
+
+
+    # ─────────────────────────────────────────────────────────────────────────
+    # Sugerencia de horario (heurística)
+    # ─────────────────────────────────────────────────────────────────────────
+    st.header("🧠 Sugerir próximo hueco")
+    with st.form("ai_form"):
+        act_name = st.text_input("Actividad a ubicar (p.ej., Gimnasio)")
+        cat_for_ai = st.selectbox("Categoría", options=cats, format_func=lambda c: c["name"]) if cats else None
+        dur_min = st.number_input("Duración (min)", min_value=15, max_value=300, step=15, value=60)
+        win_c1, win_c2 = st.columns(2)
+        with win_c1:
+            win_start = st.time_input("Ventana día: desde", time(6, 0))
+        with win_c2:
+            win_end = st.time_input("Ventana día: hasta", time(22, 0))
+        per_c1, per_c2 = st.columns(2)
+        with per_c1:
+            n_weeks = st.number_input("Semanas a planificar", min_value=1, max_value=12, step=1, value=1)
+        with per_c2:
+            per_week = st.number_input("Veces por semana", min_value=1, max_value=14, step=1, value=1)
+        st.caption("Días preferidos (opcional). Si no marcas, buscará el primer hueco de la semana.")
+        ai_days_cols = st.columns(7)
+        ai_days = []
+        for i, col in enumerate(ai_days_cols):
+            if col.checkbox(WEEKDAYS_ES[i], key=f"ai_{i}", value=False):
+                ai_days.append(i)
+        respect = st.checkbox("Respetar actividades existentes", value=True)
+        only_next = st.checkbox("Solo la próxima disponible desde ahora", value=True,
+                                help="Con varias semanas o veces por semana, deja solo la primera del plan.")
+        submit_ai = st.form_submit_button("Sugerir")
+
+    if submit_ai:
+        st.session_state.pop("ai_suggestions", None)
+        if not act_name or not cat_for_ai:
+            st.error("Indica nombre y categoría.")
+        elif win_end <= win_start:
+            st.error("Ventana inválida.")
+        else:
+            if n_weeks == 1 and per_week == 1:
+                occs = expand_events_for_week(user_id, wk0)
+                suggestions = suggest_slots(occs, wk0, ai_days, int(dur_min), win_start, win_end, respect, True, only_next)
+            else:
+                activity = {"title": act_name, "category_id": cat_for_ai["id"], "duration_min": int(dur_min),
+                            "days": ai_days, "win_start": win_start, "win_end": win_end, "per_week": int(per_week)}
+                plan = plan_batch(user_id, [activity], wk0, int(n_weeks), respect, True, only_next)
+                suggestions = [(p["start"], p["end"]) for p in plan]
+            if not suggestions:
+                st.warning("No hay huecos con esos parámetros.")
+            else:
+                # Se guardan en la sesión: el botón de agregar provoca un rerun sin submit_ai
+                st.session_state.ai_suggestions = {"title": act_name, "category_id": cat_for_ai["id"],
+                                                   "slots": suggestions}
+
+    ai_sug = st.session_state.get("ai_suggestions")
+    if ai_sug:
+        st.success("Sugerencia(s):")
+        for idx, (s, e) in enumerate(ai_sug["slots"], start=1):
+            st.write(f"• {idx}. {s.strftime('%a %d %b %H:%M')} → {e.strftime('%H:%M')}")
+        if st.button("Agregar sugerencias al calendario"):
+            add_events_bulk(user_id, [{"title": ai_sug["title"], "category_id": ai_sug["category_id"],
+                                       "date": s.date(), "start": s.time(), "end": e.time()}
+                                      for (s, e) in ai_sug["slots"]])
+            del st.session_state.ai_suggestions
+            st.success("Sugerencias agregadas.")
+            st.rerun()
+
+
+    # ─────────────────────────────────────────────────────────────────────────
+    # Gestión rápida: eliminar
+    # ─────────────────────────────────────────────────────────────────────────
+    st.header("🗑️ Borrar eventos (definición puntual/recurrente)")
+    raw = list_events_raw(user_id)
+    if raw:
+        opt = st.selectbox(
+            "Selecciona evento a eliminar. Si es recurrente, se dejarán de generar ocurrencias futuras.",
+            options=raw, format_func=lambda e: f"[#{e['id']}] {'REC' if e['is_recurring'] else 'PUN'} - {e['title']}"
+        )
+        if st.button("Eliminar evento seleccionado"):
+            delete_event(user_id, opt["id"])
+            st.success("Evento eliminado.")
+            st.rerun()
+    else:
+        st.caption("No hay eventos definidos todavía.")
+
+    # Con la página ya dibujada: precargar la semana/mes anterior y siguiente
+    owner = st.session_state.setdefault("prefetch_owner", uuid.uuid4().hex)
+    if vista == "Mes":
+        prefetch_month(owner, user_id, start_m.year, start_m.month)
+    else:
+        prefetch_week(owner, user_id, wk0, PLOTLY_TEMPLATE)
+
+#arreglar lo de los proximos huecos, o ver si asi esta bien
+# anadir notificaciones (streamlit-notifications)
+# anadir integracion con google calendar (google-api-python-client, google-auth-httplib2, google-auth-oauthlib)
+# enviar por email (streamlit-email)
+
+def main():
+    st.set_page_config(page_title="Planner + Calendar", layout="wide")
+    # Perfilado opcional por sesión; CALENDARIO_PROFILE_LOG=ruta.jsonl guarda cada rerun
+    profiling = st.sidebar.toggle("🐞 Perfilado", key="profiling")
+    panel = st.sidebar.container()
+    with profile_rerun("app", enabled=profiling) as rec:
+        page()
+    if rec is not None:
+        render_debug_panel(panel, rec.as_dict())
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,224 @@
+# ─────────────────────────────────────────────────────────────────────────────
+# Benchmarks de los caminos calientes del planner (expansión, sugerencias y
+# renderizado) sobre una planner.db sintética.
+#
+# Uso:
+#   python bench/bench_calendario.py --sizes 1000,10000,100000 --out bench/results.json
+#   python bench/bench_calendario.py --sizes 1000 --compare bench/results.json
+# ─────────────────────────────────────────────────────────────────────────────
+
+import os
+import sys
+import json
+import random
+import argparse
+import platform
+import sqlite3
+import tempfile
+import statistics
+import tracemalloc
+import subprocess
+from time import perf_counter
+from datetime import date, time, timedelta, datetime
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import calendario as cal  # noqa: E402
+
+BASE_WEEK = date(2025, 1, 6)   # lunes fijo: resultados comparables entre corridas
+SPAN_DAYS = 730                # los eventos se reparten en dos años desde BASE_WEEK
+
+RANGES = {
+    "week": (BASE_WEEK + timedelta(days=182), BASE_WEEK + timedelta(days=188)),
+    "month": (date(2025, 7, 1), date(2025, 7, 31)),
+    "year": (date(2025, 1, 1), date(2025, 12, 31)),
+}
+
+def seed(n_events: int, users: int, rule_share: float, rng: random.Random):
+    # n_events por usuario; rule_share de ellos son reglas semanales
+    for u in range(users):
+        user_id = f"bench{u}"
+        cal.ensure_user(user_id)
+        for name, color in (("Trabajo", "#4C78A8"), ("Estudio", "#F58518"), ("Salud", "#54A24B")):
+            cal.upsert_category(user_id, name, color)
+        cat_ids = [c["id"] for c in cal.list_categories(user_id)]
+        rows = []
+        for i in range(n_events):
+            h = rng.randint(6, 21)
+            m = rng.choice((0, 15, 30, 45))
+            dur = rng.choice((30, 45, 60, 90))
+            start = time(h, m)
+            end_dt = datetime.combine(BASE_WEEK, start) + timedelta(minutes=dur)
+            end = end_dt.time() if end_dt.date() == BASE_WEEK else time(23, 59)
+            d = BASE_WEEK + timedelta(days=rng.randrange(SPAN_DAYS))
+            row = {"title": f"Evento {i}", "category_id": rng.choice(cat_ids), "start": start, "end": end}
+            if rng.random() < rule_share:
+                row.update({"days": sorted(rng.sample(range(7), rng.randint(1, 3))),
+                            "start_date": d, "end_date": d + timedelta(days=rng.randint(7, 180))})
+            else:
+                row["date"] = d
+            rows.append(row)
+        for i in range(0, len(rows), 20000):
+            cal.add_events_bulk(user_id, rows[i:i + 20000])
+
+def timeit(fn, repeat: int, min_time: float = 0.05):
+    fn()  # calentamiento
+    times = []
+    t_end = perf_counter() + min_time
+    while len(times) < repeat or perf_counter() < t_end:
+        t0 = perf_counter()
+        fn()
+        times.append((perf_counter() - t0) * 1000)
+        if len(times) >= repeat * 20:
+            break
+    return {"runs": len(times), "min_ms": round(min(times), 4),
+            "median_ms": round(statistics.median(times), 4), "mean_ms": round(statistics.fmean(times), 4)}
+
+def cases(user_id: str):
+    wk0 = RANGES["week"][0]
+    cats = {c["id"]: c for c in cal.list_categories(user_id)}
+    occ_week = cal.expand_events_for_range.uncached(user_id, *RANGES["week"])
+    month_df = cal.expand_events_frame.uncached(user_id, *RANGES["month"])
+    year_load = cal.daily_load(user_id, 2025)
+    activity = {"title": "Bench", "category_id": next(iter(cats)), "duration_min": 60, "days": [],
+                "win_start": time(6), "win_end": time(22), "per_week": 3}
+    # costo de parseo por definición: compilar cada vez vs. leer del caché por id
+    y_lo, y_hi = (d.isoformat() for d in RANGES["year"])
+    with cal.db(user_id=user_id) as con:
+        year_rows = con.execute(cal.EVENTS_IN_RANGE_SQL, (user_id, y_lo, y_hi, user_id, y_hi, y_lo)).fetchall()
+    path = cal.db_path_for(user_id)
+    cal.compile_rows(year_rows, path)
+    yield "compile_event_row[parse]", "year", lambda: [cal.compile_event_row(r) for r in year_rows]
+    yield "compile_rows[cached]", "year", lambda: cal.compile_rows(year_rows, path)
+    yield "expand_events_for_week", "week", lambda: cal.expand_events_for_range.uncached(user_id, wk0, wk0 + timedelta(days=6))
+    for rng_name, (s, e) in RANGES.items():
+        yield "expand_events_for_range", rng_name, lambda s=s, e=e: cal.expand_events_for_range.uncached(user_id, s, e)
+        yield "expand_events_frame", rng_name, lambda s=s, e=e: cal.expand_events_frame.uncached(user_id, s, e)
+        yield "occurrences_frame", rng_name, lambda s=s, e=e: cal.occurrences_frame.uncached(user_id, s, e)
+        yield "expand_events_for_range[cached]", rng_name, lambda s=s, e=e: cal.expand_events_for_range(user_id, s, e)
+    yield "suggest_slots", "week", lambda: cal.suggest_slots(occ_week, wk0, [], 60, time(6), time(22),
+                                                             True, False, False)
+    # API pública; el caché se vacía en cada corrida para medir el plan completo y no un acierto
+    yield "plan_batch", "12 weeks", lambda: (cal.get_occ_cache().clear(),
+                                             cal.plan_batch(user_id, [activity] * 5, wk0, 12, True, False))
+    cal.conflict_index(user_id)
+    yield "find_conflicts", "punctual", lambda: cal.find_conflicts(user_id, {"date": wk0 + timedelta(days=2),
+                                                                              "start": time(9), "end": time(11)})
+    yield "find_conflicts", "rule/6mo", lambda: cal.find_conflicts(user_id, {
+        "days": [0, 2, 4], "start_date": wk0, "end_date": wk0 + timedelta(days=182), "start": time(9), "end": time(11)})
+    yield "week_timeline_figure", "week", lambda: cal.week_timeline_figure.uncached(user_id, wk0, "plotly")
+    yield "month_grid_html", "month", lambda: cal.month_grid_html(month_df, cats, RANGES["month"][0], False)
+    yield "month_html", "month", lambda: cal.month_html.uncached(user_id, 2025, 7)
+    yield "year_html", "year", lambda: cal.year_html.uncached(user_id, 2025)
+    yield "daily_load", "year", lambda: cal.daily_load_range.uncached(user_id, *RANGES["year"])
+    yield "daily_load", "5 years", lambda: cal.daily_load_range.uncached(user_id, date(2023, 1, 1), date(2027, 12, 31))
+    yield "year_heatmap_figure", "year", lambda: cal.year_heatmap_figure(year_load, 2025, "plotly")
+    yield "year_heatmap_figure", "year/cat", lambda: cal.year_heatmap_figure(year_load, 2025, "plotly", "minutes",
+                                                                             True, cats)
+
+# Memoria retenida por la expansión de un año completo (lista de ocurrencias):
+# lo que queda vivo en el caché por cada consulta de rango.
+def expansion_memory(user_id: str) -> dict:
+    tracemalloc.start()
+    base = tracemalloc.take_snapshot()
+    occ = cal.expand_events_for_range.uncached(user_id, *RANGES["year"])
+    current, peak = tracemalloc.get_traced_memory()
+    retained = sum(st.size_diff for st in tracemalloc.take_snapshot().compare_to(base, "filename"))
+    tracemalloc.stop()
+    n = len(occ)
+    return {"occurrences": n, "retained_bytes": retained, "peak_bytes": peak,
+            "bytes_per_occurrence": round(retained / n, 1) if n else 0.0,
+            "cache_estimate_bytes": cal.approx_size(occ)}
+
+# Importación en frío del núcleo: un intérprete nuevo por corrida, con los .pyc
+# ya escritos (la primera corrida los genera y no cuenta). Presupuesto ~50 ms y
+# sin pandas/plotly cargados.
+COLD_IMPORT_BUDGET_MS = 50
+COLD_IMPORT_SCRIPT = ("import sys, time; t0 = time.perf_counter(); import calendario; "
+                      "print((time.perf_counter() - t0) * 1000, 'pandas' in sys.modules, 'plotly' in sys.modules)")
+
+def cold_import(repeat: int):
+    env = {k: v for k, v in os.environ.items() if k != "PYTHONDONTWRITEBYTECODE"}
+    times = []
+    for i in range(repeat + 1):
+        out = subprocess.check_output([sys.executable, "-c", COLD_IMPORT_SCRIPT], cwd=ROOT, env=env, text=True).split()
+        if i:
+            times.append(float(out[0]))
+    heavy = [name for name, loaded in zip(("pandas", "plotly"), out[1:]) if loaded == "True"]
+    return {"runs": len(times), "min_ms": round(min(times), 4), "median_ms": round(statistics.median(times), 4),
+            "mean_ms": round(statistics.fmean(times), 4), "heavy_modules": heavy}
+
+def git_commit() -> str:
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT,
+                                       stderr=subprocess.DEVNULL, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return ""
+
+def compare(current: dict, baseline_path: str):
+    with open(baseline_path, encoding="utf-8") as f:
+        base = {(r["name"], r["range"], r["events"]): r for r in json.load(f)["results"]}
+    print(f"\n{'caso':<42}{'rango':<10}{'eventos':>9}{'antes ms':>12}{'ahora ms':>12}{'x':>8}")
+    for r in current["results"]:
+        old = base.get((r["name"], r["range"], r["events"]))
+        if old:
+            ratio = old["median_ms"] / r["median_ms"] if r["median_ms"] else float("inf")
+            print(f"{r['name']:<42}{r['range']:<10}{r['events']:>9}{old['median_ms']:>12.3f}"
+                  f"{r['median_ms']:>12.3f}{ratio:>8.2f}")
+
+def main():
+    ap = argparse.ArgumentParser(description="Benchmarks de expansión, sugerencias y renderizado.")
+    ap.add_argument("--sizes", default="1000,10000,100000", help="eventos por usuario, separados por coma")
+    ap.add_argument("--users", type=int, default=1)
+    ap.add_argument("--rule-share", type=float, default=0.2, help="fracción de eventos que son reglas semanales")
+    ap.add_argument("--repeat", type=int, default=5)
+    ap.add_argument("--seed", type=int, default=42)
+    ap.add_argument("--only", default="", help="filtrar casos por subcadena del nombre")
+    ap.add_argument("--out", default="", help="ruta del JSON de resultados")
+    ap.add_argument("--compare", default="", help="JSON previo para comparar medianas")
+    args = ap.parse_args()
+
+    report = {"meta": {"commit": git_commit(), "timestamp": datetime.now().isoformat(timespec="seconds"),
+                       "python": platform.python_version(), "sqlite": sqlite3.sqlite_version,
+                       "platform": platform.platform(), "users": args.users,
+                       "rule_share": args.rule_share, "seed": args.seed},
+              "results": [], "memory": []}
+    if not args.only or args.only in "import calendario":
+        res = cold_import(max(args.repeat, 5))
+        res.update({"name": "import calendario", "range": "-", "events": 0})
+        report["results"].append(res)
+        flag = "" if res["median_ms"] <= COLD_IMPORT_BUDGET_MS and not res["heavy_modules"] else "  ⚠ fuera de presupuesto"
+        print(f"  {'import calendario (frío)':<50}{res['median_ms']:>10.3f} ms (min {res['min_ms']:.3f}){flag}")
+    for n in [int(x) for x in args.sizes.split(",") if x]:
+        with tempfile.TemporaryDirectory() as tmp:
+            cal.configure(os.path.join(tmp, "planner.db"))
+            cal.get_occ_cache().clear()
+            cal.init_db()
+            t0 = perf_counter()
+            seed(n, args.users, args.rule_share, random.Random(args.seed))
+            print(f"[{n} eventos] seed {perf_counter() - t0:.2f}s")
+            if not args.only or args.only in "memory":
+                mem = expansion_memory("bench0")
+                mem["events"] = n
+                report["memory"].append(mem)
+                print(f"  {'memoria expansión año':<50}{mem['retained_bytes'] / 1e6:>10.2f} MB "
+                      f"({mem['occurrences']} ocurrencias, {mem['bytes_per_occurrence']} B c/u)")
+            for name, rng_name, fn in cases("bench0"):
+                if args.only and args.only not in name:
+                    continue
+                res = timeit(fn, args.repeat)
+                res.update({"name": name, "range": rng_name, "events": n})
+                report["results"].append(res)
+                print(f"  {name:<40}{rng_name:<10}{res['median_ms']:>10.3f} ms (min {res['min_ms']:.3f})")
+            cal.get_pool().close()
+    if args.out:
+        os.makedirs(os.path.dirname(os.path.abspath(args.out)), exist_ok=True)
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"\nResultados en {args.out}")
+    if args.compare:
+        compare(report, args.compare)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,171 @@
+# ─────────────────────────────────────────────────────────────────────────────
+# Carga local del servicio de libre/ocupado (calendario.service)
+# ─────────────────────────────────────────────────────────────────────────────
+# Siembra una planner.db temporal, levanta el servicio en un subproceso y lo
+# golpea desde --procs procesos con --conns conexiones keep-alive cada uno,
+# durante --seconds por escenario. Reporta pedidos/s, consultas/s y latencias.
+#
+# Uso:
+#   python bench/bench_service.py --users 50 --events 2000 --seconds 5 --out bench/service.json
+# ─────────────────────────────────────────────────────────────────────────────
+
+import os
+import sys
+import json
+import socket
+import random
+import asyncio
+import argparse
+import tempfile
+import subprocess
+import statistics
+from time import perf_counter, sleep
+from datetime import timedelta, datetime
+from multiprocessing import Pool
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import calendario as cal  # noqa: E402
+from bench_calendario import BASE_WEEK, SPAN_DAYS, seed, git_commit  # noqa: E402
+
+def _window(rng: random.Random):
+    start = datetime.combine(BASE_WEEK + timedelta(days=rng.randrange(SPAN_DAYS)), datetime.min.time())
+    start += timedelta(minutes=30 * rng.randrange(12, 44))
+    return start, start + timedelta(minutes=rng.choice((30, 60, 120)))
+
+# Escenario → (ruta, generador del cuerpo). Las ventanas se eligen de un conjunto
+# finito (--distinct por usuario), así se mide también el caché de respuestas.
+def scenario_body(name: str, rng: random.Random, users: int, distinct: int, batch: int):
+    def fb():
+        r = random.Random(rng.randrange(distinct))
+        s, e = _window(r)
+        return {"user_id": f"bench{rng.randrange(users)}", "start": s.isoformat(), "end": e.isoformat()}
+    def gap():
+        s, _ = _window(random.Random(rng.randrange(distinct)))
+        return {"user_id": f"bench{rng.randrange(users)}", "after": s.isoformat(), "duration_min": 60,
+                "win_start": "08:00", "win_end": "20:00"}
+    if name == "freebusy":
+        return "/v1/freebusy", fb()
+    if name == "freebusy_batch":
+        return "/v1/freebusy/batch", {"queries": [fb() for _ in range(batch)]}
+    if name == "next_gap":
+        return "/v1/next_gap", gap()
+    raise ValueError(name)
+
+async def _request(reader, writer, path: str, payload) -> int:
+    body = json.dumps(payload).encode("utf-8")
+    writer.write(f"POST {path} HTTP/1.1\r\nHost: bench\r\nContent-Type: application/json\r\n"
+                 f"Content-Length: {len(body)}\r\n\r\n".encode("latin-1") + body)
+    head = await reader.readuntil(b"\r\n\r\n")
+    status = int(head.split(b" ", 2)[1])
+    length = int(head.lower().split(b"content-length:", 1)[1].split(b"\r\n", 1)[0])
+    await reader.readexactly(length)
+    return status
+
+async def _client(port: int, name: str, deadline: float, rng, args, lat: list, errors: list):
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    try:
+        while perf_counter() < deadline:
+            path, payload = scenario_body(name, rng, args["users"], args["distinct"], args["batch"])
+            t0 = perf_counter()
+            status = await _request(reader, writer, path, payload)
+            lat.append((perf_counter() - t0) * 1000)
+            if status != 200:
+                errors.append(status)
+    finally:
+        writer.close()
+
+def _load_proc(job):
+    port, name, seconds, conns, proc_seed, args = job
+    lat, errors = [], []
+    async def go():
+        deadline = perf_counter() + seconds
+        await asyncio.gather(*(_client(port, name, deadline, random.Random(proc_seed * 1000 + i), args, lat, errors)
+                               for i in range(conns)))
+    asyncio.run(go())
+    return lat, errors
+
+def _wait_port(port: int, timeout: float = 15.0):
+    t_end = perf_counter() + timeout
+    while perf_counter() < t_end:
+        try:
+            socket.create_connection(("127.0.0.1", port), timeout=0.5).close()
+            return
+        except OSError:
+            sleep(0.05)
+    raise RuntimeError("el servicio no arrancó")
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+def pct(values, p: float) -> float:
+    values = sorted(values)
+    return round(values[min(len(values) - 1, int(p / 100 * len(values)))], 3) if values else 0.0
+
+def main():
+    ap = argparse.ArgumentParser(description="Carga local del servicio de libre/ocupado.")
+    ap.add_argument("--users", type=int, default=50)
+    ap.add_argument("--events", type=int, default=2000, help="eventos por usuario")
+    ap.add_argument("--rule-share", type=float, default=0.2)
+    ap.add_argument("--seconds", type=float, default=5.0, help="duración de cada escenario")
+    ap.add_argument("--procs", type=int, default=4, help="procesos generadores de carga")
+    ap.add_argument("--conns", type=int, default=16, help="conexiones keep-alive por proceso")
+    ap.add_argument("--batch", type=int, default=50, help="consultas por pedido en freebusy_batch")
+    ap.add_argument("--distinct", type=int, default=200, help="ventanas distintas por generador")
+    ap.add_argument("--workers", type=int, default=cal.SERVICE_WORKERS, help="hilos SQLite del servicio")
+    ap.add_argument("--scenarios", default="freebusy,freebusy_batch,next_gap")
+    ap.add_argument("--seed", type=int, default=42)
+    ap.add_argument("--out", default="")
+    args = ap.parse_args()
+
+    report = {"meta": {"commit": git_commit(), "timestamp": datetime.now().isoformat(timespec="seconds"),
+                       "users": args.users, "events": args.events, "procs": args.procs, "conns": args.conns,
+                       "batch": args.batch, "workers": args.workers, "cpus": os.cpu_count()},
+              "results": []}
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, "planner.db")
+        cal.configure(db_path)
+        cal.init_db()
+        t0 = perf_counter()
+        seed(args.events, args.users, args.rule_share, random.Random(args.seed))
+        cal.get_pool().close()
+        print(f"seed {perf_counter() - t0:.2f}s")
+        port = _free_port()
+        server = subprocess.Popen([sys.executable, "-m", "calendario.service", "--db", db_path,
+                                   "--port", str(port), "--workers", str(args.workers)],
+                                  cwd=ROOT, stderr=subprocess.DEVNULL)
+        try:
+            _wait_port(port)
+            shared = {"users": args.users, "distinct": args.distinct, "batch": args.batch}
+            with Pool(args.procs) as pool:
+                for name in [s for s in args.scenarios.split(",") if s]:
+                    jobs = [(port, name, args.seconds, args.conns, args.seed + i, shared) for i in range(args.procs)]
+                    t0 = perf_counter()
+                    parts = pool.map(_load_proc, jobs)
+                    elapsed = perf_counter() - t0
+                    lat = [x for p in parts for x in p[0]]
+                    errors = [x for p in parts for x in p[1]]
+                    per_req = args.batch if name.endswith("_batch") else 1
+                    res = {"name": name, "requests": len(lat), "errors": len(errors),
+                           "req_per_s": round(len(lat) / elapsed, 1),
+                           "queries_per_s": round(len(lat) * per_req / elapsed, 1),
+                           "p50_ms": pct(lat, 50), "p95_ms": pct(lat, 95), "p99_ms": pct(lat, 99),
+                           "mean_ms": round(statistics.fmean(lat), 3) if lat else 0.0}
+                    report["results"].append(res)
+                    print(f"  {name:<16}{res['req_per_s']:>10.0f} req/s{res['queries_per_s']:>10.0f} q/s"
+                          f"   p50 {res['p50_ms']:.2f}  p95 {res['p95_ms']:.2f}  p99 {res['p99_ms']:.2f} ms"
+                          f"   errores {res['errors']}")
+        finally:
+            server.terminate()
+            server.wait()
+    if args.out:
+        os.makedirs(os.path.dirname(os.path.abspath(args.out)), exist_ok=True)
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"\nResultados en {args.out}")
+
+if __name__ == "__main__":
+    main()
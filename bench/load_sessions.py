@@ -0,0 +1,231 @@
+# ─────────────────────────────────────────────────────────────────────────────
+# Carga de sesiones concurrentes sobre la capa de almacenamiento
+# ─────────────────────────────────────────────────────────────────────────────
+# Cada sesión repite, en el orden de page() en app.py, un rerun de la vista
+# Semana contra una planner.db temporal: init_db, ensure_user, list_categories,
+# la semana (week_timeline_figure, que arma occurrences_frame), próximas
+# actividades, get_priorities, list_events_raw y, con probabilidad
+# --write-share, una escritura (add_event_punctual / add_event_recurring /
+# upsert_priorities). La precarga de semanas vecinas no se incluye.
+# Las sesiones corren como hilos de un proceso (como Streamlit) o como procesos
+# separados (varias réplicas sobre la misma base). Se informa reruns/s, p50/p95/p99
+# por operación y por rerun, y los errores de lock ("database is locked").
+#
+# Uso:
+#   python bench/load_sessions.py --sessions 1,8,32 --mode threads,processes --out bench/load.json
+#   python bench/load_sessions.py --sessions 8 --shard-dir auto --compare bench/load.json
+# ─────────────────────────────────────────────────────────────────────────────
+
+import os
+import sys
+import json
+import random
+import sqlite3
+import argparse
+import platform
+import tempfile
+import threading
+from time import perf_counter, sleep
+from datetime import time, timedelta, datetime
+from collections import defaultdict
+import multiprocessing
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import calendario as cal  # noqa: E402
+from bench_calendario import BASE_WEEK, seed, git_commit  # noqa: E402
+
+WEEKS = 26   # semanas entre las que navega cada sesión
+TEMPLATE = "plotly"   # plantilla de la figura semanal (tema claro, el de arranque)
+OPS = ("init_db", "ensure_user", "list_categories", "week_view", "upcoming", "get_priorities",
+       "list_events_raw", "add_event_punctual", "add_event_recurring", "upsert_priorities")
+
+def _is_lock_error(e: Exception) -> bool:
+    msg = str(e).lower()
+    return isinstance(e, sqlite3.OperationalError) and ("locked" in msg or "busy" in msg)
+
+def rerun(user_id: str, rng: random.Random, write_share: float, uncached: bool, timings: list):
+    # Un rerun de app.py. timings recibe (operación, ms). Con uncached la figura
+    # se rearma siempre; el occurrences_frame que usa sigue pasando por el caché.
+    call = (lambda f: f.uncached) if uncached else (lambda f: f)
+
+    def op(name, fn, *args):
+        t0 = perf_counter()
+        result = fn(*args)
+        timings.append((name, (perf_counter() - t0) * 1000))
+        return result
+
+    op("init_db", cal.init_db)
+    op("ensure_user", cal.ensure_user, user_id)
+    wk0 = BASE_WEEK + timedelta(days=7 * rng.randrange(WEEKS))
+    cats = op("list_categories", call(cal.list_categories), user_id)
+    op("week_view", call(cal.week_timeline_figure), user_id, wk0, TEMPLATE)
+    after = datetime.combine(wk0, time(rng.randrange(6, 22)))
+    op("upcoming", call(cal.next_occurrences), user_id, after, 8)
+    op("get_priorities", cal.get_priorities, user_id, wk0)
+    op("list_events_raw", cal.list_events_raw, user_id)
+    if rng.random() < write_share:
+        d = wk0 + timedelta(days=rng.randrange(7))
+        s_t = time(rng.randrange(6, 21), rng.choice((0, 30)))
+        e_t = time(s_t.hour + 1, s_t.minute)
+        kind = rng.random()
+        if kind < 0.45:
+            op("add_event_punctual", cal.add_event_punctual, user_id, "Carga", cats[0]["id"], d, s_t, e_t)
+        elif kind < 0.6:
+            op("add_event_recurring", cal.add_event_recurring, user_id, "Carga", cats[0]["id"],
+               d, d + timedelta(days=rng.randint(7, 90)), [d.weekday()], s_t, e_t)
+        else:
+            op("upsert_priorities", cal.upsert_priorities, user_id, wk0, "meta", "p1", rng.random() < 0.5,
+               "p2", False, "p3", False)
+
+def run_session(session: int, cfg: dict, barrier) -> dict:
+    # Arranca junto con las demás (barrier) y corre `duration` segundos;
+    # devuelve latencias crudas y conteo de errores
+    rng = random.Random(cfg["seed"] * 7919 + session)
+    user_id = f"bench{session % cfg['users']}"
+    timings, reruns, lock_errors, errors = [], [], 0, defaultdict(int)
+    barrier.wait()
+    deadline = perf_counter() + cfg["duration"]
+    while perf_counter() < deadline:
+        t0 = perf_counter()
+        try:
+            rerun(user_id, rng, cfg["write_share"], cfg["uncached"], timings)
+            reruns.append((perf_counter() - t0) * 1000)
+        except Exception as e:   # se cuenta y la sesión sigue, como un rerun que falla en la app
+            if _is_lock_error(e):
+                lock_errors += 1
+            else:
+                errors[type(e).__name__] += 1
+        if cfg["think_ms"]:
+            sleep(rng.expovariate(1000.0 / cfg["think_ms"]))
+    return {"timings": timings, "reruns": reruns, "lock_errors": lock_errors, "errors": dict(errors)}
+
+def _configure(cfg: dict):
+    cal.configure(cfg["db_path"], shard_dir=cfg["shard_dir"])
+
+def _process_session(session: int, cfg: dict, barrier, results):
+    # Proceso nuevo (spawn): su propio pool de conexiones y su propio caché.
+    # render (pandas/plotly) se importa antes de la barrera, fuera de la medición.
+    _configure(cfg)
+    cal.week_timeline_figure
+    results.put(run_session(session, cfg, barrier))
+
+def pct(values, p: float) -> float:
+    values = sorted(values)
+    return round(values[min(len(values) - 1, int(p / 100 * len(values)))], 3) if values else 0.0
+
+def summarize(parts: list, elapsed: float) -> dict:
+    by_op = defaultdict(list)
+    reruns, lock_errors, errors = [], 0, defaultdict(int)
+    for p in parts:
+        for name, ms in p["timings"]:
+            by_op[name].append(ms)
+        reruns += p["reruns"]
+        lock_errors += p["lock_errors"]
+        for k, v in p["errors"].items():
+            errors[k] += v
+    lat = lambda xs: {"count": len(xs), "p50_ms": pct(xs, 50), "p95_ms": pct(xs, 95),
+                      "p99_ms": pct(xs, 99), "max_ms": round(max(xs), 3) if xs else 0.0}
+    return {"reruns": len(reruns), "reruns_per_s": round(len(reruns) / elapsed, 1),
+            "ops_per_s": round(sum(len(v) for v in by_op.values()) / elapsed, 1),
+            "rerun": lat(reruns), "ops": {name: lat(by_op[name]) for name in OPS if by_op[name]},
+            "lock_errors": lock_errors, "errors": dict(errors)}
+
+def run_case(mode: str, sessions: int, cfg: dict) -> dict:
+    # threads: `sessions` hilos en este proceso, que comparten pool de conexiones
+    # y caché (como Streamlit). processes: `sessions` procesos de un hilo.
+    if mode == "threads":
+        barrier = threading.Barrier(sessions)
+        parts = [None] * sessions
+        def worker(i):
+            parts[i] = run_session(i, cfg, barrier)
+        threads = [threading.Thread(target=worker, args=(i,)) for i in range(sessions)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+    else:
+        ctx = multiprocessing.get_context("spawn")
+        barrier, results = ctx.Barrier(sessions), ctx.Queue()
+        procs = [ctx.Process(target=_process_session, args=(i, cfg, barrier, results)) for i in range(sessions)]
+        for p in procs:
+            p.start()
+        parts = [results.get() for _ in procs]
+        for p in procs:
+            p.join()
+    res = summarize(parts, cfg["duration"])
+    res.update({"mode": mode, "sessions": sessions})
+    return res
+
+def compare(current: dict, baseline_path: str):
+    with open(baseline_path, encoding="utf-8") as f:
+        base = {(r["mode"], r["sessions"]): r for r in json.load(f)["results"]}
+    print(f"\n{'modo':<11}{'sesiones':>9}{'reruns/s antes':>16}{'ahora':>9}{'p95 antes':>11}{'ahora':>9}"
+          f"{'locks antes':>13}{'ahora':>7}")
+    for r in current["results"]:
+        old = base.get((r["mode"], r["sessions"]))
+        if old:
+            print(f"{r['mode']:<11}{r['sessions']:>9}{old['reruns_per_s']:>16.1f}{r['reruns_per_s']:>9.1f}"
+                  f"{old['rerun']['p95_ms']:>11.2f}{r['rerun']['p95_ms']:>9.2f}"
+                  f"{old['lock_errors']:>13}{r['lock_errors']:>7}")
+
+def main():
+    ap = argparse.ArgumentParser(description="Sesiones concurrentes repitiendo el guion de un rerun.")
+    ap.add_argument("--sessions", default="1,8,32", help="sesiones concurrentes, separadas por coma")
+    ap.add_argument("--mode", default="threads,processes", help="threads, processes o ambos")
+    ap.add_argument("--duration", type=float, default=5.0, help="segundos por caso")
+    ap.add_argument("--users", type=int, default=8, help="usuarios distintos (las sesiones se reparten)")
+    ap.add_argument("--events", type=int, default=1000, help="eventos sembrados por usuario")
+    ap.add_argument("--rule-share", type=float, default=0.2)
+    ap.add_argument("--write-share", type=float, default=0.1, help="fracción de reruns con una escritura")
+    ap.add_argument("--think-ms", type=float, default=0.0, help="pausa media entre reruns de una sesión")
+    ap.add_argument("--uncached", action="store_true", help="saltear versioned_cache (peor caso)")
+    ap.add_argument("--shard-dir", default="", help="'auto' = particiones en la carpeta temporal")
+    ap.add_argument("--seed", type=int, default=42)
+    ap.add_argument("--out", default="", help="ruta del JSON de resultados")
+    ap.add_argument("--compare", default="", help="JSON previo para comparar")
+    args = ap.parse_args()
+
+    modes = [m for m in args.mode.split(",") if m]
+    if any(m not in ("threads", "processes") for m in modes):
+        ap.error("--mode admite threads y/o processes")
+    report = {"meta": {"commit": git_commit(), "timestamp": datetime.now().isoformat(timespec="seconds"),
+                       "python": platform.python_version(), "sqlite": sqlite3.sqlite_version,
+                       "platform": platform.platform(), "cpus": os.cpu_count(), "users": args.users,
+                       "events": args.events, "write_share": args.write_share, "think_ms": args.think_ms,
+                       "duration": args.duration, "uncached": args.uncached, "sharded": bool(args.shard_dir),
+                       "seed": args.seed},
+              "results": []}
+    with tempfile.TemporaryDirectory() as tmp:
+        shard_dir = os.path.join(tmp, "shards") if args.shard_dir == "auto" else args.shard_dir
+        cfg = {"db_path": os.path.join(tmp, "planner.db"), "shard_dir": shard_dir, "users": args.users,
+               "duration": args.duration, "write_share": args.write_share, "think_ms": args.think_ms,
+               "uncached": args.uncached, "seed": args.seed}
+        _configure(cfg)
+        cal.init_db()
+        t0 = perf_counter()
+        seed(args.events, args.users, args.rule_share, random.Random(args.seed))
+        print(f"seed {perf_counter() - t0:.2f}s")
+        for mode in modes:
+            for n in [int(x) for x in args.sessions.split(",") if x]:
+                cal.get_occ_cache().clear()
+                cal.get_figure_cache().clear()
+                res = run_case(mode, n, cfg)
+                report["results"].append(res)
+                print(f"  {mode:<10}{n:>4} sesiones {res['reruns_per_s']:>9.1f} reruns/s   "
+                      f"rerun p50 {res['rerun']['p50_ms']:.2f}  p95 {res['rerun']['p95_ms']:.2f}  "
+                      f"p99 {res['rerun']['p99_ms']:.2f} ms   locks {res['lock_errors']}"
+                      + (f"   errores {res['errors']}" if res["errors"] else ""))
+        for path in cal.all_db_paths():
+            cal.get_pool(path).close()
+    if args.out:
+        os.makedirs(os.path.dirname(os.path.abspath(args.out)), exist_ok=True)
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"\nResultados en {args.out}")
+    if args.compare:
+        compare(report, args.compare)
+
+if __name__ == "__main__":
+    main()
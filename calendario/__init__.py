@@ -0,0 +1,70 @@
+# ─────────────────────────────────────────────────────────────────────────────
+# Planner semanal/mensual/anual con categorías, recurrencias, prioridades y
+# sugerencias de horario (heurística).
+#
+# Núcleo liviano (db, cache, recurrence, storage, scheduling, interchange): solo
+# biblioteca estándar, se importa rápido y sin Streamlit, desde workers, CLIs o
+# tests. Los módulos con numpy/pandas/plotly (frames, render), prefetch (que trae
+# concurrent.futures), reminders y service (asyncio) y maintenance (pool de
+# procesos) se cargan recién cuando se accede a alguno de sus nombres.
+# La app Streamlit vive en app.py.
+# ─────────────────────────────────────────────────────────────────────────────
+
+import importlib
+
+from .db import (SQLITE_PRAGMAS, SHARD_BUCKETS, POOL_MAX_OPEN, ConnectionPool, set_shard_init, get_pool,
+                 open_pool_count, configure, get_db_path, sharded, SHARD_GLOBS, shard_name, db_path_for,
+                 SHARD_META, read_shard_buckets, write_shard_buckets, check_shard_layout, all_db_paths, db,
+                 bump_data_version, get_data_version)
+from .profiling import (PROFILE_LOG, RerunRecord, current_record, timed, stage, note_cache,
+                        profile_rerun, recent_records)
+from .cache import (OCC_CACHE_MAX_BYTES, FIGURE_CACHE_MAX, approx_size, OccurrenceCache, get_occ_cache,
+                    get_figure_cache, versioned_cache, versioned_figure_cache)
+from .recurrence import (WEEKDAYS_ES, week_start, combine_dt, overlaps, minutes_between, Occurrence, by_start,
+                         rule_dates, first_rule_date, last_rule_date, next_rule_start, CompiledEvent, MASK_DAYS,
+                         ordinal_weekday, days_to_mask, compile_event_row, min_to_hhmm, compiled_ordinals,
+                         next_start, expand_definitions, merge_upcoming)
+from .storage import (MATERIALIZE_OCCURRENCES, OCC_HORIZON_DAYS, OCC_PAST_DAYS, OCC_EXTEND_STEP_DAYS,
+                      SCHEMA_VERSION, init_db, schema_version, create_schema, migrate_events_range_columns,
+                      migrate_occ_window, migrate_events_fingerprint, ensure_user, list_categories,
+                      upsert_category, delete_category,
+                      add_event_punctual, add_event_recurring, event_fingerprint, add_events_bulk, delete_event,
+                      list_events_raw, EVENTS_IN_RANGE_SQL, list_events_in_range, explain_events_in_range,
+                      get_priorities, upsert_priorities, expand_events_for_range, expand_events_for_week,
+                      UPCOMING_PUNCTUAL_SQL, UPCOMING_RULES_SQL, next_occurrences, COMPILED_CACHE_MAX,
+                      clear_compiled_cache, compile_rows, list_compiled_in_range, list_compiled,
+                      get_occ_window, materialize_punctual, materialize_rule, extend_occ_window,
+                      rebuild_occurrences)
+from .scheduling import (day_window, FreeBusy, find_slot_in_day, suggest_slots, ACTIVITY_KEYS,
+                         plan_batch, ConflictIndex, conflict_index, find_conflicts)
+from .interchange import (ICS_DAYS, CSV_COLUMNS, iter_event_definitions, iter_ics, iter_csv,
+                          IMPORT_BATCH_SIZE, iter_ics_vevents, import_calendar)
+
+# nombre → submódulo que lo define; se importa en el primer acceso
+_LAZY = {
+    "OCC_COLUMNS": "frames", "expand_events_frame": "frames", "occurrences_from_frame": "frames",
+    "list_occurrences_materialized": "frames", "occurrences_frame": "frames", "LOAD_COLUMNS": "frames",
+    "daily_load_range": "frames", "daily_load": "frames",
+    "MONTHS_ES": "render", "month_css": "render", "month_grid_html": "render", "month_html": "render",
+    "year_html": "render", "year_heatmap_figure": "render", "week_timeline_frame": "render",
+    "week_timeline_figure": "render",
+    "PREFETCH_WORKERS": "prefetch", "PREFETCH_MAX_PENDING": "prefetch", "Prefetcher": "prefetch",
+    "get_prefetcher": "prefetch", "week_jobs": "prefetch", "month_jobs": "prefetch",
+    "prefetch_week": "prefetch", "prefetch_month": "prefetch",
+    "REMINDER_LEAD_MIN": "reminders", "ReminderScheduler": "reminders", "LogSink": "reminders",
+    "SmtpSink": "reminders", "WebhookSink": "reminders",
+    "MAINTENANCE_WORKERS": "maintenance", "USER_TABLES": "maintenance", "migrate_one": "maintenance",
+    "vacuum_one": "maintenance", "integrity_one": "maintenance", "stats_one": "maintenance",
+    "run_all": "maintenance", "copy_users": "maintenance", "split_database": "maintenance",
+    "SERVICE_WORKERS": "service", "free_busy": "service", "next_gap": "service", "FreeBusyService": "service",
+}
+
+def __getattr__(name: str):
+    if name in _LAZY:
+        value = getattr(importlib.import_module(f".{_LAZY[name]}", __name__), name)
+        globals()[name] = value
+        return value
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+def __dir__():
+    return sorted(set(globals()) | set(_LAZY))
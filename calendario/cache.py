@@ -0,0 +1,113 @@
+# ─────────────────────────────────────────────────────────────────────────────
+# Caché de ocurrencias por (usuario, consulta, versión de datos)
+# ─────────────────────────────────────────────────────────────────────────────
+
+import sys
+import threading
+import functools
+from collections import OrderedDict
+from typing import Callable, Dict
+
+from .db import get_data_version, db_path_for
+from .profiling import note_cache
+
+OCC_CACHE_MAX_BYTES = 64 * 1024 * 1024
+# Figuras de plotly: sys.getsizeof no ve su contenido (~56 B) y medirlas en serio
+# (to_json) cuesta tanto como armarlas. Van a un caché aparte acotado en cantidad;
+# cada figura semanal retiene ~150-300 KB.
+FIGURE_CACHE_MAX = 32
+
+APPROX_SAMPLE = 32   # elementos medidos en listas largas; el resto se extrapola
+
+def approx_size(value, _seen=None) -> int:
+    # Recorre dicts, listas/tuplas y objetos con __slots__ (las respuestas JSON del
+    # servicio son dicts anidados), contando una vez lo compartido (títulos,
+    # categorías). En listas largas mide una muestra pareja y extrapola.
+    if _seen is None:
+        _seen = set()
+    if id(value) in _seen:
+        return 0
+    _seen.add(id(value))
+    if hasattr(value, "memory_usage"):          # DataFrame, sin importar pandas aquí
+        return int(value.memory_usage(index=True, deep=True).sum())
+    if isinstance(value, dict):
+        return sys.getsizeof(value) + sum(approx_size(k, _seen) + approx_size(v, _seen) for k, v in value.items())
+    if isinstance(value, (list, tuple)):
+        if not value:
+            return sys.getsizeof(value)
+        sample = value[::max(1, len(value) // APPROX_SAMPLE)]
+        return sys.getsizeof(value) + sum(approx_size(v, _seen) for v in sample) * len(value) // len(sample)
+    if hasattr(value, "__slots__"):
+        return sys.getsizeof(value) + sum(approx_size(getattr(value, k, None), _seen) for k in value.__slots__)
+    return sys.getsizeof(value)
+
+class OccurrenceCache:
+    # max_bytes en las unidades de `sizer` (bytes con approx_size, entradas con lambda v: 1)
+    def __init__(self, max_bytes: int = OCC_CACHE_MAX_BYTES, sizer: Callable[[object], int] = approx_size):
+        self.max_bytes = max_bytes
+        self.sizer = sizer
+        self._data = OrderedDict()   # key -> (valor, bytes)
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get_or_compute(self, key, compute):
+        with self._lock:
+            if key in self._data:
+                self._data.move_to_end(key)
+                self.hits += 1
+                return self._data[key][0]
+            self.misses += 1
+        value = compute()
+        size = self.sizer(value)
+        with self._lock:
+            if key in self._data:
+                self._bytes -= self._data.pop(key)[1]
+            if size <= self.max_bytes:
+                self._data[key] = (value, size)
+                self._bytes += size
+                while self._bytes > self.max_bytes:
+                    self._bytes -= self._data.popitem(last=False)[1][1]
+        return value
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self._bytes = 0
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses,
+                    "entries": len(self._data), "bytes": self._bytes, "max_bytes": self.max_bytes}
+
+_occ_cache = OccurrenceCache()
+_figure_cache = OccurrenceCache(FIGURE_CACHE_MAX, sizer=lambda value: 1)
+
+def get_occ_cache() -> OccurrenceCache:
+    return _occ_cache
+
+def get_figure_cache() -> OccurrenceCache:
+    return _figure_cache
+
+def _versioned(fn, get_cache: Callable[[], OccurrenceCache]):
+    @functools.wraps(fn)
+    def wrapper(user_id: str, *args):
+        # La ruta va en la clave: otra base (configure, otra partición) arranca en
+        # versión 0 y no debe recibir lo calculado para la anterior
+        key = (fn.__name__, db_path_for(user_id), user_id, args, get_data_version(user_id))
+        computed = []
+        value = get_cache().get_or_compute(key, lambda: computed.append(1) or fn(user_id, *args))
+        note_cache(not computed)
+        return list(value) if isinstance(value, list) else value
+    wrapper.uncached = fn
+    return wrapper
+
+def versioned_cache(fn):
+    # Memoiza fn(user_id, *args) por versión de datos del usuario. Los DataFrames
+    # se comparten entre sesiones: tratarlos como solo lectura.
+    return _versioned(fn, get_occ_cache)
+
+def versioned_figure_cache(fn):
+    # Igual, en el caché de figuras (FIGURE_CACHE_MAX entradas)
+    return _versioned(fn, get_figure_cache)
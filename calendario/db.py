@@ -0,0 +1,303 @@
+# ─────────────────────────────────────────────────────────────────────────────
+# DB: pool de conexiones, transacciones y versión de datos por usuario
+# ─────────────────────────────────────────────────────────────────────────────
+
+import os
+import re
+import glob
+import json
+import queue
+import sqlite3
+import hashlib
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Callable, List, Optional
+
+from .profiling import VM_STEP, current_record, timed
+
+DB_PATH = "planner.db"
+
+# Modo particionado (opcional): cada usuario, o cada balde de usuarios, vive en su
+# propio archivo dentro de SHARD_DIR, con su propio lock de escritura. Así una
+# importación grande de un usuario no frena los guardados de los demás.
+# SHARD_BUCKETS = 0 → un archivo por usuario. "" = una sola base en DB_PATH.
+SHARD_DIR = os.environ.get("CALENDARIO_SHARD_DIR", "")
+SHARD_BUCKETS = int(os.environ.get("CALENDARIO_SHARD_BUCKETS", "16"))
+
+# Pool de conexiones: una por hilo activo como máximo, reutilizadas entre reruns.
+# Cada conexión es de larga vida, así que el caché de sentencias de sqlite3
+# (cached_statements) reaprovecha las consultas ya preparadas.
+SQLITE_PRAGMAS = (
+    "PRAGMA journal_mode=WAL",       # lectores no bloquean al escritor
+    "PRAGMA synchronous=NORMAL",     # seguro con WAL, sin fsync por commit
+    "PRAGMA cache_size=-16000",      # ~16 MB de caché de páginas
+    "PRAGMA mmap_size=134217728",    # 128 MB mapeados en memoria
+    "PRAGMA temp_store=MEMORY",
+    "PRAGMA busy_timeout=5000",
+)
+
+class ConnectionPool:
+    def __init__(self, path: str, size: int = 8):
+        self.path = path
+        self.size = size
+        self._idle = queue.LifoQueue()
+        self._created = 0
+        self.in_use = 0
+        self.closed = False
+        self._lock = threading.Lock()
+
+    def _connect(self) -> sqlite3.Connection:
+        con = sqlite3.connect(self.path, timeout=30, check_same_thread=False,
+                              isolation_level=None, cached_statements=256)
+        for pragma in SQLITE_PRAGMAS:
+            con.execute(pragma)
+        return con
+
+    def acquire(self) -> sqlite3.Connection:
+        with self._lock:
+            self.in_use += 1
+            closed = self.closed
+        try:
+            if closed:
+                # Pool ya desalojado (get_pool lo devolvió justo antes): conexión
+                # suelta, que release cierra
+                return self._connect()
+            return self._checkout()
+        except BaseException:
+            with self._lock:
+                self.in_use -= 1
+            raise
+
+    def _checkout(self) -> sqlite3.Connection:
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+        with self._lock:
+            can_create = self._created < self.size
+            if can_create:
+                self._created += 1
+        if can_create:
+            try:
+                return self._connect()
+            except Exception:
+                with self._lock:
+                    self._created -= 1
+                raise
+        return self._idle.get()
+
+    def release(self, con: sqlite3.Connection):
+        with self._lock:
+            self.in_use -= 1
+            if not self.closed:
+                self._idle.put(con)
+                return
+        con.close()
+
+    def close(self):
+        with self._lock:
+            self.closed = True
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except queue.Empty:
+                break
+
+# Un pool por ruta y por proceso (Streamlit importa el paquete una sola vez y lo
+# comparte entre sesiones y reruns). Con un archivo por usuario habría un pool por
+# cada usuario visto, y cada conexión retiene db, -wal y -shm abiertos: se guardan
+# a lo sumo POOL_MAX_OPEN y se cierran los menos usados que estén ociosos.
+POOL_MAX_OPEN = int(os.environ.get("CALENDARIO_MAX_POOLS", "64"))
+_pools: "OrderedDict[str, ConnectionPool]" = OrderedDict()
+_pools_lock = threading.Lock()
+
+# Se llama con una conexión (dentro de una transacción) cada vez que el proceso
+# abre un archivo de partición; storage registra ahí la creación del esquema.
+# `is_current` (fuera de transacción) evita la escritura si el archivo ya está al
+# día: un pool desalojado y vuelto a abrir no toma el lock de escritura.
+_shard_init: Optional[Callable[[sqlite3.Connection], None]] = None
+_shard_current: Optional[Callable[[sqlite3.Connection], bool]] = None
+
+def set_shard_init(fn: Callable[[sqlite3.Connection], None],
+                   is_current: Optional[Callable[[sqlite3.Connection], bool]] = None):
+    global _shard_init, _shard_current
+    _shard_init, _shard_current = fn, is_current
+
+def _init_shard(pool: ConnectionPool):
+    os.makedirs(os.path.dirname(pool.path) or ".", exist_ok=True)
+    con = pool.acquire()
+    try:
+        if _shard_current is not None and _shard_current(con):
+            return
+        con.execute("BEGIN IMMEDIATE")
+        _shard_init(con)
+        con.execute("COMMIT")
+    except BaseException:
+        if con.in_transaction:
+            con.execute("ROLLBACK")
+        raise
+    finally:
+        pool.release(con)
+
+def get_pool(path: str = None) -> ConnectionPool:
+    path = path or DB_PATH
+    with _pools_lock:
+        pool = _pools.get(path)
+        if pool is not None:
+            _pools.move_to_end(path)
+            return pool
+        pool = ConnectionPool(path)
+        if SHARD_DIR:
+            check_shard_layout()
+            if _shard_init is not None:
+                _init_shard(pool)
+        _pools[path] = pool
+        evicted = _evict_idle_pools()
+    for old in evicted:
+        old.close()
+    return pool
+
+def _evict_idle_pools() -> List[ConnectionPool]:
+    # Con _pools_lock tomado. Un pool con conexiones prestadas se saltea: se
+    # desalojará en una próxima apertura, cuando esté ocioso.
+    evicted = []
+    for path in list(_pools):
+        if len(_pools) <= POOL_MAX_OPEN:
+            break
+        if _pools[path].in_use == 0:
+            evicted.append(_pools.pop(path))
+    return evicted
+
+def open_pool_count() -> int:
+    return len(_pools)
+
+def configure(db_path: str, shard_dir: str = None, shard_buckets: int = None):
+    global DB_PATH, SHARD_DIR, SHARD_BUCKETS
+    DB_PATH = db_path
+    if shard_dir is not None:
+        SHARD_DIR = shard_dir
+    if shard_buckets is not None:
+        SHARD_BUCKETS = shard_buckets
+
+def get_db_path() -> str:
+    return DB_PATH
+
+def sharded() -> bool:
+    return bool(SHARD_DIR)
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Ruteo por usuario
+# ─────────────────────────────────────────────────────────────────────────────
+# El balde sale de sha1 (estable entre procesos, a diferencia de hash()).
+SHARD_GLOBS = ("shard_*.db", "user_*.db")
+
+def shard_name(user_id: str, buckets: int = None) -> str:
+    buckets = SHARD_BUCKETS if buckets is None else buckets
+    digest = hashlib.sha1(user_id.encode("utf-8")).hexdigest()
+    if buckets > 0:
+        return f"shard_{int(digest[:8], 16) % buckets:03d}.db"
+    # Un archivo por usuario: nombre legible + hash para que no choquen tras sanear
+    return f"user_{re.sub(r'[^A-Za-z0-9_-]', '_', user_id)[:40]}_{digest[:8]}.db"
+
+def db_path_for(user_id: str) -> str:
+    if not SHARD_DIR:
+        return DB_PATH
+    check_shard_layout()   # ya verificado: una comparación de tupla
+    return os.path.join(SHARD_DIR, shard_name(user_id))
+
+# La cantidad de baldes decide a qué archivo va cada usuario, así que queda
+# escrita en la carpeta (SHARD_META, la escribe split o la primera apertura). Un
+# proceso configurado con otra cantidad se niega a abrir particiones: si no, cada
+# usuario iría a un archivo nuevo y vacío y sus datos parecerían perdidos.
+SHARD_META = "shards.json"
+_layout_checked = None   # (carpeta, baldes) ya verificados en este proceso
+
+def read_shard_buckets(shard_dir: str) -> Optional[int]:
+    try:
+        with open(os.path.join(shard_dir, SHARD_META), encoding="utf-8") as f:
+            return int(json.load(f)["buckets"])
+    except FileNotFoundError:
+        return None
+
+def write_shard_buckets(shard_dir: str, buckets: int):
+    os.makedirs(shard_dir, exist_ok=True)
+    tmp = os.path.join(shard_dir, f".{SHARD_META}.{os.getpid()}")
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump({"buckets": buckets}, f)
+    os.replace(tmp, os.path.join(shard_dir, SHARD_META))
+
+def _buckets_fit_files(shard_dir: str, buckets: int) -> bool:
+    # Carpeta sin SHARD_META (anterior a él): los nombres de archivo tienen que
+    # poder venir de `buckets`
+    names = [os.path.basename(p) for pat in SHARD_GLOBS for p in glob.glob(os.path.join(shard_dir, pat))]
+    if buckets == 0:
+        return all(n.startswith("user_") for n in names)
+    return all(n.startswith("shard_") and int(n[6:-3]) < buckets for n in names)
+
+def check_shard_layout():
+    global _layout_checked
+    if not SHARD_DIR or _layout_checked == (SHARD_DIR, SHARD_BUCKETS):
+        return
+    recorded = read_shard_buckets(SHARD_DIR)
+    if recorded is None:
+        if not _buckets_fit_files(SHARD_DIR, SHARD_BUCKETS):
+            raise ValueError(f"Las particiones de {SHARD_DIR} no corresponden a "
+                             f"CALENDARIO_SHARD_BUCKETS={SHARD_BUCKETS} y la carpeta no tiene {SHARD_META}.")
+        write_shard_buckets(SHARD_DIR, SHARD_BUCKETS)
+    elif recorded != SHARD_BUCKETS:
+        raise ValueError(f"{SHARD_DIR} se particionó con {recorded} baldes pero "
+                         f"CALENDARIO_SHARD_BUCKETS={SHARD_BUCKETS}; usar el mismo valor.")
+    _layout_checked = (SHARD_DIR, SHARD_BUCKETS)
+
+def all_db_paths() -> List[str]:
+    # Bases existentes: la única, o cada partición ya creada en SHARD_DIR
+    if not SHARD_DIR:
+        return [DB_PATH]
+    return sorted({p for pat in SHARD_GLOBS for p in glob.glob(os.path.join(SHARD_DIR, pat))})
+
+@contextmanager
+def db(write: bool = False, user_id: str = None, path: str = None):
+    # Escrituras: BEGIN IMMEDIATE toma el lock de escritura al inicio (espera con
+    # busy_timeout) en vez de fallar con "database is locked" al promover el lock.
+    # Con particiones, cada llamada dice de qué usuario (o de qué archivo) se trata.
+    if path is None:
+        if user_id is None and SHARD_DIR:
+            raise ValueError("Con particiones activas db() necesita user_id o path.")
+        path = db_path_for(user_id) if user_id is not None else DB_PATH
+    pool = get_pool(path)
+    con = pool.acquire()
+    rec = current_record()
+    if rec is not None:
+        con.set_trace_callback(rec.count_query)
+        con.set_progress_handler(rec.count_vm_step, VM_STEP)
+    try:
+        if write:
+            con.execute("BEGIN IMMEDIATE")
+        yield con
+        if write:
+            con.execute("COMMIT")
+    except BaseException:
+        if con.in_transaction:
+            con.execute("ROLLBACK")
+        raise
+    finally:
+        if rec is not None:
+            con.set_trace_callback(None)
+            con.set_progress_handler(None, 0)
+        pool.release(con)
+
+# La versión vive en la tabla data_versions y se incrementa dentro de la misma
+# transacción que cada escritura; una clave de caché con versión vieja ya no se
+# consulta y termina saliendo por LRU.
+def bump_data_version(con: sqlite3.Connection, user_id: str):
+    con.execute("""
+        INSERT INTO data_versions(user_id, version) VALUES (?, 1)
+        ON CONFLICT(user_id) DO UPDATE SET version=version+1
+    """, (user_id,))
+
+@timed("db.get_data_version")
+def get_data_version(user_id: str) -> int:
+    with db(user_id=user_id) as con:
+        row = con.execute("SELECT version FROM data_versions WHERE user_id=?", (user_id,)).fetchone()
+    return row[0] if row else 0
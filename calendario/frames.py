@@ -0,0 +1,174 @@
+# ─────────────────────────────────────────────────────────────────────────────
+# Ocurrencias como DataFrame (numpy/pandas): vistas Mes/Año y benchmarks.
+# Este módulo no se importa con el núcleo; calendario lo carga al primer uso.
+# ─────────────────────────────────────────────────────────────────────────────
+
+import json
+from datetime import date, timedelta
+from typing import List, Dict
+
+import numpy as np
+import pandas as pd
+
+from .db import db
+from .cache import versioned_cache
+from .profiling import timed
+from .recurrence import Occurrence, MASK_DAYS, _hhmm_to_min
+from . import storage
+from .storage import list_compiled_in_range, extend_occ_window
+
+OCC_COLUMNS = ["id", "title", "category_id", "start", "end", "recurring"]
+ORDINAL_EPOCH = date(1970, 1, 1).toordinal()   # ordinal → datetime64[D]
+
+@timed("expand.expand_events_frame")
+@versioned_cache
+def expand_events_frame(user_id: str, start_d: date, end_d: date) -> pd.DataFrame:
+    # Expansión columnar: todas las definiciones a la vez con aritmética de
+    # ordinales, sin iterar día por día. Una fila por ocurrencia, ordenadas por inicio.
+    events = list_compiled_in_range(user_id, start_d, end_d)
+    s_ord, e_ord = start_d.toordinal(), end_d.toordinal()
+    # Un par (definición, día de semana) por día marcado; una puntual es una regla
+    # de un solo día, así que todo sale por el mismo camino con ordinales enteros.
+    pair_ev, pair_wd = [], []
+    for i, ev in enumerate(events):
+        for wd in MASK_DAYS[ev.mask]:
+            pair_ev.append(i); pair_wd.append(wd)
+    pair_ev = np.array(pair_ev, dtype=np.int64); pair_wd = np.array(pair_wd, dtype=np.int64)
+    ev_lo = np.array([ev.lo for ev in events], dtype=np.int64)
+    ev_hi = np.array([ev.hi for ev in events], dtype=np.int64)
+    lo = np.maximum(ev_lo, s_ord)[pair_ev]
+    hi = np.minimum(ev_hi, e_ord)[pair_ev]
+    # ordinal 1 fue lunes → weekday = (ordinal - 1) % 7
+    first = lo + (pair_wd - (lo - 1) % 7) % 7
+    counts = np.where(first <= hi, (hi - first) // 7 + 1, 0)
+    total = int(counts.sum())
+    owner = np.repeat(np.arange(len(pair_ev)), counts)
+    offsets = np.arange(total) - np.repeat(np.cumsum(counts) - counts, counts)
+    idx = pair_ev[owner]
+    days = (first[owner] + offsets * 7 - ORDINAL_EPOCH).astype("datetime64[D]")
+
+    s_min = np.array([ev.start_min for ev in events], dtype=np.int64)
+    e_min = np.array([ev.end_min for ev in events], dtype=np.int64)
+    base = days.astype("datetime64[m]")
+    data = {
+        "id": np.array([ev.id for ev in events], dtype=np.int64)[idx],
+        "title": np.array([ev.title for ev in events], dtype=object)[idx],
+        "category_id": np.array([ev.category_id for ev in events], dtype=object)[idx],
+        "start": base + s_min[idx].astype("timedelta64[m]"),
+        "end": base + e_min[idx].astype("timedelta64[m]"),
+        "recurring": np.array([ev.recurring for ev in events], dtype=bool)[idx],
+    }
+    order = np.argsort(data["start"], kind="stable")
+    df = pd.DataFrame({c: data[c][order] for c in OCC_COLUMNS})
+    df["category_id"] = df["category_id"].astype("Int64")
+    df["start"] = df["start"].astype("datetime64[ns]")
+    df["end"] = df["end"].astype("datetime64[ns]")
+    return df
+
+def occurrences_from_frame(df: pd.DataFrame, cats: Dict[int, Dict]) -> List[Occurrence]:
+    starts = df["start"].to_numpy().astype("datetime64[us]").tolist()
+    ends = df["end"].to_numpy().astype("datetime64[us]").tolist()
+    return [Occurrence(int(i), t, s, e, cats.get(c), bool(r))
+            for i, t, c, s, e, r in zip(df["id"], df["title"], df["category_id"], starts, ends, df["recurring"])]
+
+@timed("db.list_occurrences_materialized")
+def list_occurrences_materialized(user_id: str, start_d: date, end_d: date) -> pd.DataFrame:
+    with db(user_id=user_id) as con:
+        row = con.execute("SELECT since, until FROM occ_horizon WHERE user_id=?", (user_id,)).fetchone()
+    if not row or start_d < date.fromisoformat(row[0]) or end_d > date.fromisoformat(row[1]):
+        extend_occ_window(user_id, start_d, end_d)
+    with db(user_id=user_id) as con:
+        rows = con.execute("""
+            SELECT o.event_id, e.title, e.category_id, o.start, o.end, e.is_recurring
+            FROM occurrences o JOIN events e ON e.id = o.event_id
+            WHERE o.user_id=? AND o.start >= ? AND o.start < ?
+            ORDER BY o.start, o.event_id
+        """, (user_id, start_d.isoformat(), (end_d + timedelta(days=1)).isoformat())).fetchall()
+    df = pd.DataFrame(rows, columns=OCC_COLUMNS)
+    df["id"] = df["id"].astype(np.int64)
+    df["category_id"] = df["category_id"].astype("Int64")
+    df["start"] = pd.to_datetime(df["start"], format="%Y-%m-%dT%H:%M").astype("datetime64[ns]")
+    df["end"] = pd.to_datetime(df["end"], format="%Y-%m-%dT%H:%M").astype("datetime64[ns]")
+    df["recurring"] = df["recurring"].astype(bool)
+    return df
+
+@timed("frames.occurrences_frame")
+@versioned_cache
+def occurrences_frame(user_id: str, start_d: date, end_d: date) -> pd.DataFrame:
+    # Expansión calculada salvo que se haya optado por la tabla materializada
+    if storage.MATERIALIZE_OCCURRENCES:
+        return list_occurrences_materialized(user_id, start_d, end_d)
+    return expand_events_frame.uncached(user_id, start_d, end_d)
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Carga diaria agregada (vista Año)
+# ─────────────────────────────────────────────────────────────────────────────
+# Cantidad y minutos ocupados por (día, categoría) sin generar ocurrencias: las
+# puntuales se agrupan en SQL (índice cubriente idx_events_user_day) y cada regla
+# suma +1/−1 en un arreglo de diferencias por día de semana, que con un cumsum
+# cuenta cuántas reglas cubren cada día. El costo depende de la
+# cantidad de definiciones y de días, no de ocurrencias.
+LOAD_COLUMNS = ["date", "category_id", "count", "minutes"]
+
+DAILY_PUNCTUAL_SQL = """
+    SELECT date, category_id, COUNT(*),
+           SUM((substr(end_time,1,2)*60 + substr(end_time,4,2)) - (substr(start_time,1,2)*60 + substr(start_time,4,2)))
+    FROM events WHERE user_id=? AND date BETWEEN ? AND ? AND is_recurring=0
+    GROUP BY date, category_id
+"""
+
+DAILY_RULES_SQL = """
+    SELECT category_id, max(rr_start, ?), min(rr_end, ?), rrule
+    FROM events WHERE user_id=? AND rr_start <= ? AND rr_end >= ? AND is_recurring=1
+"""
+
+@timed("db.daily_load_range")
+@versioned_cache
+def daily_load_range(user_id: str, start_d: date, end_d: date) -> pd.DataFrame:
+    s, e = start_d.isoformat(), end_d.isoformat()
+    with db(user_id=user_id) as con:
+        pun = con.execute(DAILY_PUNCTUAL_SQL, (user_id, s, e)).fetchall()
+        rule_rows = con.execute(DAILY_RULES_SQL, (s, e, user_id, e, s)).fetchall()
+    # un par (regla, día de semana) por fila, con los minutos de la regla
+    rules = []
+    for cat_id, lo, hi, rr_json in rule_rows:
+        rr = json.loads(rr_json)
+        mins = _hhmm_to_min(rr["end_time"]) - _hhmm_to_min(rr["start_time"])
+        rules += [(cat_id, lo, hi, wd, mins) for wd in set(rr["days"])]
+    n_days = (end_d - start_d).days + 1
+    base = np.datetime64(start_d, "D")
+    # categorías: -1 = sin categoría
+    p_cat = np.array([-1 if r[1] is None else r[1] for r in pun], dtype=np.int64)
+    r_cat = np.array([-1 if r[0] is None else r[0] for r in rules], dtype=np.int64)
+    cat_ids, cat_idx = np.unique(np.concatenate([p_cat, r_cat]), return_inverse=True)
+    p_ci, r_ci = cat_idx[:len(pun)], cat_idx[len(pun):]
+    count = np.zeros((len(cat_ids), n_days), dtype=np.int64)
+    minutes = np.zeros((len(cat_ids), n_days), dtype=np.int64)
+
+    if pun:
+        p_day = (np.array([r[0] for r in pun], dtype="datetime64[D]") - base).astype(np.int64)
+        np.add.at(count, (p_ci, p_day), np.array([r[2] for r in pun], dtype=np.int64))
+        np.add.at(minutes, (p_ci, p_day), np.array([r[3] for r in pun], dtype=np.int64))
+    if rules:
+        lo = (np.array([r[1] for r in rules], dtype="datetime64[D]") - base).astype(np.int64)
+        hi = (np.array([r[2] for r in rules], dtype="datetime64[D]") - base).astype(np.int64)
+        wd = np.array([r[3] for r in rules], dtype=np.int64)
+        mins = np.array([r[4] for r in rules], dtype=np.int64)
+        diff_n = np.zeros((len(cat_ids), 7, n_days + 1), dtype=np.int64)
+        diff_m = np.zeros((len(cat_ids), 7, n_days + 1), dtype=np.int64)
+        np.add.at(diff_n, (r_ci, wd, lo), 1); np.add.at(diff_n, (r_ci, wd, hi + 1), -1)
+        np.add.at(diff_m, (r_ci, wd, lo), mins); np.add.at(diff_m, (r_ci, wd, hi + 1), -mins)
+        day = np.arange(n_days)
+        day_wd = (start_d.weekday() + day) % 7
+        count += diff_n.cumsum(axis=2)[:, day_wd, day]
+        minutes += diff_m.cumsum(axis=2)[:, day_wd, day]
+
+    ci, di = np.nonzero(count)
+    df = pd.DataFrame({"date": (base + di.astype("timedelta64[D]")).astype("datetime64[ns]"),
+                       "category_id": pd.array(cat_ids[ci], dtype="Int64"),
+                       "count": count[ci, di], "minutes": minutes[ci, di]})
+    df.loc[df["category_id"] == -1, "category_id"] = pd.NA
+    return df.sort_values(["date", "category_id"], ignore_index=True)
+
+def daily_load(user_id: str, year: int) -> pd.DataFrame:
+    return daily_load_range(user_id, date(year, 1, 1), date(year, 12, 31))
@@ -0,0 +1,300 @@
+# ─────────────────────────────────────────────────────────────────────────────
+# Exportación ICS / CSV (en streaming)
+# ─────────────────────────────────────────────────────────────────────────────
+
+import io
+import re
+import csv
+import json
+from datetime import datetime, date, time, timedelta, timezone
+from time import perf_counter
+from typing import Dict, Optional
+
+from .db import db
+from .recurrence import first_rule_date
+from .storage import list_categories, upsert_category, event_fingerprint, _validate_event_row, add_events_bulk
+
+# Las reglas semanales salen como un VEVENT con RRULE nativa (sin expandir) y las
+# filas se leen del cursor de a una: la memoria no depende del tamaño del calendario.
+ICS_DAYS = ["MO", "TU", "WE", "TH", "FR", "SA", "SU"]
+CSV_COLUMNS = ["id", "title", "category", "type", "date", "start_time", "end_time", "days", "start_date", "end_date"]
+
+def iter_event_definitions(user_id: str):
+    with db(user_id=user_id) as con:
+        cur = con.execute("""
+            SELECT id, title, category_id, date, start_time, end_time, is_recurring, rrule, created_at
+            FROM events WHERE user_id=? ORDER BY id
+        """, (user_id,))
+        try:
+            yield from cur
+        finally:
+            # Si el consumidor corta la exportación a medias (close() o GC), el
+            # cursor queda sin terminar: cerrarlo antes de devolver la conexión al
+            # pool, o su próximo BEGIN IMMEDIATE falla con "database is locked".
+            cur.close()
+
+def _ics_escape(text: str) -> str:
+    return (text.replace("\\", "\\\\").replace(";", "\\;").replace(",", "\\,")
+            .replace("\r\n", "\\n").replace("\n", "\\n"))
+
+def _ics_line(line: str) -> str:
+    # RFC 5545: líneas de máx. 75 octetos, continuadas con CRLF + espacio
+    raw = line.encode("utf-8")
+    if len(raw) <= 75:
+        return line + "\r\n"
+    parts, start, limit = [], 0, 75
+    while start < len(raw):
+        end = min(start + limit, len(raw))
+        while end < len(raw) and (raw[end] & 0xC0) == 0x80:   # no cortar un carácter UTF-8
+            end -= 1
+        parts.append(raw[start:end].decode("utf-8"))
+        start, limit = end, 74
+    return "\r\n ".join(parts) + "\r\n"
+
+def _ics_dt(d: str, t: str) -> str:
+    return d.replace("-", "") + "T" + t.replace(":", "") + "00"
+
+def iter_ics(user_id: str):
+    cats = {c["id"]: c["name"] for c in list_categories(user_id)}
+    stamp = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+    yield "BEGIN:VCALENDAR\r\nVERSION:2.0\r\nPRODID:-//CalendarioCherie//Planner//ES\r\nCALSCALE:GREGORIAN\r\n"
+    for ev_id, title, cat_id, d, s_t, e_t, is_rec, rr_json, _ in iter_event_definitions(user_id):
+        lines = ["BEGIN:VEVENT", f"UID:{ev_id}-{user_id}@calendariocherie", f"DTSTAMP:{stamp}",
+                 f"SUMMARY:{_ics_escape(title or '')}"]
+        if cat_id in cats:
+            lines.append(f"CATEGORIES:{_ics_escape(cats[cat_id])}")
+        if is_rec:
+            rr = json.loads(rr_json)
+            first = first_rule_date(rr["days"], date.fromisoformat(rr["start_date"]), date.fromisoformat(rr["end_date"]))
+            if first is None:
+                continue
+            byday = ",".join(ICS_DAYS[i] for i in sorted(rr["days"]))
+            lines += [f"DTSTART:{_ics_dt(first.isoformat(), rr['start_time'])}",
+                      f"DTEND:{_ics_dt(first.isoformat(), rr['end_time'])}",
+                      f"RRULE:FREQ=WEEKLY;BYDAY={byday};UNTIL={_ics_dt(rr['end_date'], '23:59')}"]
+        elif d:
+            lines += [f"DTSTART:{_ics_dt(d, s_t)}", f"DTEND:{_ics_dt(d, e_t)}"]
+        else:
+            continue
+        lines.append("END:VEVENT")
+        yield "".join(_ics_line(l) for l in lines)
+    yield "END:VCALENDAR\r\n"
+
+def iter_csv(user_id: str):
+    cats = {c["id"]: c["name"] for c in list_categories(user_id)}
+    buf = io.StringIO()
+    writer = csv.writer(buf)
+    writer.writerow(CSV_COLUMNS)
+    for ev_id, title, cat_id, d, s_t, e_t, is_rec, rr_json, _ in iter_event_definitions(user_id):
+        if is_rec:
+            rr = json.loads(rr_json)
+            writer.writerow([ev_id, title, cats.get(cat_id, ""), "recurrente", "", rr["start_time"], rr["end_time"],
+                             " ".join(str(i) for i in rr["days"]), rr["start_date"], rr["end_date"]])
+        else:
+            writer.writerow([ev_id, title, cats.get(cat_id, ""), "puntual", d, s_t, e_t, "", "", ""])
+        yield buf.getvalue()
+        buf.seek(0); buf.truncate()
+    if buf.tell():
+        yield buf.getvalue()
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Importación ICS / CSV (en streaming, por lotes)
+# ─────────────────────────────────────────────────────────────────────────────
+# El archivo se lee línea a línea y se escribe cada IMPORT_BATCH_SIZE eventos con
+# add_events_bulk; los duplicados se descartan por huella (idx_events_user_fp),
+# tanto contra la base como dentro del lote en curso.
+IMPORT_BATCH_SIZE = 2000
+IMPORT_DEFAULT_COLOR = "#4C78A8"
+IMPORT_OPEN_RULE_DAYS = 365      # reglas sin UNTIL/COUNT: un año desde su inicio
+
+def _iter_ics_lines(fp):
+    # Desdobla las líneas continuadas (RFC 5545 §3.1) sin leer todo el archivo
+    pending = None
+    for raw in fp:
+        line = raw.rstrip("\r\n")
+        if line[:1] in (" ", "\t") and pending is not None:
+            pending += line[1:]
+            continue
+        if pending is not None:
+            yield pending
+        pending = line
+    if pending:
+        yield pending
+
+def _ics_unescape(text: str) -> str:
+    if "\\" not in text:
+        return text
+    out, i = [], 0
+    while i < len(text):
+        ch = text[i]
+        if ch == "\\" and i + 1 < len(text):
+            nxt = text[i + 1]
+            out.append("\n" if nxt in "nN" else nxt)
+            i += 2
+        else:
+            out.append(ch); i += 1
+    return "".join(out)
+
+def iter_ics_vevents(fp):
+    # Un dict {NOMBRE: (params, valor)} por VEVENT (la primera aparición de cada propiedad)
+    current = None
+    for line in _iter_ics_lines(fp):
+        if line == "BEGIN:VEVENT":
+            current = {}
+        elif line == "END:VEVENT":
+            if current is not None:
+                yield current
+            current = None
+        elif current is not None and ":" in line:
+            head, value = line.split(":", 1)
+            name, *params = head.split(";")
+            current.setdefault(name.upper(), (dict(p.split("=", 1) for p in params if "=" in p), value))
+
+def _parse_ics_dt(params: Dict, value: str) -> Optional[datetime]:
+    if params.get("VALUE") == "DATE" or len(value) == 8:
+        return None                                   # eventos de día completo: no se representan
+    dt = datetime(int(value[0:4]), int(value[4:6]), int(value[6:8]),
+                  int(value[9:11]), int(value[11:13]), int(value[13:15]))
+    if value.endswith("Z"):
+        dt = dt.replace(tzinfo=timezone.utc).astimezone().replace(tzinfo=None)
+    return dt
+
+def _parse_ics_duration(value: str) -> Optional[timedelta]:
+    m = re.fullmatch(r"P(?:(\d+)W)?(?:(\d+)D)?(?:T(?:(\d+)H)?(?:(\d+)M)?(?:(\d+)S)?)?", value)
+    if not m:
+        return None
+    w, d, h, mi, s = (int(x) if x else 0 for x in m.groups())
+    return timedelta(weeks=w, days=d, hours=h, minutes=mi, seconds=s)
+
+def _ics_vevent_to_row(ev: Dict) -> Optional[Dict]:
+    # Un VEVENT con fechas, INTERVAL, COUNT o UNTIL mal formados (o fuera del rango
+    # de date) se omite, como una fila de CSV inválida, en lugar de cortar la
+    # importación entera
+    try:
+        return _ics_vevent_fields(ev)
+    except (ValueError, KeyError, IndexError, OverflowError):
+        return None
+
+def _ics_vevent_fields(ev: Dict) -> Optional[Dict]:
+    if "DTSTART" not in ev:
+        return None
+    start = _parse_ics_dt(*ev["DTSTART"])
+    if start is None:
+        return None
+    if "DTEND" in ev:
+        end = _parse_ics_dt(*ev["DTEND"])
+    elif "DURATION" in ev:
+        dur = _parse_ics_duration(ev["DURATION"][1])
+        end = start + dur if dur else None
+    else:
+        end = None
+    if end is None or end.date() != start.date() or end <= start:
+        return None                                   # sin fin o cruza la medianoche
+    row = {"title": _ics_unescape(ev.get("SUMMARY", ({}, ""))[1]) or "(sin título)",
+           "category": _ics_unescape(re.split(r"(?<!\\),", ev["CATEGORIES"][1])[0]).strip() if "CATEGORIES" in ev else "",
+           "start": start.time().replace(second=0), "end": end.time().replace(second=0)}
+    if "RRULE" not in ev:
+        row["date"] = start.date()
+        return row
+    rule = dict(p.split("=", 1) for p in ev["RRULE"][1].split(";") if "=" in p)
+    freq, interval = rule.get("FREQ"), int(rule.get("INTERVAL", "1"))
+    if interval != 1 or freq not in ("WEEKLY", "DAILY"):
+        return None                                   # solo reglas semanales (o diarias) simples
+    if freq == "DAILY":
+        days = list(range(7))
+    elif "BYDAY" in rule:
+        codes = rule["BYDAY"].split(",")
+        if any(c not in ICS_DAYS for c in codes):
+            return None
+        days = sorted({ICS_DAYS.index(c) for c in codes})
+    else:
+        days = [start.weekday()]
+    start_date = start.date()
+    if "UNTIL" in rule:
+        until = rule["UNTIL"]
+        end_date = (_parse_ics_dt({}, until) or datetime.strptime(until[:8], "%Y%m%d")).date()
+    elif "COUNT" in rule:
+        # n-ésima fecha de la regla desde start_date: semanas completas y el resto
+        # dentro de la semana, sin recorrer días (un COUNT enorme desborda date y se omite)
+        n = int(rule["COUNT"])
+        offsets = sorted((wd - start_date.weekday()) % 7 for wd in days)
+        if n > 0:
+            weeks, k = divmod(n - 1, len(offsets))
+            end_date = start_date + timedelta(days=7 * weeks + offsets[k])
+        else:
+            end_date = start_date
+    else:
+        end_date = start_date + timedelta(days=IMPORT_OPEN_RULE_DAYS)
+    row.update({"days": days, "start_date": start_date, "end_date": end_date})
+    return row
+
+def _csv_record_to_row(rec: Dict) -> Optional[Dict]:
+    try:
+        row = {"title": rec["title"], "category": rec.get("category", ""),
+               "start": time.fromisoformat(rec["start_time"]), "end": time.fromisoformat(rec["end_time"])}
+        if rec.get("type") == "recurrente":
+            row.update({"days": [int(x) for x in rec["days"].split()],
+                        "start_date": date.fromisoformat(rec["start_date"]),
+                        "end_date": date.fromisoformat(rec["end_date"])})
+        else:
+            row["date"] = date.fromisoformat(rec["date"])
+    except (KeyError, ValueError, AttributeError):
+        return None
+    return row
+
+def import_calendar(user_id: str, fp, fmt: str, batch_size: int = IMPORT_BATCH_SIZE, progress=None) -> Dict:
+    # fp: flujo de texto (p.ej. io.TextIOWrapper sobre el archivo subido); fmt: "ics" o "csv"
+    t0 = perf_counter()
+    stats = {"read": 0, "inserted": 0, "duplicates": 0, "skipped": 0}
+    cat_ids = {c["name"]: c["id"] for c in list_categories(user_id)}
+    if fmt == "ics":
+        rows = (_ics_vevent_to_row(ev) for ev in iter_ics_vevents(fp))
+    else:
+        rows = (_csv_record_to_row(rec) for rec in csv.DictReader(fp))
+
+    def flush(batch):
+        fps = [event_fingerprint(r) for r in batch]
+        for r, f in zip(batch, fps):
+            r["fingerprint"] = f
+        existing = set()
+        with db(user_id=user_id) as con:
+            for i in range(0, len(fps), 500):
+                chunk = fps[i:i + 500]
+                existing.update(r[0] for r in con.execute(
+                    f"SELECT fingerprint FROM events WHERE user_id=? AND fingerprint IN ({','.join('?' * len(chunk))})",
+                    (user_id, *chunk)))
+        fresh = []
+        for r, f in zip(batch, fps):
+            if f in existing:
+                stats["duplicates"] += 1
+            else:
+                existing.add(f)
+                fresh.append(r)
+        stats["inserted"] += len(add_events_bulk(user_id, fresh))
+        if progress:
+            progress(dict(stats))
+
+    batch = []
+    for row in rows:
+        stats["read"] += 1
+        if row is None:
+            stats["skipped"] += 1
+            continue
+        name = row.pop("category")
+        if name and name not in cat_ids:
+            upsert_category(user_id, name, IMPORT_DEFAULT_COLOR)
+            cat_ids = {c["name"]: c["id"] for c in list_categories(user_id)}
+        row["category_id"] = cat_ids.get(name)
+        try:
+            _validate_event_row(stats["read"], row)
+        except ValueError:
+            stats["skipped"] += 1
+            continue
+        batch.append(row)
+        if len(batch) >= batch_size:
+            flush(batch); batch = []
+    if batch:
+        flush(batch)
+    stats["seconds"] = round(perf_counter() - t0, 3)
+    stats["events_per_s"] = round(stats["read"] / stats["seconds"], 1) if stats["seconds"] else None
+    return stats
@@ -0,0 +1,211 @@
+# ─────────────────────────────────────────────────────────────────────────────
+# Mantenimiento de bases: migraciones, VACUUM, integridad, estadísticas y partición
+# ─────────────────────────────────────────────────────────────────────────────
+# Cada comando corre sobre todas las bases (la única o cada partición) en un pool
+# de procesos: VACUUM e integrity_check recorren el archivo entero y no comparten
+# nada entre particiones. Los workers reciben rutas (no estado global) y abren
+# sus propias conexiones sqlite3, sin pasar por el pool del proceso.
+#
+# Uso:
+#   python -m calendario.maintenance --shard-dir shards migrate
+#   python -m calendario.maintenance --shard-dir shards vacuum
+#   python -m calendario.maintenance --db planner.db integrity --quick
+#   python -m calendario.maintenance --shard-dir shards stats
+#   python -m calendario.maintenance split planner.db shards --buckets 16
+#   (después: CALENDARIO_SHARD_DIR=shards CALENDARIO_SHARD_BUCKETS=16 streamlit run app.py; la
+#   cantidad de baldes queda en shards/shards.json y la app no arranca con otra)
+#
+# split copia cada usuario de una base única a su partición conservando los ids
+# (eventos, categorías), así que las referencias entre tablas siguen valiendo.
+# Correrlo con la app detenida; la base original no se modifica (salvo migrarla).
+
+import os
+import glob
+import json
+import sqlite3
+import argparse
+import functools
+from time import perf_counter
+from concurrent.futures import ProcessPoolExecutor
+from typing import Callable, Dict, List
+
+from .db import (SQLITE_PRAGMAS, SHARD_GLOBS, SHARD_META, configure, get_db_path, all_db_paths, shard_name,
+                 write_shard_buckets)
+from .storage import create_schema, schema_version
+
+MAINTENANCE_WORKERS = os.cpu_count() or 2
+
+# Tablas con datos de usuario y la columna que dice de quién es cada fila
+USER_TABLES = (("users", "id"), ("categories", "user_id"), ("events", "user_id"),
+               ("priorities", "user_id"), ("data_versions", "user_id"),
+               ("occurrences", "user_id"), ("occ_horizon", "user_id"))
+
+def _connect(path: str) -> sqlite3.Connection:
+    con = sqlite3.connect(path, timeout=30, isolation_level=None)
+    for pragma in SQLITE_PRAGMAS:
+        con.execute(pragma)
+    return con
+
+def _file_bytes(path: str) -> int:
+    return sum(os.path.getsize(p) for p in (path, path + "-wal") if os.path.exists(p))
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Trabajos por base (funciones de módulo: se envían a los workers por nombre)
+# ─────────────────────────────────────────────────────────────────────────────
+def migrate_one(path: str) -> Dict:
+    con = _connect(path)
+    try:
+        before = schema_version(con)
+        con.execute("BEGIN IMMEDIATE")
+        create_schema(con)
+        con.execute("COMMIT")
+        after = schema_version(con)
+    finally:
+        con.close()
+    return {"path": path, "ok": True, "version_before": before, "version": after}
+
+def vacuum_one(path: str) -> Dict:
+    before = _file_bytes(path)
+    con = _connect(path)
+    try:
+        con.execute("VACUUM")
+        con.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+        con.execute("PRAGMA optimize")
+    finally:
+        con.close()
+    return {"path": path, "ok": True, "bytes_before": before, "bytes_after": _file_bytes(path)}
+
+def integrity_one(path: str, quick: bool = False) -> Dict:
+    con = _connect(path)
+    try:
+        problems = [r[0] for r in con.execute("PRAGMA quick_check" if quick else "PRAGMA integrity_check")]
+        problems += [f"FK {r}" for r in con.execute("PRAGMA foreign_key_check")]
+    finally:
+        con.close()
+    ok = problems == ["ok"]
+    return {"path": path, "ok": ok, "problems": [] if ok else problems}
+
+def stats_one(path: str) -> Dict:
+    con = _connect(path)
+    try:
+        one = lambda sql: con.execute(sql).fetchone()[0]
+        out = {"path": path, "ok": True, "bytes": _file_bytes(path),
+               "pages": one("PRAGMA page_count"), "free_pages": one("PRAGMA freelist_count"),
+               "users": one("SELECT COUNT(*) FROM users"),
+               "punctual": one("SELECT COUNT(*) FROM events WHERE is_recurring=0"),
+               "rules": one("SELECT COUNT(*) FROM events WHERE is_recurring=1"),
+               "occurrences": one("SELECT COUNT(*) FROM occurrences")}
+    finally:
+        con.close()
+    return out
+
+def _guarded(fn: Callable[[str], Dict], path: str) -> Dict:
+    # Un archivo roto no corta el comando: su error queda en el resultado
+    t0 = perf_counter()
+    try:
+        res = fn(path)
+    except Exception as e:
+        res = {"path": path, "ok": False, "error": f"{type(e).__name__}: {e}"}
+    res["ms"] = round((perf_counter() - t0) * 1000, 1)
+    return res
+
+def run_all(fn: Callable[[str], Dict], paths: List[str], jobs: int = MAINTENANCE_WORKERS) -> List[Dict]:
+    # Con una sola base (o jobs=1) corre en el proceso actual, sin pagar el arranque del pool
+    task = functools.partial(_guarded, fn)
+    if len(paths) <= 1 or jobs <= 1:
+        return [task(p) for p in paths]
+    with ProcessPoolExecutor(max_workers=min(jobs, len(paths))) as pool:
+        return list(pool.map(task, paths))
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Base única → particiones
+# ─────────────────────────────────────────────────────────────────────────────
+def list_source_users(con: sqlite3.Connection) -> List[str]:
+    union = " UNION ".join(f"SELECT {col} AS u FROM {t}" for t, col in USER_TABLES)
+    return [r[0] for r in con.execute(f"SELECT u FROM ({union}) WHERE u IS NOT NULL ORDER BY u")]
+
+def copy_users(source: str, target: str, users: List[str]) -> Dict:
+    # Crea la partición `target` (o la completa) con las filas de `users` en `source`
+    con = _connect(target)
+    try:
+        con.execute("ATTACH DATABASE ? AS src", (source,))
+        con.execute("BEGIN IMMEDIATE")
+        create_schema(con)
+        con.execute("CREATE TEMP TABLE moving(user_id TEXT PRIMARY KEY)")
+        con.executemany("INSERT INTO temp.moving VALUES (?)", ((u,) for u in users))
+        copied = {}
+        for table, col in USER_TABLES:
+            cols = ", ".join(r[1] for r in con.execute(f"PRAGMA main.table_info({table})"))
+            cur = con.execute(f"INSERT INTO main.{table}({cols}) SELECT {cols} FROM src.{table} "
+                              f"WHERE {col} IN (SELECT user_id FROM temp.moving)")
+            copied[table] = cur.rowcount
+        con.execute("DROP TABLE temp.moving")
+        con.execute("COMMIT")
+        con.execute("DETACH DATABASE src")
+    finally:
+        con.close()
+    return {"path": target, "ok": True, "users": len(users), "rows": copied}
+
+def split_database(source: str, shard_dir: str, buckets: int, jobs: int = MAINTENANCE_WORKERS) -> Dict:
+    if not os.path.exists(source):
+        raise FileNotFoundError(source)
+    os.makedirs(shard_dir, exist_ok=True)
+    if (any(glob.glob(os.path.join(shard_dir, pat)) for pat in SHARD_GLOBS)
+            or os.path.exists(os.path.join(shard_dir, SHARD_META))):
+        raise ValueError(f"{shard_dir} ya tiene particiones; usar una carpeta vacía.")
+    migrate_one(source)   # columnas y tablas al día antes de copiar por nombre
+    con = _connect(source)
+    try:
+        users = list_source_users(con)
+        expected = {t: con.execute(f"SELECT COUNT(*) FROM {t}").fetchone()[0] for t, _ in USER_TABLES}
+    finally:
+        con.close()
+    groups: Dict[str, List[str]] = {}
+    for u in users:
+        groups.setdefault(os.path.join(shard_dir, shard_name(u, buckets)), []).append(u)
+    shards = list(groups.items())
+    if len(shards) <= 1 or jobs <= 1:
+        results = [copy_users(source, target, us) for target, us in shards]
+    else:
+        with ProcessPoolExecutor(max_workers=min(jobs, len(shards))) as pool:
+            results = list(pool.map(copy_users, [source] * len(shards), *zip(*shards)))
+    write_shard_buckets(shard_dir, buckets)   # la app se niega a abrirla con otra cantidad
+    copied = {t: sum(r["rows"][t] for r in results) for t, _ in USER_TABLES}
+    # Filas sin dueño (user_id NULL) no tienen partición: quedan afuera y se informan
+    return {"source": source, "shard_dir": shard_dir, "buckets": buckets, "users": len(users),
+            "shards": len(results), "rows": copied, "missing": {t: expected[t] - copied[t] for t in copied
+                                                                 if expected[t] != copied[t]}}
+
+COMMANDS = {"migrate": migrate_one, "vacuum": vacuum_one, "integrity": integrity_one, "stats": stats_one}
+
+def main():
+    ap = argparse.ArgumentParser(description="Mantenimiento de la base del planner (o de sus particiones).")
+    ap.add_argument("--db", default="", help="ruta de planner.db (modo de base única)")
+    ap.add_argument("--shard-dir", default=None, help="carpeta de particiones")
+    ap.add_argument("--jobs", type=int, default=MAINTENANCE_WORKERS, help="procesos en paralelo")
+    sub = ap.add_subparsers(dest="command", required=True)
+    for name in COMMANDS:
+        p = sub.add_parser(name)
+        if name == "integrity":
+            p.add_argument("--quick", action="store_true", help="quick_check en lugar de integrity_check")
+    p = sub.add_parser("split", help="reparte una base única en particiones")
+    p.add_argument("source")
+    p.add_argument("target_dir")
+    p.add_argument("--buckets", type=int, default=16, help="0 = un archivo por usuario")
+    args = ap.parse_args()
+
+    if args.command == "split":
+        out = split_database(args.source, args.target_dir, args.buckets, args.jobs)
+    else:
+        if args.db or args.shard_dir is not None:
+            configure(args.db or get_db_path(), shard_dir=args.shard_dir)
+        fn = COMMANDS[args.command]
+        if args.command == "integrity" and args.quick:
+            fn = functools.partial(integrity_one, quick=True)
+        out = run_all(fn, all_db_paths(), args.jobs)
+    print(json.dumps(out, indent=2, ensure_ascii=False))
+    failed = out.get("missing") if isinstance(out, dict) else [r for r in out if not r["ok"]]
+    raise SystemExit(1 if failed else 0)
+
+if __name__ == "__main__":
+    main()
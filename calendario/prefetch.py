@@ -0,0 +1,142 @@
+# ─────────────────────────────────────────────────────────────────────────────
+# Precarga en segundo plano de semanas y meses vecinos
+# ─────────────────────────────────────────────────────────────────────────────
+# Después de mostrar la semana/mes X se calculan X-1 y X+1 con las mismas
+# funciones cacheadas que usa la UI, así la próxima navegación encuentra el
+# caché de ocurrencias caliente. Un único pool por proceso con pocos hilos
+# (PREFETCH_WORKERS) limita cuánto CPU y cuántas conexiones del pool de SQLite
+# puede tomar la precarga. Cada sesión es un "dueño": al pedir otra precarga se
+# cancelan sus trabajos que ya no sirven (los pendientes no arrancan y los que
+# corren se cortan entre un paso y el siguiente).
+
+import threading
+import calendar
+import importlib
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, timedelta
+from typing import Callable, Dict, List, Tuple
+
+PREFETCH_WORKERS = 2
+PREFETCH_MAX_PENDING = 16   # por proceso; lo que exceda se descarta
+
+# Un trabajo: clave estable + pasos (funciones sin argumentos) en orden
+Job = Tuple[Tuple, List[Callable[[], object]]]
+
+class Prefetcher:
+    def __init__(self, max_workers: int = PREFETCH_WORKERS, max_pending: int = PREFETCH_MAX_PENDING):
+        self.max_pending = max_pending
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="calendario-prefetch")
+        self._lock = threading.Lock()
+        self._pending: Dict[str, Dict[Tuple, Tuple]] = {}   # dueño → {clave: (future, cancelado)}
+        self.done = 0
+        self.cancelled = 0
+        self.dropped = 0
+        self.failed = 0
+
+    def _run(self, owner: str, key: Tuple, steps: List[Callable], cancel: threading.Event):
+        try:
+            for step in steps:
+                if cancel.is_set():
+                    with self._lock:
+                        self.cancelled += 1
+                    return
+                step()
+            with self._lock:
+                self.done += 1
+        except Exception:
+            # Precarga: si falla, la UI lo recalcula (y muestra el error) al navegar
+            with self._lock:
+                self.failed += 1
+        finally:
+            with self._lock:
+                jobs = self._pending.get(owner)
+                if jobs and jobs.get(key, (None, None))[1] is cancel:
+                    del jobs[key]
+                    if not jobs:
+                        del self._pending[owner]
+
+    def schedule(self, owner: str, jobs: List[Job]):
+        # Reemplaza la precarga de `owner`: conserva los trabajos con la misma
+        # clave y cancela el resto.
+        wanted = dict(jobs)
+        with self._lock:
+            current = self._pending.setdefault(owner, {})
+            for key in [k for k in current if k not in wanted]:
+                self._cancel(current.pop(key))
+            in_flight = sum(len(v) for v in self._pending.values())
+            for key, steps in wanted.items():
+                if key in current:
+                    continue
+                if in_flight >= self.max_pending:
+                    self.dropped += 1
+                    continue
+                cancel = threading.Event()
+                current[key] = (self._pool.submit(self._run, owner, key, steps, cancel), cancel)
+                in_flight += 1
+            if not current:
+                del self._pending[owner]
+
+    def _cancel(self, entry: Tuple):
+        future, cancel = entry
+        cancel.set()
+        if future.cancel():
+            self.cancelled += 1
+
+    def cancel(self, owner: str):
+        with self._lock:
+            for entry in self._pending.pop(owner, {}).values():
+                self._cancel(entry)
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {"pending": sum(len(v) for v in self._pending.values()), "done": self.done,
+                    "cancelled": self.cancelled, "dropped": self.dropped, "failed": self.failed}
+
+    def shutdown(self, wait: bool = True):
+        with self._lock:
+            owners = list(self._pending)
+        for owner in owners:
+            self.cancel(owner)
+        self._pool.shutdown(wait=wait)
+
+_prefetcher = None
+_prefetcher_lock = threading.Lock()
+
+def get_prefetcher() -> Prefetcher:
+    global _prefetcher
+    if _prefetcher is None:
+        with _prefetcher_lock:
+            if _prefetcher is None:
+                _prefetcher = Prefetcher()
+    return _prefetcher
+
+def week_jobs(user_id: str, week0: date, template: str) -> List[Job]:
+    # Lo que pide la vista Semana para la semana anterior y la siguiente: el frame
+    # de ocurrencias y la figura con la plantilla (tema) activa
+    jobs = []
+    for wk in (week0 - timedelta(days=7), week0 + timedelta(days=7)):
+        end = wk + timedelta(days=6)
+        jobs.append((("week", user_id, wk, template), [
+            lambda wk=wk, end=end: importlib.import_module(".frames", __package__).occurrences_frame(user_id, wk, end),
+            lambda wk=wk: importlib.import_module(".render", __package__).week_timeline_figure(user_id, wk, template),
+        ]))
+    return jobs
+
+def month_jobs(user_id: str, year: int, month: int) -> List[Job]:
+    # Lo que pide la vista Mes: el frame de ocurrencias y el HTML del mes vecino
+    jobs = []
+    for delta in (-1, 1):
+        y, m = divmod(year * 12 + month - 1 + delta, 12)
+        m += 1
+        start_m, end_m = date(y, m, 1), date(y, m, calendar.monthrange(y, m)[1])
+        jobs.append((("month", user_id, y, m), [
+            lambda s=start_m, e=end_m: importlib.import_module(".frames", __package__).occurrences_frame(user_id, s, e),
+            lambda y=y, m=m: importlib.import_module(".render", __package__).month_html(user_id, y, m),
+        ]))
+    return jobs
+
+def prefetch_week(owner: str, user_id: str, week0: date, template: str):
+    get_prefetcher().schedule(owner, week_jobs(user_id, week0, template))
+
+def prefetch_month(owner: str, user_id: str, year: int, month: int):
+    get_prefetcher().schedule(owner, month_jobs(user_id, year, month))
@@ -0,0 +1,132 @@
+# ─────────────────────────────────────────────────────────────────────────────
+# Perfilado opcional por rerun: tiempos por etapa, consultas y caché
+# ─────────────────────────────────────────────────────────────────────────────
+# Nada se mide fuera de un bloque `with profile_rerun(...)`: el registro activo
+# vive en un ContextVar (Streamlit corre cada sesión en su propio hilo), así que
+# activar el perfilado en una sesión no afecta a las demás. Sin registro activo,
+# @timed y stage() solo cuestan un ContextVar.get().
+
+import os
+import json
+import threading
+import functools
+from time import perf_counter
+from datetime import datetime
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Optional
+
+# Ruta JSONL donde se agrega un registro por rerun perfilado ("" = no escribir)
+PROFILE_LOG = os.environ.get("CALENDARIO_PROFILE_LOG", "")
+# Cada cuántas instrucciones de la VM de SQLite se suma un paso (proxy de filas recorridas)
+VM_STEP = 1000
+
+class RerunRecord:
+    def __init__(self, label: str, **meta):
+        self.label = label
+        self.meta = meta
+        self.started = datetime.now().isoformat(timespec="milliseconds")
+        self.total_ms = 0.0
+        self.queries = 0
+        self.vm_steps = 0
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self.stages: Dict[str, Dict] = {}   # nombre → {calls, ms, items}
+        self._t0 = perf_counter()
+
+    def add(self, name: str, ms: float, items: Optional[int] = None):
+        st = self.stages.get(name)
+        if st is None:
+            st = self.stages[name] = {"calls": 0, "ms": 0.0, "items": 0}
+        st["calls"] += 1
+        st["ms"] += ms
+        if items is not None:
+            st["items"] += items
+
+    def count_query(self, _sql: str):
+        self.queries += 1
+
+    def count_vm_step(self) -> int:
+        self.vm_steps += 1
+        return 0   # 0 = seguir ejecutando
+
+    def as_dict(self) -> Dict:
+        # Las etapas se anidan (expand incluye sus consultas): ms no se suman entre sí
+        return {"label": self.label, "started": self.started, "total_ms": round(self.total_ms, 3),
+                "queries": self.queries, "vm_steps": self.vm_steps * VM_STEP,
+                "cache": {"hits": self.cache_hits, "misses": self.cache_misses},
+                "stages": {k: {"calls": v["calls"], "ms": round(v["ms"], 3), "items": v["items"]}
+                           for k, v in sorted(self.stages.items(), key=lambda kv: -kv[1]["ms"])},
+                "meta": self.meta}
+
+_current: ContextVar[Optional[RerunRecord]] = ContextVar("calendario_profile", default=None)
+_log_lock = threading.Lock()
+recent_records = deque(maxlen=50)
+
+def current_record() -> Optional[RerunRecord]:
+    return _current.get()
+
+def _items(result) -> Optional[int]:
+    if isinstance(result, list) or hasattr(result, "shape"):   # listas y DataFrames
+        return len(result)
+    return None
+
+def timed(name: str):
+    # Decorador: suma ms, llamadas y largo del resultado bajo `name` en el rerun activo
+    def deco(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            rec = _current.get()
+            if rec is None:
+                return fn(*args, **kwargs)
+            t0 = perf_counter()
+            result = fn(*args, **kwargs)
+            rec.add(name, (perf_counter() - t0) * 1000, _items(result))
+            return result
+        return wrapper
+    return deco
+
+@contextmanager
+def stage(name: str):
+    rec = _current.get()
+    if rec is None:
+        yield
+        return
+    t0 = perf_counter()
+    try:
+        yield
+    finally:
+        rec.add(name, (perf_counter() - t0) * 1000)
+
+def note_cache(hit: bool):
+    rec = _current.get()
+    if rec is not None:
+        if hit:
+            rec.cache_hits += 1
+        else:
+            rec.cache_misses += 1
+
+def append_log(record: Dict, path: str):
+    with _log_lock, open(path, "a", encoding="utf-8") as f:
+        f.write(json.dumps(record, ensure_ascii=False, default=str) + "\n")
+
+@contextmanager
+def profile_rerun(label: str, enabled: bool = True, log_path: Optional[str] = None, **meta):
+    # Devuelve el RerunRecord (o None si enabled es False). Al salir, también si
+    # el rerun termina con excepción (st.stop / st.rerun), se guarda en
+    # recent_records y, si hay ruta, se agrega al JSONL.
+    if not enabled:
+        yield None
+        return
+    rec = RerunRecord(label, **meta)
+    token = _current.set(rec)
+    try:
+        yield rec
+    finally:
+        _current.reset(token)
+        rec.total_ms = (perf_counter() - rec._t0) * 1000
+        recent_records.append(rec.as_dict())
+        path = PROFILE_LOG if log_path is None else log_path
+        if path:
+            append_log(rec.as_dict(), path)
@@ -0,0 +1,218 @@
+# ─────────────────────────────────────────────────────────────────────────────
+# Utilidades de tiempo y aritmética de reglas semanales (sin DB)
+# ─────────────────────────────────────────────────────────────────────────────
+
+import json
+import heapq
+from datetime import datetime, date, time, timedelta
+from operator import attrgetter
+from typing import List, Dict, Optional, NamedTuple
+
+WEEKDAYS_ES = ["Lun", "Mar", "Mié", "Jue", "Vie", "Sáb", "Dom"]
+
+def week_start(any_date: date) -> date:
+    return any_date - timedelta(days=any_date.weekday())
+
+def combine_dt(d: date, t: time) -> datetime:
+    return datetime(d.year, d.month, d.day, t.hour, t.minute)
+
+def overlaps(a_start: datetime, a_end: datetime, b_start: datetime, b_end: datetime) -> bool:
+    return not (a_end <= b_start or b_end <= a_start)
+
+def minutes_between(a: datetime, b: datetime) -> int:
+    return int((b - a).total_seconds() // 60)
+
+def _hhmm_to_min(s: str) -> int:
+    return int(s[:2]) * 60 + int(s[3:5])
+
+def rule_dates(days: List[int], lo: date, hi: date):
+    for wd in sorted(set(days)):
+        d = lo + timedelta(days=(wd - lo.weekday()) % 7)
+        while d <= hi:
+            yield d
+            d += timedelta(days=7)
+
+def first_rule_date(days: List[int], lo: date, hi: date) -> Optional[date]:
+    if not days:
+        return None
+    first = lo + timedelta(days=min((wd - lo.weekday()) % 7 for wd in days))
+    return first if first <= hi else None
+
+def last_rule_date(days: List[int], lo: date, hi: date) -> Optional[date]:
+    if not days:
+        return None
+    last = hi - timedelta(days=min((hi.weekday() - wd) % 7 for wd in days))
+    return last if last >= lo else None
+
+def next_rule_start(days: List[int], lo: date, hi: date, start_min: int, after: datetime) -> Optional[datetime]:
+    # Primer inicio de la regla estrictamente posterior a `after`, sin expandir
+    d0 = max(lo, after.date())
+    if d0 == after.date() and after.hour * 60 + after.minute >= start_min:
+        d0 += timedelta(days=1)
+    d = first_rule_date(days, d0, hi)
+    return datetime(d.year, d.month, d.day) + timedelta(minutes=start_min) if d else None
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Definiciones compiladas
+# ─────────────────────────────────────────────────────────────────────────────
+# Cada evento (regla o puntual) se parsea una sola vez a una tupla inmutable con
+# días como máscara de bits, límites como ordinales de fecha y horario en minutos
+# del día. Una puntual es una regla de un solo día. Los expansores, los
+# conflictos y las próximas ocurrencias trabajan sobre esta forma, sin JSON ni
+# fromisoformat por llamada.
+class CompiledEvent(NamedTuple):
+    id: int
+    title: str
+    category_id: Optional[int]
+    recurring: bool
+    mask: int          # bit wd encendido = cae ese día de semana (0=Lun)
+    lo: int            # date.toordinal() del primer día posible
+    hi: int            # date.toordinal() del último día posible
+    start_min: int     # minuto del día
+    end_min: int
+
+# días de cada máscara y, por (máscara, día de semana), cuántos días faltan para el próximo marcado
+MASK_DAYS = [tuple(wd for wd in range(7) if m >> wd & 1) for m in range(128)]
+_NEXT_OFFSET = [[min(((wd - cur) % 7 for wd in MASK_DAYS[m]), default=-1) for cur in range(7)] for m in range(128)]
+
+def ordinal_weekday(o: int) -> int:
+    return (o - 1) % 7     # date.fromordinal(1) fue lunes
+
+def days_to_mask(days) -> int:
+    mask = 0
+    for wd in days:
+        mask |= 1 << wd
+    return mask
+
+def compile_event_row(row) -> CompiledEvent:
+    # row: (id, title, category_id, date, start_time, end_time, is_recurring, rrule)
+    ev_id, title, cat_id, d, s_t, e_t, is_rec, rr_json = row
+    if is_rec:
+        rr = json.loads(rr_json)
+        return CompiledEvent(ev_id, title, cat_id, True, days_to_mask(rr["days"]),
+                             date.fromisoformat(rr["start_date"]).toordinal(),
+                             date.fromisoformat(rr["end_date"]).toordinal(),
+                             _hhmm_to_min(rr["start_time"]), _hhmm_to_min(rr["end_time"]))
+    if not d:
+        return CompiledEvent(ev_id, title, cat_id, False, 0, 1, 0, 0, 0)
+    o = date.fromisoformat(d).toordinal()
+    return CompiledEvent(ev_id, title, cat_id, False, 1 << ordinal_weekday(o), o, o,
+                         _hhmm_to_min(s_t), _hhmm_to_min(e_t))
+
+def min_to_hhmm(m: int) -> str:
+    return f"{m // 60:02d}:{m % 60:02d}"
+
+def compiled_ordinals(mask: int, lo: int, hi: int):
+    # Ordinales de [lo, hi] que caen en la máscara, agrupados por día de semana
+    for wd in MASK_DAYS[mask]:
+        o = lo + (wd - lo + 1) % 7
+        while o <= hi:
+            yield o
+            o += 7
+
+def next_start(ev: CompiledEvent, after: datetime) -> Optional[datetime]:
+    # Primer inicio estrictamente posterior a `after`, sin expandir
+    o = after.toordinal()
+    if o < ev.lo:
+        o = ev.lo
+    elif after.hour * 60 + after.minute >= ev.start_min:
+        o += 1
+    off = _NEXT_OFFSET[ev.mask][ordinal_weekday(o)]
+    if off < 0 or o + off > ev.hi:
+        return None
+    return datetime.fromordinal(o + off) + timedelta(minutes=ev.start_min)
+
+class Occurrence:
+    # Ocurrencia concreta con __slots__ (un dict con las mismas claves pesa ~3x).
+    # La categoría es el dict compartido de list_categories. o["title"] y
+    # o.get("category") siguen funcionando para la UI; el núcleo usa atributos.
+    __slots__ = ("id", "title", "start", "end", "category", "recurring")
+
+    def __init__(self, id: int, title: str, start: datetime, end: datetime,
+                 category: Optional[Dict], recurring: bool):
+        self.id = id
+        self.title = title
+        self.start = start
+        self.end = end
+        self.category = category
+        self.recurring = recurring
+
+    def __getitem__(self, key: str):
+        try:
+            return getattr(self, key)
+        except (AttributeError, TypeError):
+            raise KeyError(key) from None
+
+    def get(self, key: str, default=None):
+        return getattr(self, key, default) if key in self.__slots__ else default
+
+    def keys(self):
+        return self.__slots__
+
+    def __contains__(self, key) -> bool:
+        return key in self.__slots__
+
+    def to_dict(self) -> Dict:
+        return {k: getattr(self, k) for k in self.__slots__}
+
+    def __eq__(self, other) -> bool:
+        if not isinstance(other, Occurrence):
+            return NotImplemented
+        return all(getattr(self, k) == getattr(other, k) for k in self.__slots__)
+
+    __hash__ = None
+
+    def __repr__(self) -> str:
+        return f"Occurrence({', '.join(f'{k}={getattr(self, k)!r}' for k in self.__slots__)})"
+
+by_start = attrgetter("start")
+
+def expand_definitions(events: List[CompiledEvent], start_d: date, end_d: date,
+                       cats: Dict[int, Dict]) -> List[Occurrence]:
+    # Definiciones compiladas → ocurrencias en [start_d, end_d], ordenadas por
+    # inicio. Las reglas saltan de semana en semana por día marcado, sin recorrer
+    # el rango día por día.
+    out = []
+    append = out.append
+    s_ord, e_ord = start_d.toordinal(), end_d.toordinal()
+    for ev in events:
+        lo = ev.lo if ev.lo > s_ord else s_ord
+        hi = ev.hi if ev.hi < e_ord else e_ord
+        if lo > hi:
+            continue
+        s_td, e_td = timedelta(minutes=ev.start_min), timedelta(minutes=ev.end_min)
+        ev_id, title, cat, rec = ev.id, ev.title, cats.get(ev.category_id), ev.recurring
+        for o in compiled_ordinals(ev.mask, lo, hi):
+            base = datetime.fromordinal(o)
+            append(Occurrence(ev_id, title, base + s_td, base + e_td, cat, rec))
+    out.sort(key=by_start)
+    return out
+
+def merge_upcoming(events, after: datetime, cats: Dict[int, Dict]):
+    # Ocurrencias con inicio >= after (al minuto), en orden, generadas a pedido
+    # con un heap del próximo inicio de cada definición. `events` debe venir
+    # ordenado por lo: una definición entra al heap recién cuando su primer día
+    # no es posterior al próximo inicio a emitir, así solo se leen las que pueden
+    # aportar. Sacar n cuesta O(n log definiciones vivas).
+    after = after.replace(second=0, microsecond=0) - timedelta(minutes=1)
+    heap = []
+    it = iter(events)
+    pending = next(it, None)
+    while True:
+        top = heap[0][0].toordinal() if heap else None
+        while pending is not None and (top is None or pending.lo <= top):
+            start = next_start(pending, after)
+            if start is not None:
+                heapq.heappush(heap, (start, pending.id, pending))
+                top = heap[0][0].toordinal()
+            pending = next(it, None)
+        if not heap:
+            return
+        start, ev_id, ev = heap[0]
+        yield Occurrence(ev_id, ev.title, start, start + timedelta(minutes=ev.end_min - ev.start_min),
+                         cats.get(ev.category_id), ev.recurring)
+        following = next_start(ev, start)
+        if following is None:
+            heapq.heappop(heap)
+        else:
+            heapq.heapreplace(heap, (following, ev_id, ev))
@@ -0,0 +1,243 @@
+# ─────────────────────────────────────────────────────────────────────────────
+# Recordatorios: proceso asyncio con un heap del próximo aviso por evento
+# ─────────────────────────────────────────────────────────────────────────────
+# Cada evento (puntual o regla) tiene a lo sumo una entrada en el heap: su
+# próximo inicio, calculado analíticamente con next_start (sin expandir
+# semanas). Al avisar se calcula el siguiente inicio de ese evento y se vuelve a
+# empujar. Los cambios se detectan leyendo data_versions cada POLL_SECONDS y solo
+# se recargan los usuarios cuya versión cambió; las entradas viejas del heap se
+# descartan al salir (invalidación perezosa). Entre avisos el proceso duerme.
+# Con particiones se leen todas las bases; los ids de evento solo son únicos
+# dentro de una base, así que la clave es (user_id, event_id).
+#
+# Uso:
+#   python -m calendario.reminders --db planner.db --sink log
+#   python -m calendario.reminders --sink smtp --smtp-host localhost --smtp-port 1025
+#   python -m calendario.reminders --sink webhook --url http://localhost:8000/hook
+
+import json
+import heapq
+import asyncio
+import logging
+import smtplib
+import argparse
+import urllib.request
+from email.message import EmailMessage
+from datetime import datetime, date, timedelta
+from typing import Dict, List, Optional, Tuple
+
+from .db import db, configure, get_db_path, db_path_for, all_db_paths
+from .recurrence import CompiledEvent, next_start
+from .storage import compile_rows
+
+REMINDER_LEAD_MIN = 10       # avisar N minutos antes del inicio
+POLL_SECONDS = 5.0           # cada cuánto mirar data_versions
+
+log = logging.getLogger("calendario.reminders")
+
+REMINDER_EVENTS_SQL = """
+    SELECT id, title, category_id, date, start_time, end_time, is_recurring, rrule, user_id FROM events
+    WHERE {where} AND ((is_recurring=0 AND date >= ?) OR (is_recurring=1 AND rr_end >= ?))
+"""
+
+# Por evento: (user_id, definición compilada), bajo la clave (user_id, event_id)
+Rule = Tuple[str, CompiledEvent]
+Key = Tuple[str, int]
+
+def load_rules(user_id: Optional[str], today: date) -> Dict[Key, Rule]:
+    where, params = ("user_id=?", (user_id,)) if user_id else ("1=1", ())
+    rules = {}
+    for path in ([db_path_for(user_id)] if user_id else all_db_paths()):
+        with db(path=path) as con:
+            rows = con.execute(REMINDER_EVENTS_SQL.format(where=where),
+                               params + (today.isoformat(), today.isoformat())).fetchall()
+        rules.update(((r[8], ev.id), (r[8], ev)) for r, ev in zip(rows, compile_rows((r[:8] for r in rows), path)))
+    return rules
+
+def load_versions() -> Dict[str, int]:
+    versions = {}
+    for path in all_db_paths():
+        with db(path=path) as con:
+            versions.update(con.execute("SELECT user_id, version FROM data_versions").fetchall())
+    return versions
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Destinos de entrega: cualquier objeto con `async deliver(reminder: dict)`
+# ─────────────────────────────────────────────────────────────────────────────
+class LogSink:
+    async def deliver(self, reminder: Dict):
+        log.info("Recordatorio %s: %s a las %s", reminder["user_id"], reminder["title"], reminder["start"])
+
+class SmtpSink:
+    # Pensado para un SMTP local de prueba (p. ej. `python -m aiosmtpd -n -l localhost:1025`)
+    def __init__(self, host: str = "localhost", port: int = 1025, sender: str = "planner@localhost",
+                 domain: str = "localhost"):
+        self.host, self.port, self.sender, self.domain = host, port, sender, domain
+
+    def _send(self, reminder: Dict):
+        msg = EmailMessage()
+        msg["From"] = self.sender
+        msg["To"] = f"{reminder['user_id']}@{self.domain}"
+        msg["Subject"] = f"Recordatorio: {reminder['title']}"
+        msg.set_content(f"{reminder['title']} empieza el {reminder['start']}.")
+        with smtplib.SMTP(self.host, self.port, timeout=10) as smtp:
+            smtp.send_message(msg)
+
+    async def deliver(self, reminder: Dict):
+        await asyncio.get_running_loop().run_in_executor(None, self._send, reminder)
+
+class WebhookSink:
+    def __init__(self, url: str, timeout: float = 10.0):
+        self.url, self.timeout = url, timeout
+
+    def _post(self, reminder: Dict):
+        req = urllib.request.Request(self.url, data=json.dumps(reminder).encode("utf-8"),
+                                     headers={"Content-Type": "application/json"}, method="POST")
+        with urllib.request.urlopen(req, timeout=self.timeout) as resp:
+            resp.read()
+
+    async def deliver(self, reminder: Dict):
+        await asyncio.get_running_loop().run_in_executor(None, self._post, reminder)
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Planificador
+# ─────────────────────────────────────────────────────────────────────────────
+class ReminderScheduler:
+    def __init__(self, sink, lead_min: int = REMINDER_LEAD_MIN, poll_seconds: float = POLL_SECONDS):
+        self.sink = sink
+        self.lead = timedelta(minutes=lead_min)
+        self.poll_seconds = poll_seconds
+        self._heap: List[Tuple[datetime, Key, datetime]] = []   # (aviso, clave, inicio)
+        self._rules: Dict[Key, Rule] = {}
+        self._by_user: Dict[str, set] = {}
+        self._next: Dict[Key, datetime] = {}    # clave → inicio vigente en el heap
+        self._sent: Dict[Key, datetime] = {}    # clave → último inicio avisado
+        self._versions: Dict[str, int] = {}
+        self._wake = asyncio.Event()
+        self._force_poll = False
+        self.delivered = 0
+        self.failed = 0
+
+    def __len__(self) -> int:
+        return len(self._next)
+
+    def _schedule(self, key: Key, after: datetime):
+        start = next_start(self._rules[key][1], max(after, self._sent.get(key, after)))
+        if start is None:
+            self._next.pop(key, None)
+            return
+        if self._next.get(key) == start:
+            return   # ya está en el heap con ese inicio
+        self._next[key] = start
+        heapq.heappush(self._heap, (start - self.lead, key, start))
+
+    def set_rules(self, rules: Dict[Key, Rule], user_id: Optional[str], now: datetime):
+        # Reemplaza las reglas de un usuario (o de todos si user_id es None)
+        old = set(self._rules) if user_id is None else self._by_user.pop(user_id, set())
+        if user_id is None:
+            self._by_user.clear()
+        for key in old - set(rules):
+            self._rules.pop(key, None); self._next.pop(key, None); self._sent.pop(key, None)
+        for key, rule in rules.items():
+            self._by_user.setdefault(rule[0], set()).add(key)
+            if self._rules.get(key) == rule and key in self._next:
+                continue   # sin cambios: su entrada del heap sigue siendo válida
+            self._rules[key] = rule
+            self._schedule(key, now)
+        if len(self._heap) > 2 * len(self._next) + 1024:
+            self._heap = [e for e in self._heap if self._next.get(e[1]) == e[2]]
+            heapq.heapify(self._heap)
+        self._wake.set()
+
+    async def load(self):
+        loop = asyncio.get_running_loop()
+        now = datetime.now()
+        self._versions = await loop.run_in_executor(None, load_versions)
+        self.set_rules(await loop.run_in_executor(None, load_rules, None, now.date()), None, now)
+
+    async def refresh_changed(self):
+        loop = asyncio.get_running_loop()
+        versions = await loop.run_in_executor(None, load_versions)
+        changed = [u for u, v in versions.items() if self._versions.get(u) != v]
+        self._versions = versions
+        for user_id in changed:
+            now = datetime.now()
+            self.set_rules(await loop.run_in_executor(None, load_rules, user_id, now.date()), user_id, now)
+
+    def notify_changed(self, user_id: str):
+        # Para quien escribe en el mismo proceso: fuerza la recarga en la próxima vuelta
+        self._versions.pop(user_id, None)
+        self._force_poll = True
+        self._wake.set()
+
+    def pop_due(self, now: datetime) -> List[Dict]:
+        due = []
+        while self._heap and self._heap[0][0] <= now:
+            _, key, start = heapq.heappop(self._heap)
+            if self._next.get(key) != start:
+                continue   # entrada vieja: el evento cambió o se borró
+            user_id, ev = self._rules[key]
+            self._sent[key] = start
+            due.append({"event_id": ev.id, "user_id": user_id, "title": ev.title,
+                        "start": start.isoformat(timespec="minutes")})
+            self._schedule(key, start)
+        return due
+
+    async def _deliver(self, reminder: Dict):
+        try:
+            await self.sink.deliver(reminder)
+            self.delivered += 1
+        except Exception:
+            self.failed += 1
+            log.exception("No se pudo entregar el recordatorio %s", reminder)
+
+    async def run(self, stop: Optional[asyncio.Event] = None):
+        await self.load()
+        stop = stop or asyncio.Event()
+        next_poll = asyncio.get_running_loop().time() + self.poll_seconds
+        while not stop.is_set():
+            for reminder in self.pop_due(datetime.now()):
+                await self._deliver(reminder)
+            loop_now = asyncio.get_running_loop().time()
+            if loop_now >= next_poll or self._force_poll:
+                self._force_poll = False
+                await self.refresh_changed()
+                next_poll = loop_now + self.poll_seconds
+            timeout = next_poll - loop_now
+            if self._heap:
+                timeout = min(timeout, max(0.0, (self._heap[0][0] - datetime.now()).total_seconds()))
+            self._wake.clear()
+            try:
+                await asyncio.wait_for(self._wake.wait(), timeout=max(timeout, 0.0))
+            except asyncio.TimeoutError:
+                pass
+
+def main():
+    ap = argparse.ArgumentParser(description="Envía recordatorios antes de cada actividad.")
+    ap.add_argument("--db", default="", help="ruta de planner.db")
+    ap.add_argument("--shard-dir", default=None, help="carpeta de particiones (modo particionado)")
+    ap.add_argument("--sink", choices=("log", "smtp", "webhook"), default="log")
+    ap.add_argument("--lead", type=int, default=REMINDER_LEAD_MIN, help="minutos de anticipación")
+    ap.add_argument("--poll", type=float, default=POLL_SECONDS, help="segundos entre chequeos de cambios")
+    ap.add_argument("--smtp-host", default="localhost")
+    ap.add_argument("--smtp-port", type=int, default=1025)
+    ap.add_argument("--url", default="", help="URL del webhook")
+    args = ap.parse_args()
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(message)s")
+    if args.db or args.shard_dir is not None:
+        configure(args.db or get_db_path(), shard_dir=args.shard_dir)
+    if args.sink == "smtp":
+        sink = SmtpSink(args.smtp_host, args.smtp_port)
+    elif args.sink == "webhook":
+        if not args.url:
+            ap.error("--sink webhook requiere --url")
+        sink = WebhookSink(args.url)
+    else:
+        sink = LogSink()
+    try:
+        asyncio.run(ReminderScheduler(sink, args.lead, args.poll).run())
+    except KeyboardInterrupt:
+        pass
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,196 @@
+# ─────────────────────────────────────────────────────────────────────────────
+# Vistas: HTML del mes y heatmap anual. Capa de renderizado: pandas y plotly se
+# importan aquí y solo cuando se pide una vista (ver calendario.__getattr__).
+# ─────────────────────────────────────────────────────────────────────────────
+
+import calendar
+import functools
+from datetime import date, timedelta
+from html import escape
+from typing import List, Dict, Tuple, Optional
+
+import numpy as np
+import pandas as pd
+import plotly.express as px
+
+from .cache import versioned_cache, versioned_figure_cache
+from .profiling import timed
+from .recurrence import WEEKDAYS_ES
+from .storage import list_categories
+from .frames import occurrences_frame, daily_load
+
+# Plantillas precompiladas: cada celda es un format() sobre una cadena fija y la
+# grilla se arma con "".join. El CSS depende solo del tema y el cuerpo solo de
+# los datos, así que se cachean por separado: CSS por dark_mode y cuerpo por
+# (usuario, mes, versión de datos) con versioned_cache.
+MONTHS_ES = ["Enero", "Febrero", "Marzo", "Abril", "Mayo", "Junio", "Julio",
+             "Agosto", "Septiembre", "Octubre", "Noviembre", "Diciembre"]
+MONTH_HEAD = "<div class='cal-head'>" + "".join(f"<div class='dow'>{d}</div>" for d in WEEKDAYS_ES) + "</div>"
+
+_CELL = "<div class='cell'><div class='dom{muted}'>{day}</div>{badges}{more}</div>"
+_BADGE = "<span class='badge' style='background:{color}' title='{title}'>{short}</span> "
+_MORE = "<div style='font-size:0.7rem;margin-top:4px;'>+{n} más</div>"
+_MINI_DAY = "<div class='d l{level}{muted}' title='{iso}: {n}'>{day}</div>"
+_MINI_MONTH = "<div class='mini'><div class='mini-title'>{name}</div><div class='mini-grid'>{dows}{days}</div></div>"
+_MINI_DOWS = "".join(f"<div class='d dow'>{d[0]}</div>" for d in WEEKDAYS_ES)
+
+_MONTH_CSS = """
+<style>
+  .cal {{ display:grid; grid-template-columns: repeat(7, 1fr); gap:8px; }}
+  .cell {{ border:1px solid {border}; border-radius:8px; padding:8px; min-height:100px; background:{base_bg}; }}
+  .cell .dom {{ font-weight:600; font-size:0.9rem; margin-bottom:6px; }}
+  .badge {{ display:inline-block; padding:2px 6px; border-radius:6px; font-size:0.7rem; margin:1px 2px 0 0; color:#fff; }}
+  .muted {{ color:{text_muted}; }}
+  .cal-head {{ display:grid; grid-template-columns: repeat(7, 1fr); margin-bottom:6px; }}
+  .dow {{ font-weight:700; text-align:center; }}
+  .ycal {{ display:grid; grid-template-columns: repeat(4, 1fr); gap:16px; }}
+  .mini-title {{ font-weight:700; margin-bottom:4px; }}
+  .mini-grid {{ display:grid; grid-template-columns: repeat(7, 1fr); gap:2px; }}
+  .mini .d {{ font-size:0.7rem; text-align:center; border-radius:4px; padding:2px 0; }}
+  .mini .l1 {{ background:{l1}; }} .mini .l2 {{ background:{l2}; }}
+  .mini .l3 {{ background:{l3}; color:#fff; }} .mini .l4 {{ background:{l4}; color:#fff; }}
+  .mini .d.muted {{ visibility:hidden; }}
+</style>
+"""
+
+@functools.lru_cache(maxsize=2)
+def month_css(dark: bool) -> str:
+    if dark:
+        return _MONTH_CSS.format(border="#2a2f3a", base_bg="#161a23", text_muted="#8892a6",
+                                 l1="#1c2f4a", l2="#24507f", l3="#2f74b5", l4="#5aa0e6")
+    return _MONTH_CSS.format(border="#e6e6e6", base_bg="#fafafa", text_muted="#999",
+                             l1="#deebf7", l2="#9ecae1", l3="#4292c6", l4="#08519c")
+
+def _bucket_by_day(occ_df: pd.DataFrame, cats_by_id: Dict[int, Dict]) -> Dict[date, List]:
+    bucket = {}
+    days = occ_df["start"].to_numpy().astype("datetime64[D]").tolist()
+    for d, title, cat_id in zip(days, occ_df["title"].tolist(), occ_df["category_id"].tolist()):
+        bucket.setdefault(d, []).append((title, cats_by_id.get(cat_id)))
+    return bucket
+
+def month_cells_html(bucket: Dict[date, List], year: int, month: int) -> str:
+    cells = []
+    for d in calendar.Calendar(firstweekday=0).itermonthdates(year, month):   # 0=Lun
+        day_events = bucket.get(d, ())
+        badges = "".join(_BADGE.format(color=escape(cat["color"] if cat else "#888"), title=escape(name),
+                                       short=escape(name[:12]))
+                         for name, cat in day_events[:3])
+        more = _MORE.format(n=len(day_events) - 3) if len(day_events) > 3 else ""
+        cells.append(_CELL.format(muted="" if d.month == month else " muted", day=d.day, badges=badges, more=more))
+    return "<div class='cal'>" + "".join(cells) + "</div>"
+
+def month_grid_html(occ_df: pd.DataFrame, cats_by_id: Dict[int, Dict], focus: date, dark: bool) -> Tuple[str, str, str]:
+    bucket = _bucket_by_day(occ_df, cats_by_id)
+    return month_css(dark), MONTH_HEAD, month_cells_html(bucket, focus.year, focus.month)
+
+@timed("render.month_html")
+@versioned_cache
+def month_html(user_id: str, year: int, month: int) -> str:
+    # Cuerpo del mes (cabecera + celdas) sin CSS: sirve para ambos temas
+    start_m = date(year, month, 1)
+    end_m = date(year, month, calendar.monthrange(year, month)[1])
+    cats_by_id = {c["id"]: c for c in list_categories(user_id)}
+    bucket = _bucket_by_day(occurrences_frame(user_id, start_m, end_m), cats_by_id)
+    return MONTH_HEAD + month_cells_html(bucket, year, month)
+
+def _load_level(n: int) -> int:
+    return 0 if n == 0 else 1 if n == 1 else 2 if n <= 3 else 3 if n <= 6 else 4
+
+@timed("render.year_html")
+@versioned_cache
+def year_html(user_id: str, year: int) -> str:
+    # Los 12 meses como mini-grillas, coloreadas por cantidad de actividades del día
+    per_day = daily_load(user_id, year).groupby("date")["count"].sum()
+    per_day = dict(zip(per_day.index.date, per_day.tolist()))
+    cal = calendar.Calendar(firstweekday=0)
+    months = []
+    for month in range(1, 13):
+        days = []
+        for d in cal.itermonthdates(year, month):
+            n = per_day.get(d, 0) if d.month == month else 0
+            days.append(_MINI_DAY.format(level=_load_level(n), muted="" if d.month == month else " muted",
+                                         iso=d.isoformat(), n=n, day=d.day))
+        months.append(_MINI_MONTH.format(name=MONTHS_ES[month - 1], dows=_MINI_DOWS, days="".join(days)))
+    return "<div class='ycal'>" + "".join(months) + "</div>"
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Línea de tiempo semanal
+# ─────────────────────────────────────────────────────────────────────────────
+# Del frame de ocurrencias a la tabla del gráfico en un solo paso columnar:
+# categorías unidas por category_id y día de semana indexado desde el datetime64.
+# La figura se cachea por (usuario, semana, tema, versión de datos); compartida
+# entre sesiones, así que no modificarla.
+NO_CATEGORY = ("Sin categoría", "#999999")
+_WEEKDAYS = np.array(WEEKDAYS_ES, dtype=object)
+
+def week_timeline_frame(occ_df: pd.DataFrame, cats: List[Dict]) -> pd.DataFrame:
+    cat_df = pd.DataFrame(cats, columns=["id", "name", "color"]).astype({"id": "Int64"})
+    cat_df = cat_df.rename(columns={"id": "category_id", "name": "Categoría", "color": "Color"})
+    df = occ_df[["title", "category_id", "start", "end"]].merge(cat_df, on="category_id", how="left")
+    df = df.fillna({"Categoría": NO_CATEGORY[0], "Color": NO_CATEGORY[1]})
+    df["Día"] = _WEEKDAYS[df["start"].dt.weekday.to_numpy()]
+    return df.rename(columns={"title": "Actividad", "start": "Inicio", "end": "Fin"})
+
+@timed("render.week_timeline_figure")
+@versioned_figure_cache
+def week_timeline_figure(user_id: str, week0: date, template: str):
+    # None si la semana no tiene actividades
+    occ_df = occurrences_frame(user_id, week0, week0 + timedelta(days=6))
+    if occ_df.empty:
+        return None
+    cats = list_categories(user_id)
+    df = week_timeline_frame(occ_df, cats)
+    color_map = {c["name"]: c["color"] for c in cats}
+    color_map[NO_CATEGORY[0]] = NO_CATEGORY[1]
+    fig = px.timeline(df, x_start="Inicio", x_end="Fin", y="Día", color="Categoría",
+                      hover_data=["Actividad"], color_discrete_map=color_map, template=template)
+    fig.update_yaxes(autorange="reversed")
+    fig.update_layout(height=460, xaxis_title="", yaxis_title="")
+    return fig
+
+LOAD_METRICS = {"count": "#", "minutes": "min"}
+
+@timed("render.year_heatmap_figure")
+def year_heatmap_figure(load_df: pd.DataFrame, year: int, template: str, metric: str = "count",
+                        by_category: bool = False, cats_by_id: Optional[Dict[int, Dict]] = None):
+    # load_df: salida de daily_load (una fila por día y categoría con actividad)
+    start_y = date(year,1,1); end_y = date(year,12,31)
+    # Heatmap simple por semana vs día
+    days = pd.date_range(start_y, end_y, freq="D")
+    df = pd.DataFrame({"date": days})
+    df["dow"] = df["date"].dt.weekday
+    df["week"] = df["date"].dt.isocalendar().week.astype(int)
+
+    df.loc[(df["date"].dt.month == 1) & (df["week"] > 50), "week"] = 0
+    max_week = int(df["week"].max())
+    df.loc[(df["date"].dt.month == 12) & (df["week"] == 1), "week"] = max_week + 1
+
+    facet = {}
+    if by_category and len(load_df):
+        cats_by_id = cats_by_id or {}
+        names = [cats_by_id[c]["name"] if c in cats_by_id else "Sin categoría" for c in load_df["category_id"]]
+        wide = (load_df.assign(cat=names).pivot_table(index="date", columns="cat", values=metric, aggfunc="sum")
+                .reindex(days, fill_value=0).fillna(0))
+        df = df.merge(wide.rename_axis(index="date", columns=None).reset_index()
+                      .melt(id_vars="date", var_name="Categoría", value_name=metric), on="date")
+        facet = {"facet_row": "Categoría", "facet_row_spacing": 0.04}
+    else:
+        per_day = load_df.groupby("date")[metric].sum()
+        df[metric] = df["date"].map(per_day).fillna(0)
+    df[metric] = df[metric].astype(int)
+
+    fig = px.density_heatmap(
+        df, x="week", y="dow", z=metric, text_auto=True,
+        category_orders={"dow":[0,1,2,3,4,5,6]},
+        labels={"dow":"Día", "week":"Semana", metric: LOAD_METRICS[metric]},
+        template=template, **facet
+    )
+
+    fig.update_yaxes(
+        tickmode="array", tickvals=[0,1,2,3,4,5,6],
+        ticktext=["Lun","Mar","Mié","Jue","Vie","Sáb","Dom"],
+        autorange="reversed"
+    )
+    n_rows = df["Categoría"].nunique() if facet else 1
+    fig.update_layout(height=60 + 220 * n_rows, margin=dict(l=10,r=10,t=30,b=10))
+    return fig
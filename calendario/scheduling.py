@@ -0,0 +1,242 @@
+# ─────────────────────────────────────────────────────────────────────────────
+# “IA” heurística: encontrar huecos y planificar actividades
+# ─────────────────────────────────────────────────────────────────────────────
+
+from bisect import bisect_left, bisect_right
+from datetime import datetime, date, time, timedelta
+from typing import List, Dict, Tuple, Optional
+
+from .cache import versioned_cache
+from .profiling import timed
+from .recurrence import (Occurrence, CompiledEvent, MASK_DAYS, combine_dt, ordinal_weekday, days_to_mask,
+                         compiled_ordinals, min_to_hhmm)
+from .storage import expand_events_for_range, list_compiled
+
+def day_window(week0: date, wd: int, win_start: time, win_end: time) -> Tuple[datetime, datetime]:
+    d = week0 + timedelta(days=wd)
+    return combine_dt(d, win_start), combine_dt(d, win_end)
+
+class FreeBusy:
+    # Bloques ocupados fusionados y ordenados: starts[i] < ends[i] < starts[i+1].
+    # Ubicar una ventana cuesta O(log n) con bisect; recorrerla, O(bloques en ella).
+    def __init__(self, busy=()):
+        self.starts: List[datetime] = []
+        self.ends: List[datetime] = []
+        for s, e in sorted(busy):
+            if e <= s:
+                continue
+            if self.ends and s <= self.ends[-1]:
+                if e > self.ends[-1]:
+                    self.ends[-1] = e
+            else:
+                self.starts.append(s); self.ends.append(e)
+
+    def __len__(self) -> int:
+        return len(self.starts)
+
+    def add(self, s: datetime, e: datetime):
+        if e <= s:
+            return
+        i = bisect_left(self.ends, s)      # primer bloque que termina en/después de s
+        j = bisect_right(self.starts, e)   # bloques que empiezan antes/en e
+        if i < j:
+            s = min(s, self.starts[i]); e = max(e, self.ends[j - 1])
+        self.starts[i:j] = [s]
+        self.ends[i:j] = [e]
+
+    def is_free(self, s: datetime, e: datetime) -> bool:
+        i = bisect_right(self.ends, s)
+        return i == len(self.starts) or self.starts[i] >= e
+
+    def gaps(self, win_s: datetime, win_e: datetime, min_minutes: int = 0):
+        # Huecos libres dentro de [win_s, win_e) de al menos min_minutes, en orden
+        need = timedelta(minutes=min_minutes)
+        cursor = win_s
+        k = bisect_right(self.ends, win_s)
+        while k < len(self.starts) and self.starts[k] < win_e:
+            if self.starts[k] > cursor and self.starts[k] - cursor >= need:
+                yield cursor, self.starts[k]
+            cursor = max(cursor, self.ends[k])
+            k += 1
+        if win_e > cursor and win_e - cursor >= need:
+            yield cursor, win_e
+
+    def first_gap(self, win_s: datetime, win_e: datetime, duration_min: int) -> Optional[Tuple[datetime, datetime]]:
+        for g_s, _ in self.gaps(win_s, win_e, duration_min):
+            return g_s, g_s + timedelta(minutes=duration_min)
+        return None
+
+def find_slot_in_day(busy: List[Tuple[datetime, datetime]],
+                     win_s: datetime, win_e: datetime, duration_min: int) -> Optional[Tuple[datetime, datetime]]:
+    return FreeBusy(busy).first_gap(win_s, win_e, duration_min)
+
+@timed("suggest.suggest_slots")
+def suggest_slots(occs: List[Occurrence], week0: date, days_mask: List[int],
+                  duration_min: int, win_start: time, win_end: time,
+                  respect_existing: bool, start_from_now: bool = True, only_next: bool = True):
+    suggestions = []
+    fb = FreeBusy((ev.start, ev.end) for ev in occs) if respect_existing else FreeBusy()
+    days_to_try = days_mask if days_mask else list(range(7))
+    now_dt = datetime.now()
+    for i in days_to_try:
+        win_s, win_e = day_window(week0, i, win_start, win_end)
+        if start_from_now and (week0 + timedelta(days=i)) == now_dt.date():
+            if win_s < now_dt < win_e:
+                win_s = now_dt
+        slot = fb.first_gap(win_s, win_e, duration_min)
+        if slot:
+            suggestions.append(slot)
+            if respect_existing:
+                fb.add(*slot)
+        if not days_mask and slot:
+            break
+    if only_next and suggestions:
+        future = [s for s in suggestions if s[0] >= now_dt]
+        if future:
+            suggestions = [min(future, key=lambda x: x[0])]
+        else:
+            suggestions = [min(suggestions, key=lambda x: x[0])]
+    return suggestions
+
+# Planificador por lotes: varias actividades × N semanas en una sola pasada
+# sobre un único FreeBusy. Cada actividad es un dict con title, category_id,
+# duration_min, days (vacío = todos), win_start, win_end y per_week.
+ACTIVITY_KEYS = ("title", "category_id", "duration_min", "days", "win_start", "win_end", "per_week")
+
+@timed("suggest.plan_batch")
+def plan_batch(user_id: str, activities: List[Dict], week0: date, n_weeks: int = 1,
+               respect_existing: bool = True, start_from_now: bool = True, only_next: bool = False) -> List[Dict]:
+    # only_next: como en suggest_slots, solo la primera ubicación del plan (el plan
+    # completo queda en caché y se recorta aquí)
+    acts = tuple(tuple(tuple(a[k]) if k == "days" else a[k] for k in ACTIVITY_KEYS) for a in activities)
+    now_key = datetime.now().replace(second=0, microsecond=0) if start_from_now else None
+    placed = _plan_batch(user_id, acts, week0, n_weeks, respect_existing, now_key)
+    return placed[:1] if only_next else placed
+
+@versioned_cache
+def _plan_batch(user_id: str, acts: Tuple, week0: date, n_weeks: int,
+                respect_existing: bool, now_dt: Optional[datetime]) -> List[Dict]:
+    fb = FreeBusy()
+    if respect_existing:
+        occs = expand_events_for_range(user_id, week0, week0 + timedelta(days=7 * n_weeks - 1))
+        fb = FreeBusy((o.start, o.end) for o in occs)
+    placed = []
+    for w in range(n_weeks):
+        wk = week0 + timedelta(days=7 * w)
+        for a_idx, (title, cat_id, dur, days, win_start, win_end, per_week) in enumerate(acts):
+            days = list(days) or list(range(7))
+            count = 0
+            # cada vuelta coloca como máximo una vez por día, así se reparten en la semana
+            while count < per_week:
+                before = count
+                for i in days:
+                    if count >= per_week:
+                        break
+                    win_s, win_e = day_window(wk, i, win_start, win_end)
+                    if now_dt is not None:
+                        if win_e <= now_dt:
+                            continue
+                        win_s = max(win_s, now_dt)
+                    slot = fb.first_gap(win_s, win_e, dur)
+                    if slot:
+                        fb.add(*slot)
+                        count += 1
+                        placed.append({"activity": a_idx, "week": w, "title": title, "category_id": cat_id,
+                                       "start": slot[0], "end": slot[1]})
+                if count == before:
+                    break
+    placed.sort(key=lambda p: p["start"])
+    return placed
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Conflictos al agregar: solapes calculados sobre las definiciones
+# ─────────────────────────────────────────────────────────────────────────────
+# Nada se expande: una puntual choca con otra si es el mismo día y las horas se
+# cruzan; con una regla si el día cae en su rango y en uno de sus días de semana;
+# dos reglas chocan si comparten día de semana, se cruzan en horario y la
+# intersección de sus rangos contiene al menos una fecha de ese día de semana.
+class ConflictIndex:
+    # Puntuales por ordinal de fecha y reglas por día de semana, ordenadas por
+    # minuto de inicio: solo se miran las que empiezan antes de que termine el
+    # evento nuevo. Todo sobre definiciones compiladas (CompiledEvent).
+    def __init__(self, events: List[CompiledEvent]):
+        self.by_ord: Dict[int, List[CompiledEvent]] = {}
+        rules = [[] for _ in range(7)]
+        for ev in events:
+            if ev.recurring:
+                for wd in MASK_DAYS[ev.mask]:
+                    rules[wd].append(ev)
+            elif ev.mask:
+                self.by_ord.setdefault(ev.lo, []).append(ev)
+        for wd_rules in rules:
+            wd_rules.sort(key=lambda r: r.start_min)
+        self.rules = rules
+        # columnas paralelas: el filtro recorre enteros, no atributos de la tupla
+        self.rule_starts = [[r.start_min for r in wd_rules] for wd_rules in rules]
+        self.rule_ends = [[r.end_min for r in wd_rules] for wd_rules in rules]
+        self.rule_los = [[r.lo for r in wd_rules] for wd_rules in rules]
+        self.rule_his = [[r.hi for r in wd_rules] for wd_rules in rules]
+        self._entries = sum(map(len, self.by_ord.values())) + sum(map(len, rules))
+
+    def __sizeof__(self) -> int:
+        # estimación para el límite de bytes del caché (las tuplas compiladas se comparten)
+        return object.__sizeof__(self) + 16 * self._entries
+
+    def _rules_on(self, wd: int, s_min: int, e_min: int, lo: int, hi: int):
+        # reglas del día de semana que se cruzan en horario y en [lo, hi] de fechas
+        n = bisect_left(self.rule_starts[wd], e_min)
+        return [ev for ev, end, r_lo, r_hi in zip(self.rules[wd][:n], self.rule_ends[wd][:n],
+                                                   self.rule_los[wd][:n], self.rule_his[wd][:n])
+                if end > s_min and r_lo <= hi and r_hi >= lo]
+
+    def conflicts(self, row: Dict) -> List[Dict]:
+        s_min = row["start"].hour * 60 + row["start"].minute
+        e_min = row["end"].hour * 60 + row["end"].minute
+        found: Dict[int, list] = {}   # id → [evento, primer ordinal, cantidad]
+
+        def report(ev, o, n):
+            prev = found.get(ev.id)
+            if prev is None:
+                found[ev.id] = [ev, o, n]
+            else:
+                prev[1] = min(prev[1], o); prev[2] += n
+
+        if "days" not in row:
+            o = row["date"].toordinal()
+            for ev in self.by_ord.get(o, ()):
+                if ev.start_min < e_min and ev.end_min > s_min:
+                    report(ev, o, 1)
+            for ev in self._rules_on(ordinal_weekday(o), s_min, e_min, o, o):
+                report(ev, o, 1)
+        else:
+            lo, hi = row["start_date"].toordinal(), row["end_date"].toordinal()
+            mask = days_to_mask(row["days"])
+            if hi - lo + 1 <= len(self.by_ord):
+                ords = compiled_ordinals(mask, lo, hi)
+            else:
+                ords = sorted(o for o in self.by_ord if lo <= o <= hi and mask >> ordinal_weekday(o) & 1)
+            for o in ords:
+                for ev in self.by_ord.get(o, ()):
+                    if ev.start_min < e_min and ev.end_min > s_min:
+                        report(ev, o, 1)
+            for wd in MASK_DAYS[mask]:
+                for ev in self._rules_on(wd, s_min, e_min, lo, hi):
+                    a, b = max(lo, ev.lo), min(hi, ev.hi)
+                    first = a + (wd - a + 1) % 7
+                    if first <= b:
+                        report(ev, first, (b - first) // 7 + 1)
+        out = [{"id": ev.id, "title": ev.title, "recurring": ev.recurring, "date": date.fromordinal(o), "count": n,
+                "start_time": min_to_hhmm(ev.start_min), "end_time": min_to_hhmm(ev.end_min)}
+               for ev, o, n in found.values()]
+        return sorted(out, key=lambda c: (c["date"], c["start_time"]))
+
+@versioned_cache
+def conflict_index(user_id: str) -> ConflictIndex:
+    return ConflictIndex(list_compiled(user_id))
+
+@timed("suggest.find_conflicts")
+def find_conflicts(user_id: str, row: Dict) -> List[Dict]:
+    # row: mismo formato que add_events_bulk (puntual o recurrente). Devuelve un
+    # dict por evento existente que se solapa, con la primera fecha en conflicto
+    # y cuántas fechas chocan.
+    return conflict_index(user_id).conflicts(row)
@@ -0,0 +1,294 @@
+# ─────────────────────────────────────────────────────────────────────────────
+# Servicio HTTP/JSON de libre/ocupado y consultas, sin Streamlit
+# ─────────────────────────────────────────────────────────────────────────────
+# Servidor asyncio mínimo (HTTP/1.1 con keep-alive, solo biblioteca estándar).
+# El bucle de eventos solo parsea y serializa: cada pedido pasa su trabajo de
+# SQLite a un pool de hilos acotado (SERVICE_WORKERS, igual al tamaño del pool de
+# conexiones) y un semáforo limita cuántos pedidos esperan ese pool. Los lotes se
+# resuelven en un solo salto al pool. Las respuestas por consulta se memoizan con
+# versioned_cache, así que un cambio de datos del usuario las invalida solo.
+#
+# Uso:
+#   python -m calendario.service --db planner.db --port 8765
+#   curl -s localhost:8765/v1/freebusy -d '{"user_id": "ana", "start": "2025-03-03T09:00", "end": "2025-03-03T10:00"}'
+#
+# Endpoints (POST, cuerpo JSON; los /batch reciben {"queries": [...]}):
+#   /v1/freebusy        {user_id, start, end}                → free, busy[[s, e]]
+#   /v1/next_gap        {user_id, after, duration_min, win_start?, win_end?, days?, horizon_days?}
+#                                                            → start, end (o null)
+#   /v1/occurrences     {user_id, start_date, end_date}      → occurrences[]
+#   /v1/upcoming        {user_id, after, n?}                 → occurrences[]
+#   GET /health                                              → contadores
+# Carga local: python bench/bench_service.py
+
+import json
+import asyncio
+import logging
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, date, time, timedelta
+from typing import Callable, Dict, List, Tuple
+
+from .db import configure, get_db_path
+from .cache import versioned_cache, get_occ_cache
+from .profiling import timed
+from .recurrence import week_start
+from .scheduling import FreeBusy, day_window
+from .storage import init_db, expand_events_for_range, next_occurrences
+
+SERVICE_WORKERS = 8           # hilos para SQLite (= ConnectionPool.size)
+SERVICE_MAX_INFLIGHT = 256    # pedidos esperando el pool; el resto espera en el socket
+SERVICE_MAX_BATCH = 1000      # consultas por pedido /batch
+SERVICE_MAX_BODY = 1 << 20
+NEXT_GAP_HORIZON_DAYS = 28
+
+log = logging.getLogger("calendario.service")
+
+def _iso(dt: datetime) -> str:
+    return dt.isoformat(timespec="minutes")
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Consultas (bloqueantes; memoizadas por versión de datos del usuario)
+# ─────────────────────────────────────────────────────────────────────────────
+@timed("service.free_busy")
+@versioned_cache
+def free_busy(user_id: str, start: datetime, end: datetime) -> Dict:
+    # Bloques ocupados (fusionados y recortados a la ventana) dentro de [start, end)
+    occs = expand_events_for_range(user_id, start.date(), (end - timedelta(microseconds=1)).date())
+    fb = FreeBusy((max(o.start, start), min(o.end, end)) for o in occs if o.start < end and o.end > start)
+    return {"user_id": user_id, "start": _iso(start), "end": _iso(end), "free": not len(fb),
+            "busy": [[_iso(s), _iso(e)] for s, e in zip(fb.starts, fb.ends)]}
+
+@timed("service.next_gap")
+@versioned_cache
+def next_gap(user_id: str, after: datetime, duration_min: int, win_start: time, win_end: time,
+             days: Tuple[int, ...], horizon_days: int) -> Dict:
+    # Primer hueco de duration_min desde `after`, dentro de la franja diaria y los
+    # días pedidos (vacío = todos); semana a semana, con la expansión cacheada.
+    last = after.date() + timedelta(days=horizon_days)
+    week0 = week_start(after.date())
+    while week0 <= last:
+        occs = expand_events_for_range(user_id, week0, week0 + timedelta(days=6))
+        fb = FreeBusy((o.start, o.end) for o in occs)
+        for wd in range(7):
+            d = week0 + timedelta(days=wd)
+            if d < after.date() or d > last or (days and wd not in days):
+                continue
+            win_s, win_e = day_window(week0, wd, win_start, win_end)
+            slot = fb.first_gap(max(win_s, after), win_e, duration_min)
+            if slot:
+                return {"user_id": user_id, "start": _iso(slot[0]), "end": _iso(slot[1])}
+        week0 += timedelta(days=7)
+    return {"user_id": user_id, "start": None, "end": None}
+
+def _occ_json(occs) -> List[Dict]:
+    return [{"id": o.id, "title": o.title, "start": _iso(o.start), "end": _iso(o.end),
+             "category": o.category["name"] if o.category else None, "recurring": o.recurring}
+            for o in occs]
+
+@versioned_cache
+def occurrences_json(user_id: str, start_d: date, end_d: date) -> Dict:
+    return {"user_id": user_id, "occurrences": _occ_json(expand_events_for_range(user_id, start_d, end_d))}
+
+@versioned_cache
+def upcoming_json(user_id: str, after: datetime, n: int) -> Dict:
+    return {"user_id": user_id, "occurrences": _occ_json(next_occurrences(user_id, after, n))}
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Validación: dict JSON → llamada. ValueError/KeyError/TypeError → 400
+# ─────────────────────────────────────────────────────────────────────────────
+def _user(q: Dict) -> str:
+    user_id = q["user_id"]
+    if not isinstance(user_id, str) or not user_id:
+        raise ValueError("user_id inválido")
+    return user_id
+
+def _minute(s: str) -> datetime:
+    return datetime.fromisoformat(s).replace(second=0, microsecond=0, tzinfo=None)
+
+def q_free_busy(q: Dict) -> Dict:
+    start, end = _minute(q["start"]), _minute(q["end"])
+    if end <= start or end - start > timedelta(days=366):
+        raise ValueError("ventana inválida (end <= start o más de un año)")
+    return free_busy(_user(q), start, end)
+
+def q_next_gap(q: Dict) -> Dict:
+    dur = int(q.get("duration_min", 60))
+    win_start = time.fromisoformat(q.get("win_start", "00:00"))
+    win_end = time.fromisoformat(q.get("win_end", "23:59"))
+    days = tuple(sorted({int(d) for d in q.get("days", ())}))
+    horizon = int(q.get("horizon_days", NEXT_GAP_HORIZON_DAYS))
+    if not 0 < dur <= 24 * 60 or win_end <= win_start or any(d not in range(7) for d in days) \
+            or not 0 <= horizon <= 366:
+        raise ValueError("parámetros de next_gap inválidos")
+    return next_gap(_user(q), _minute(q["after"]), dur, win_start, win_end, days, horizon)
+
+def q_occurrences(q: Dict) -> Dict:
+    start_d, end_d = date.fromisoformat(q["start_date"]), date.fromisoformat(q["end_date"])
+    if end_d < start_d or (end_d - start_d).days > 366:
+        raise ValueError("rango inválido")
+    return occurrences_json(_user(q), start_d, end_d)
+
+def q_upcoming(q: Dict) -> Dict:
+    n = int(q.get("n", 10))
+    if not 0 < n <= 500:
+        raise ValueError("n fuera de rango (1..500)")
+    return upcoming_json(_user(q), _minute(q["after"]), n)
+
+QUERIES: Dict[str, Callable[[Dict], Dict]] = {
+    "/v1/freebusy": q_free_busy, "/v1/next_gap": q_next_gap,
+    "/v1/occurrences": q_occurrences, "/v1/upcoming": q_upcoming,
+}
+
+def run_batch(fn: Callable[[Dict], Dict], queries: List[Dict]) -> List[Dict]:
+    # En el hilo del pool: un error en una consulta no tumba el lote
+    out = []
+    for q in queries:
+        try:
+            out.append(fn(q))
+        except (ValueError, KeyError, TypeError) as e:
+            out.append({"error": f"{type(e).__name__}: {e}"})
+    return out
+
+# ─────────────────────────────────────────────────────────────────────────────
+# HTTP
+# ─────────────────────────────────────────────────────────────────────────────
+class HttpError(Exception):
+    def __init__(self, status: int, message: str):
+        super().__init__(message)
+        self.status = status
+
+REASONS = {200: "OK", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed",
+           413: "Payload Too Large", 500: "Internal Server Error"}
+
+class FreeBusyService:
+    def __init__(self, workers: int = SERVICE_WORKERS, max_inflight: int = SERVICE_MAX_INFLIGHT,
+                 max_batch: int = SERVICE_MAX_BATCH):
+        self.max_batch = max_batch
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="calendario-service")
+        self._inflight = asyncio.Semaphore(max_inflight)
+        self.requests = 0
+        self.queries = 0
+        self.errors = 0
+
+    def stats(self) -> Dict:
+        return {"ok": True, "requests": self.requests, "queries": self.queries, "errors": self.errors,
+                "cache": get_occ_cache().stats()}
+
+    async def _blocking(self, fn, *args):
+        async with self._inflight:
+            return await asyncio.get_running_loop().run_in_executor(self._pool, fn, *args)
+
+    async def dispatch(self, method: str, path: str, body: bytes) -> Dict:
+        if path == "/health":
+            return self.stats()
+        batch = path.endswith("/batch")
+        fn = QUERIES.get(path[:-len("/batch")] if batch else path)
+        if fn is None:
+            raise HttpError(404, f"ruta desconocida: {path}")
+        if method != "POST":
+            raise HttpError(405, "usar POST")
+        try:
+            payload = json.loads(body)
+        except ValueError:
+            raise HttpError(400, "JSON inválido")
+        if not batch:
+            if not isinstance(payload, dict):
+                raise HttpError(400, "se esperaba un objeto JSON")
+            self.queries += 1
+            try:
+                return await self._blocking(fn, payload)
+            except (ValueError, KeyError, TypeError) as e:
+                raise HttpError(400, f"{type(e).__name__}: {e}")
+        queries = payload.get("queries") if isinstance(payload, dict) else None
+        if not isinstance(queries, list) or not all(isinstance(q, dict) for q in queries):
+            raise HttpError(400, "se esperaba {\"queries\": [objetos]}")
+        if len(queries) > self.max_batch:
+            raise HttpError(413, f"más de {self.max_batch} consultas por lote")
+        self.queries += len(queries)
+        return {"results": await self._blocking(run_batch, fn, queries)}
+
+    async def handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            while True:
+                try:
+                    head = await reader.readuntil(b"\r\n\r\n")
+                except (asyncio.IncompleteReadError, asyncio.LimitOverrunError, ConnectionError):
+                    break
+                lines = head.decode("latin-1").split("\r\n")
+                method, target, version = (lines[0].split(" ") + ["", ""])[:3]
+                headers = {}
+                for line in lines[1:]:
+                    k, sep, v = line.partition(":")
+                    if sep:
+                        headers[k.strip().lower()] = v.strip()
+                keep_alive = headers.get("connection", "").lower() != "close" and version == "HTTP/1.1"
+                self.requests += 1
+                try:
+                    length = int(headers.get("content-length", "0"))
+                    if length > SERVICE_MAX_BODY:
+                        keep_alive = False
+                        raise HttpError(413, "cuerpo demasiado grande")
+                    body = await reader.readexactly(length) if length else b""
+                    status, result = 200, await self.dispatch(method, target.split("?", 1)[0], body)
+                except HttpError as e:
+                    self.errors += 1
+                    status, result = e.status, {"error": str(e)}
+                except ValueError:
+                    self.errors += 1
+                    keep_alive = False
+                    status, result = 400, {"error": "encabezados inválidos"}
+                except asyncio.IncompleteReadError:
+                    break
+                except Exception:
+                    self.errors += 1
+                    log.exception("Error atendiendo %s %s", method, target)
+                    status, result = 500, {"error": "error interno"}
+                data = json.dumps(result, ensure_ascii=False).encode("utf-8")
+                writer.write(f"HTTP/1.1 {status} {REASONS.get(status, '')}\r\n"
+                             f"Content-Type: application/json; charset=utf-8\r\n"
+                             f"Content-Length: {len(data)}\r\n"
+                             f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n".encode("latin-1") + data)
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    async def serve(self, host: str = "127.0.0.1", port: int = 8765) -> asyncio.AbstractServer:
+        return await asyncio.start_server(self.handle, host, port, limit=SERVICE_MAX_BODY, backlog=1024)
+
+    def shutdown(self):
+        self._pool.shutdown(wait=True)
+
+async def serve_forever(host: str, port: int, workers: int = SERVICE_WORKERS):
+    service = FreeBusyService(workers)
+    server = await service.serve(host, port)
+    log.info("Escuchando en %s", ", ".join(str(s.getsockname()) for s in server.sockets))
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        service.shutdown()
+
+def main():
+    ap = argparse.ArgumentParser(description="Servicio HTTP/JSON de libre/ocupado del planner.")
+    ap.add_argument("--db", default="", help="ruta de planner.db")
+    ap.add_argument("--shard-dir", default=None, help="carpeta de particiones (modo particionado)")
+    ap.add_argument("--host", default="127.0.0.1")
+    ap.add_argument("--port", type=int, default=8765)
+    ap.add_argument("--workers", type=int, default=SERVICE_WORKERS, help="hilos para SQLite")
+    args = ap.parse_args()
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(message)s")
+    if args.db or args.shard_dir is not None:
+        configure(args.db or get_db_path(), shard_dir=args.shard_dir)
+    init_db()
+    try:
+        asyncio.run(serve_forever(args.host, args.port, args.workers))
+    except KeyboardInterrupt:
+        pass
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,584 @@
+# ─────────────────────────────────────────────────────────────────────────────
+# Almacenamiento: esquema, migraciones, altas/bajas y consultas de eventos
+# ─────────────────────────────────────────────────────────────────────────────
+
+import os
+import json
+import hashlib
+import sqlite3
+import heapq
+import threading
+import itertools
+from datetime import datetime, date, time, timedelta
+from typing import List, Dict, Optional, Tuple
+
+from .db import (db, get_pool, bump_data_version, db_path_for, all_db_paths, set_shard_init, sharded,
+                 check_shard_layout)
+from .cache import versioned_cache, get_occ_cache
+from .profiling import timed
+from .recurrence import (Occurrence, CompiledEvent, rule_dates, first_rule_date, last_rule_date,
+                         compile_event_row, expand_definitions, merge_upcoming)
+
+# Tabla occurrences mantenida en cada escritura (opcional, CALENDARIO_MATERIALIZE=1).
+# Por defecto las vistas usan la expansión calculada, que es más rápida de leer.
+# Si se activa sobre una base que ya tenía la tabla (desactivada antes), correr
+# rebuild_occurrences() una vez.
+MATERIALIZE_OCCURRENCES = os.environ.get("CALENDARIO_MATERIALIZE", "") == "1"
+OCC_HORIZON_DAYS = 365   # ventana inicial hacia adelante desde hoy
+OCC_PAST_DAYS = 90       # ventana inicial hacia atrás desde hoy
+OCC_EXTEND_STEP_DAYS = 90   # días materializados por transacción al ampliar la ventana
+
+# PRAGMA user_version de una base con el esquema y las migraciones al día. Subirlo
+# al agregar una migración: create_schema solo corre (y escanea events) si la base
+# tiene una versión menor.
+SCHEMA_VERSION = 1
+
+def init_db():
+    # Base única: crea/migra el esquema. Con particiones: migra las que ya existen;
+    # las nuevas se crean con el esquema al abrirse por primera vez (set_shard_init).
+    # app.py lo llama en cada rerun: con el esquema al día es una lectura de
+    # user_version, sin transacción de escritura.
+    if sharded():
+        check_shard_layout()   # baldes distintos de los de la carpeta: error, no bases vacías
+        for path in all_db_paths():
+            get_pool(path)   # la primera apertura corre create_schema
+        return
+    with db() as con:
+        if schema_version(con) >= SCHEMA_VERSION:
+            return
+    with db(write=True) as con:
+        create_schema(con)
+
+def schema_version(con: sqlite3.Connection) -> int:
+    return con.execute("PRAGMA user_version").fetchone()[0]
+
+def create_schema(con: sqlite3.Connection):
+    # Idempotente: tablas, migraciones de columnas e índices, dentro de la transacción
+    # del llamador. No hace nada si la base ya está en SCHEMA_VERSION.
+    if schema_version(con) >= SCHEMA_VERSION:
+        return
+    cur = con.cursor()
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS users(
+            id TEXT PRIMARY KEY
+        )
+    """)
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS categories(
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id TEXT,
+            name TEXT,
+            color TEXT,
+            UNIQUE(user_id, name)
+        )
+    """)
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS events(
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id TEXT,
+            title TEXT,
+            category_id INTEGER,
+            date TEXT,               -- YYYY-MM-DD (puntual)
+            start_time TEXT,         -- HH:MM
+            end_time TEXT,           -- HH:MM
+            is_recurring INTEGER,    -- 0/1
+            rrule TEXT,              -- JSON: {days:[0-6], start_date, end_date, start_time, end_time}
+            created_at TEXT,
+            rr_start TEXT,           -- YYYY-MM-DD (copia de rrule.start_date, indexada)
+            rr_end TEXT,             -- YYYY-MM-DD (copia de rrule.end_date, indexada)
+            fingerprint TEXT         -- huella de título + horario, para deduplicar importaciones
+        )
+    """)
+    migrate_events_range_columns(cur)
+    migrate_events_fingerprint(cur)
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_events_user_fp ON events(user_id, fingerprint)")
+    # Puntuales: índice parcial que cubre también categoría y horario, así
+    # daily_load agrega sin leer las filas (reemplaza a idx_events_user_date)
+    cur.execute("""
+        CREATE INDEX IF NOT EXISTS idx_events_user_day
+        ON events(user_id, date, category_id, start_time, end_time) WHERE is_recurring=0
+    """)
+    cur.execute("DROP INDEX IF EXISTS idx_events_user_date")
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_events_user_rr ON events(user_id, rr_start, rr_end)")
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS priorities(
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id TEXT,
+            week_start TEXT,         -- YYYY-MM-DD (lunes)
+            goals TEXT,              -- texto libre
+            p1 TEXT, p1_done INTEGER DEFAULT 0,
+            p2 TEXT, p2_done INTEGER DEFAULT 0,
+            p3 TEXT, p3_done INTEGER DEFAULT 0,
+            updated_at TEXT,
+            UNIQUE(user_id, week_start)
+        )
+    """)
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS data_versions(
+            user_id TEXT PRIMARY KEY,
+            version INTEGER NOT NULL DEFAULT 0
+        )
+    """)
+    occ_missing = not cur.execute(
+        "SELECT 1 FROM sqlite_master WHERE type='table' AND name='occurrences'").fetchone()
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS occurrences(
+            event_id INTEGER NOT NULL,
+            user_id TEXT NOT NULL,
+            start TEXT NOT NULL,     -- YYYY-MM-DDTHH:MM
+            end TEXT NOT NULL        -- YYYY-MM-DDTHH:MM
+        )
+    """)
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_occ_user_start ON occurrences(user_id, start)")
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_occ_event ON occurrences(event_id)")
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS occ_horizon(
+            user_id TEXT PRIMARY KEY,
+            until TEXT NOT NULL,     -- YYYY-MM-DD: reglas materializadas hasta aquí
+            since TEXT               -- YYYY-MM-DD: y desde aquí
+        )
+    """)
+    migrate_occ_window(cur)
+    if occ_missing and MATERIALIZE_OCCURRENCES:
+        _rebuild_occurrences(con)
+    cur.execute(f"PRAGMA user_version={SCHEMA_VERSION}")
+
+set_shard_init(create_schema, lambda con: schema_version(con) >= SCHEMA_VERSION)
+
+def migrate_events_range_columns(cur: sqlite3.Cursor):
+    # Bases antiguas: agrega rr_start/rr_end y los rellena desde el JSON de rrule
+    cols = {r[1] for r in cur.execute("PRAGMA table_info(events)")}
+    for col in ("rr_start", "rr_end"):
+        if col not in cols:
+            cur.execute(f"ALTER TABLE events ADD COLUMN {col} TEXT")
+    cur.execute("""
+        UPDATE events
+        SET rr_start = json_extract(rrule, '$.start_date'),
+            rr_end = json_extract(rrule, '$.end_date')
+        WHERE is_recurring=1 AND rrule IS NOT NULL AND (rr_start IS NULL OR rr_end IS NULL)
+    """)
+
+def migrate_occ_window(cur: sqlite3.Cursor):
+    # Bases antiguas materializaban las reglas desde su inicio: ventana abierta hacia atrás
+    cols = {r[1] for r in cur.execute("PRAGMA table_info(occ_horizon)")}
+    if "since" not in cols:
+        cur.execute("ALTER TABLE occ_horizon ADD COLUMN since TEXT")
+        cur.execute("UPDATE occ_horizon SET since='0001-01-01'")
+
+def migrate_events_fingerprint(cur: sqlite3.Cursor):
+    cols = {r[1] for r in cur.execute("PRAGMA table_info(events)")}
+    if "fingerprint" not in cols:
+        cur.execute("ALTER TABLE events ADD COLUMN fingerprint TEXT")
+    rows = cur.execute("""
+        SELECT id, title, date, start_time, end_time, is_recurring, rrule FROM events WHERE fingerprint IS NULL
+    """).fetchall()
+    updates = []
+    for ev_id, title, d, s_t, e_t, is_rec, rr_json in rows:
+        if is_rec:
+            rr = json.loads(rr_json)
+            row = {"title": title, "days": rr["days"], "start_date": rr["start_date"], "end_date": rr["end_date"],
+                   "start": rr["start_time"], "end": rr["end_time"]}
+        else:
+            row = {"title": title, "date": d, "start": s_t, "end": e_t}
+        updates.append((event_fingerprint(row), ev_id))
+    cur.executemany("UPDATE events SET fingerprint=? WHERE id=?", updates)
+
+@timed("db.ensure_user")
+def ensure_user(user_id: str):
+    with db(write=True, user_id=user_id) as con:
+        con.execute("INSERT OR IGNORE INTO users(id) VALUES (?)", (user_id,))
+
+@timed("db.list_categories")
+@versioned_cache
+def list_categories(user_id: str) -> List[Dict]:
+    with db(user_id=user_id) as con:
+        cur = con.cursor()
+        cur.execute("SELECT id, name, color FROM categories WHERE user_id=? ORDER BY name", (user_id,))
+        rows = cur.fetchall()
+    return [{"id": r[0], "name": r[1], "color": r[2]} for r in rows]
+
+@timed("db.upsert_category")
+def upsert_category(user_id: str, name: str, color: str):
+    with db(write=True, user_id=user_id) as con:
+        con.execute("""
+            INSERT INTO categories(user_id, name, color) VALUES (?, ?, ?)
+            ON CONFLICT(user_id, name) DO UPDATE SET color=excluded.color
+        """, (user_id, name, color))
+        bump_data_version(con, user_id)
+
+@timed("db.delete_category")
+def delete_category(user_id: str, cat_id: int):
+    with db(write=True, user_id=user_id) as con:
+        con.execute("DELETE FROM categories WHERE user_id=? AND id=?", (user_id, cat_id))
+        bump_data_version(con, user_id)
+
+def add_event_punctual(user_id: str, title: str, category_id: int, d: date, start: time, end: time) -> int:
+    return add_events_bulk(user_id, [{"title": title, "category_id": category_id,
+                                      "date": d, "start": start, "end": end}])[0]
+
+def add_event_recurring(user_id: str, title: str, category_id: int,
+                        start_date: date, end_date: date, days: List[int], start: time, end: time) -> int:
+    return add_events_bulk(user_id, [{"title": title, "category_id": category_id, "days": days,
+                                      "start_date": start_date, "end_date": end_date,
+                                      "start": start, "end": end}])[0]
+
+def event_fingerprint(row: Dict) -> str:
+    # Misma huella para la misma actividad sin importar categoría ni id. Las reglas
+    # usan su primera/última ocurrencia real, así una regla exportada a ICS (que
+    # arranca en el primer día que coincide) se reconoce al volver a importarla.
+    hhmm = lambda t: t if isinstance(t, str) else t.strftime("%H:%M")
+    as_date = lambda d: d if isinstance(d, date) else date.fromisoformat(d)
+    if "days" in row:
+        lo, hi = as_date(row["start_date"]), as_date(row["end_date"])
+        first, last = first_rule_date(row["days"], lo, hi), last_rule_date(row["days"], lo, hi)
+        key = ["R", row["title"], " ".join(str(d) for d in sorted(set(row["days"]))),
+               str(first or lo), str(last or hi), hhmm(row["start"]), hhmm(row["end"])]
+    else:
+        key = ["P", row["title"], str(row["date"]), hhmm(row["start"]), hhmm(row["end"])]
+    return hashlib.sha1("\x1f".join(key).encode("utf-8")).hexdigest()
+
+def _validate_event_row(i: int, row: Dict):
+    if not row.get("title"):
+        raise ValueError(f"Fila {i}: falta el título.")
+    if row["end"] <= row["start"]:
+        raise ValueError(f"Fila {i}: la hora de fin debe ser posterior a la de inicio.")
+    if "days" in row:
+        if not row["days"] or any(d not in range(7) for d in row["days"]):
+            raise ValueError(f"Fila {i}: días de la semana inválidos.")
+        if row["end_date"] < row["start_date"]:
+            raise ValueError(f"Fila {i}: rango de fechas inválido.")
+
+@timed("db.add_events_bulk")
+def add_events_bulk(user_id: str, rows: List[Dict]) -> List[int]:
+    # Filas puntuales: title, category_id, date, start, end.
+    # Filas recurrentes: además days, start_date, end_date (en lugar de date).
+    # Todo se valida antes de escribir y se inserta en una sola transacción.
+    for i, row in enumerate(rows):
+        _validate_event_row(i, row)
+    if not rows:
+        return []
+    now_iso = datetime.now().isoformat()
+    values, rules = [], []
+    for row in rows:
+        s_t, e_t = row["start"].strftime("%H:%M"), row["end"].strftime("%H:%M")
+        if "days" in row:
+            rrule = {
+                "days": list(row["days"]),  # 0=Lun...6=Dom
+                "start_date": row["start_date"].isoformat(),
+                "end_date": row["end_date"].isoformat(),
+                "start_time": s_t,
+                "end_time": e_t,
+                "freq": "weekly"
+            }
+            rules.append(rrule)
+            values.append((user_id, row["title"], row["category_id"], None, None, None, 1,
+                           json.dumps(rrule), now_iso, rrule["start_date"], rrule["end_date"],
+                           row.get("fingerprint") or event_fingerprint(row)))
+        else:
+            rules.append(None)
+            values.append((user_id, row["title"], row["category_id"], row["date"].isoformat(), s_t, e_t, 0,
+                           None, now_iso, None, None, row.get("fingerprint") or event_fingerprint(row)))
+    with db(write=True, user_id=user_id) as con:
+        con.executemany("""
+            INSERT INTO events(user_id, title, category_id, date, start_time, end_time, is_recurring, rrule, created_at,
+                               rr_start, rr_end, fingerprint)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        """, values)
+        # Con el lock de escritura tomado, AUTOINCREMENT asigna ids consecutivos
+        last = con.execute("SELECT seq FROM sqlite_sequence WHERE name='events'").fetchone()[0]
+        ids = list(range(last - len(values) + 1, last + 1))
+        if MATERIALIZE_OCCURRENCES:
+            since, until = get_occ_window(con, user_id)
+            occ_rows = []
+            for ev_id, v, rr in zip(ids, values, rules):
+                if rr is None:
+                    occ_rows.append((ev_id, user_id, f"{v[3]}T{v[4]}", f"{v[3]}T{v[5]}"))
+                else:
+                    occ_rows += _occ_rows_for_rule(ev_id, user_id, rr,
+                                                   max(date.fromisoformat(rr["start_date"]), since),
+                                                   min(date.fromisoformat(rr["end_date"]), until))
+            con.executemany("INSERT INTO occurrences(event_id, user_id, start, end) VALUES (?, ?, ?, ?)", occ_rows)
+        bump_data_version(con, user_id)
+    return ids
+
+@timed("db.delete_event")
+def delete_event(user_id: str, event_id: int):
+    with db(write=True, user_id=user_id) as con:
+        con.execute("DELETE FROM events WHERE user_id=? AND id=?", (user_id, event_id))
+        con.execute("DELETE FROM occurrences WHERE user_id=? AND event_id=?", (user_id, event_id))
+        bump_data_version(con, user_id)
+    _compiled_cache(db_path_for(user_id)).pop(event_id, None)
+
+def _event_rows_to_dicts(rows) -> List[Dict]:
+    out = []
+    for r in rows:
+        out.append({
+            "id": r[0], "title": r[1], "category_id": r[2],
+            "date": r[3], "start_time": r[4], "end_time": r[5],
+            "is_recurring": bool(r[6]),
+            "rrule": json.loads(r[7]) if r[7] else None
+        })
+    return out
+
+@timed("db.list_events_raw")
+def list_events_raw(user_id: str) -> List[Dict]:
+    with db(user_id=user_id) as con:
+        cur = con.cursor()
+        cur.execute("""
+            SELECT id, title, category_id, date, start_time, end_time, is_recurring, rrule
+            FROM events WHERE user_id=?
+        """, (user_id,))
+        rows = cur.fetchall()
+    return _event_rows_to_dicts(rows)
+
+# Solo las definiciones que pueden caer en [start_d, end_d]: puntuales por
+# idx_events_user_day y recurrentes por idx_events_user_rr (UNION ALL para que
+# cada rama use su índice; un OR dentro del WHERE forzaría un scan por user_id).
+EVENTS_IN_RANGE_SQL = """
+    SELECT id, title, category_id, date, start_time, end_time, is_recurring, rrule
+    FROM events WHERE user_id=? AND date BETWEEN ? AND ? AND is_recurring=0
+    UNION ALL
+    SELECT id, title, category_id, date, start_time, end_time, is_recurring, rrule
+    FROM events WHERE user_id=? AND rr_start <= ? AND rr_end >= ? AND is_recurring=1
+"""
+
+@timed("db.list_events_in_range")
+def list_events_in_range(user_id: str, start_d: date, end_d: date) -> List[Dict]:
+    s, e = start_d.isoformat(), end_d.isoformat()
+    with db(user_id=user_id) as con:
+        cur = con.cursor()
+        cur.execute(EVENTS_IN_RANGE_SQL, (user_id, s, e, user_id, e, s))
+        rows = cur.fetchall()
+    return _event_rows_to_dicts(rows)
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Definiciones compiladas, cacheadas por id de evento
+# ─────────────────────────────────────────────────────────────────────────────
+# Un evento no se modifica después de insertado (solo se borra) y AUTOINCREMENT
+# no reutiliza ids, así que el id alcanza como clave dentro de una base; hay un
+# diccionario por ruta de base (por partición, si las hay). delete_event saca su entrada.
+COMPILED_CACHE_MAX = 500_000
+_compiled: Dict[str, Dict[int, CompiledEvent]] = {}
+_compiled_lock = threading.Lock()
+
+def _compiled_cache(path: str) -> Dict[int, CompiledEvent]:
+    cache = _compiled.get(path)
+    if cache is None:
+        with _compiled_lock:
+            cache = _compiled.setdefault(path, {})
+    return cache
+
+def clear_compiled_cache():
+    with _compiled_lock:
+        _compiled.clear()
+
+def compile_rows(rows, path: str) -> List[CompiledEvent]:
+    # `path`: base de la que salen las filas (db_path_for(user_id))
+    cache = _compiled_cache(path)
+    if len(cache) > COMPILED_CACHE_MAX:
+        cache.clear()
+    out = []
+    for row in rows:
+        ev = cache.get(row[0])
+        if ev is None:
+            ev = cache[row[0]] = compile_event_row(row)
+        out.append(ev)
+    return out
+
+@timed("db.list_compiled_in_range")
+def list_compiled_in_range(user_id: str, start_d: date, end_d: date) -> List[CompiledEvent]:
+    s, e = start_d.isoformat(), end_d.isoformat()
+    with db(user_id=user_id) as con:
+        rows = con.execute(EVENTS_IN_RANGE_SQL, (user_id, s, e, user_id, e, s)).fetchall()
+    return compile_rows(rows, db_path_for(user_id))
+
+@timed("db.list_compiled")
+def list_compiled(user_id: str) -> List[CompiledEvent]:
+    with db(user_id=user_id) as con:
+        rows = con.execute("""
+            SELECT id, title, category_id, date, start_time, end_time, is_recurring, rrule
+            FROM events WHERE user_id=?
+        """, (user_id,)).fetchall()
+    return compile_rows(rows, db_path_for(user_id))
+
+def explain_events_in_range(user_id: str, start_d: date, end_d: date) -> List[str]:
+    s, e = start_d.isoformat(), end_d.isoformat()
+    with db(user_id=user_id) as con:
+        rows = con.execute("EXPLAIN QUERY PLAN " + EVENTS_IN_RANGE_SQL, (user_id, s, e, user_id, e, s)).fetchall()
+    return [r[-1] for r in rows]
+
+# Prioridades
+@timed("db.get_priorities")
+def get_priorities(user_id: str, week0: date) -> Dict:
+    with db(user_id=user_id) as con:
+        cur = con.cursor()
+        cur.execute("""
+            SELECT goals, p1, p1_done, p2, p2_done, p3, p3_done
+            FROM priorities WHERE user_id=? AND week_start=?
+        """, (user_id, week0.isoformat()))
+        row = cur.fetchone()
+    if not row:
+        return {"goals":"", "p1":"", "p1_done":0, "p2":"", "p2_done":0, "p3":"", "p3_done":0}
+    return {"goals":row[0] or "", "p1":row[1] or "", "p1_done":row[2] or 0,
+            "p2":row[3] or "", "p2_done":row[4] or 0, "p3":row[5] or "", "p3_done":row[6] or 0}
+
+@timed("db.upsert_priorities")
+def upsert_priorities(user_id: str, week0: date, goals: str, p1: str, p1_done: bool, p2: str, p2_done: bool, p3: str, p3_done: bool):
+    with db(write=True, user_id=user_id) as con:
+        con.execute("""
+            INSERT INTO priorities(user_id, week_start, goals, p1, p1_done, p2, p2_done, p3, p3_done, updated_at)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            ON CONFLICT(user_id, week_start) DO UPDATE SET
+              goals=excluded.goals, p1=excluded.p1, p1_done=excluded.p1_done,
+              p2=excluded.p2, p2_done=excluded.p2_done, p3=excluded.p3, p3_done=excluded.p3_done,
+              updated_at=excluded.updated_at
+        """, (user_id, week0.isoformat(), goals, p1, int(p1_done), p2, int(p2_done), p3, int(p3_done), datetime.now().isoformat()))
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Expansión a ocurrencias (listas de Occurrence, sin pandas)
+# ─────────────────────────────────────────────────────────────────────────────
+@timed("expand.expand_events_for_range")
+@versioned_cache
+def expand_events_for_range(user_id: str, start_d: date, end_d: date) -> List[Occurrence]:
+    cats = {c["id"]: c for c in list_categories(user_id)}
+    return expand_definitions(list_compiled_in_range(user_id, start_d, end_d), start_d, end_d, cats)
+
+def expand_events_for_week(user_id: str, week0: date) -> List[Occurrence]:
+    return expand_events_for_range(user_id, week0, week0 + timedelta(days=6))
+
+# Próximas n ocurrencias sin límite de horizonte: de las puntuales basta con las
+# n primeras (idx_events_user_day ya las da ordenadas por fecha); las reglas
+# vigentes se leen en orden de rr_start (idx_events_user_rr) a medida que
+# merge_upcoming las necesita, sin traer las que empiezan después del n-ésimo.
+UPCOMING_PUNCTUAL_SQL = """
+    SELECT id, title, category_id, date, start_time, end_time, is_recurring, rrule
+    FROM events WHERE user_id=? AND is_recurring=0 AND date >= ?
+      AND (date > ? OR start_time >= ?)
+    ORDER BY date, start_time, id LIMIT ?
+"""
+
+UPCOMING_RULES_SQL = """
+    SELECT id, title, category_id, date, start_time, end_time, is_recurring, rrule
+    FROM events WHERE user_id=? AND is_recurring=1 AND rr_end >= ?
+    ORDER BY rr_start
+"""
+
+@timed("expand.next_occurrences")
+@versioned_cache
+def next_occurrences(user_id: str, after: datetime, n: int) -> List[Occurrence]:
+    # Las n primeras ocurrencias con inicio >= after (se compara al minuto)
+    d, hhmm = after.date().isoformat(), after.strftime("%H:%M")
+    cats = {c["id"]: c for c in list_categories(user_id)}
+    path = db_path_for(user_id)
+    cache = _compiled_cache(path)
+    with db(user_id=user_id) as con:
+        pun = compile_rows(con.execute(UPCOMING_PUNCTUAL_SQL, (user_id, d, d, hhmm, n)).fetchall(), path)
+        # las reglas se compilan a medida que merge_upcoming avanza sobre el cursor
+        cur = con.execute(UPCOMING_RULES_SQL, (user_id, d))
+        try:
+            rules = (cache.get(r[0]) or compile_rows((r,), path)[0] for r in cur)
+            merged = merge_upcoming(heapq.merge(pun, rules, key=lambda ev: ev.lo), after, cats)
+            return list(itertools.islice(merged, n))
+        finally:
+            # El cursor queda a medio leer: cerrarlo termina la lectura. Si la
+            # conexión vuelve al pool con la instantánea abierta, su próximo
+            # BEGIN IMMEDIATE falla al instante con "database is locked".
+            cur.close()
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Ocurrencias materializadas (opcional)
+# ─────────────────────────────────────────────────────────────────────────────
+# Tabla occurrences(event_id, user_id, start, end) mantenida en cada escritura.
+# Las puntuales tienen siempre su fila; las reglas solo dentro de la ventana del
+# usuario [since, until] (hoy − OCC_PAST_DAYS … hoy + OCC_HORIZON_DAYS al crearla),
+# así una regla de años no genera miles de filas ni retiene el lock de escritura.
+# La ventana se extiende de forma perezosa hacia el lado que pida una lectura.
+def _occ_rows_for_rule(event_id: int, user_id: str, rr: Dict, lo: date, hi: date):
+    s_t, e_t = rr["start_time"], rr["end_time"]
+    return [(event_id, user_id, f"{d.isoformat()}T{s_t}", f"{d.isoformat()}T{e_t}")
+            for d in rule_dates(rr["days"], lo, hi)]
+
+def get_occ_window(con: sqlite3.Connection, user_id: str) -> Tuple[date, date]:
+    row = con.execute("SELECT since, until FROM occ_horizon WHERE user_id=?", (user_id,)).fetchone()
+    if row:
+        return date.fromisoformat(row[0]), date.fromisoformat(row[1])
+    since = date.today() - timedelta(days=OCC_PAST_DAYS)
+    until = date.today() + timedelta(days=OCC_HORIZON_DAYS)
+    con.execute("INSERT OR IGNORE INTO occ_horizon(user_id, since, until) VALUES (?, ?, ?)",
+                (user_id, since.isoformat(), until.isoformat()))
+    return since, until
+
+def materialize_punctual(con: sqlite3.Connection, event_id: int, user_id: str, d: str, s_t: str, e_t: str):
+    con.execute("INSERT INTO occurrences(event_id, user_id, start, end) VALUES (?, ?, ?, ?)",
+                (event_id, user_id, f"{d}T{s_t}", f"{d}T{e_t}"))
+
+def materialize_rule(con: sqlite3.Connection, event_id: int, user_id: str, rr: Dict):
+    since, until = get_occ_window(con, user_id)
+    lo = max(date.fromisoformat(rr["start_date"]), since)
+    hi = min(date.fromisoformat(rr["end_date"]), until)
+    con.executemany("INSERT INTO occurrences(event_id, user_id, start, end) VALUES (?, ?, ?, ?)",
+                    _occ_rows_for_rule(event_id, user_id, rr, lo, hi))
+
+def _materialize_rules_between(con: sqlite3.Connection, user_id: str, lo: date, hi: date):
+    # Reglas que tocan [lo, hi] (idx_events_user_rr), solo los días de ese tramo
+    rows = con.execute("""
+        SELECT id, rrule FROM events
+        WHERE user_id=? AND is_recurring=1 AND rr_start <= ? AND rr_end >= ?
+    """, (user_id, hi.isoformat(), lo.isoformat())).fetchall()
+    for event_id, rr_json in rows:
+        rr = json.loads(rr_json)
+        con.executemany("INSERT INTO occurrences(event_id, user_id, start, end) VALUES (?, ?, ?, ?)",
+                        _occ_rows_for_rule(event_id, user_id, rr, max(date.fromisoformat(rr["start_date"]), lo),
+                                           min(date.fromisoformat(rr["end_date"]), hi)))
+
+@timed("db.extend_occ_window")
+def extend_occ_window(user_id: str, start_d: date, end_d: date):
+    # Amplía la ventana materializada hasta cubrir [start_d, end_d], de a
+    # OCC_EXTEND_STEP_DAYS por transacción: un salto de años no retiene el lock
+    # de escritura todo junto y la ventana queda contigua después de cada paso.
+    step = timedelta(days=OCC_EXTEND_STEP_DAYS)
+    while True:
+        with db(write=True, user_id=user_id) as con:
+            since, until = get_occ_window(con, user_id)
+            if start_d < since:
+                lo = max(start_d, since - step)
+                _materialize_rules_between(con, user_id, lo, since - timedelta(days=1))
+                since = lo
+            elif end_d > until:
+                hi = min(end_d, until + step)
+                _materialize_rules_between(con, user_id, until + timedelta(days=1), hi)
+                until = hi
+            else:
+                return
+            con.execute("UPDATE occ_horizon SET since=?, until=? WHERE user_id=?",
+                        (since.isoformat(), until.isoformat(), user_id))
+
+def _rebuild_occurrences(con: sqlite3.Connection, user_id: Optional[str] = None) -> int:
+    where, params = ("WHERE user_id=?", (user_id,)) if user_id else ("", ())
+    con.execute(f"DELETE FROM occurrences {where}", params)
+    con.execute(f"DELETE FROM occ_horizon {where}", params)
+    rows = con.execute(f"""
+        SELECT id, user_id, date, start_time, end_time, is_recurring, rrule FROM events {where}
+    """, params).fetchall()
+    for event_id, uid, d, s_t, e_t, is_rec, rr_json in rows:
+        if is_rec:
+            materialize_rule(con, event_id, uid, json.loads(rr_json))
+        elif d:
+            materialize_punctual(con, event_id, uid, d, s_t, e_t)
+    return con.execute(f"SELECT COUNT(*) FROM occurrences {where}", params).fetchone()[0]
+
+@timed("db.rebuild_occurrences")
+def rebuild_occurrences(user_id: Optional[str] = None) -> int:
+    # Regenera la tabla desde events (todos los usuarios, de todas las bases, si user_id es None)
+    if user_id:
+        with db(write=True, user_id=user_id) as con:
+            n = _rebuild_occurrences(con, user_id)
+            bump_data_version(con, user_id)
+        return n
+    n = 0
+    for path in all_db_paths():
+        with db(write=True, path=path) as con:
+            n += _rebuild_occurrences(con)
+    get_occ_cache().clear()
+    clear_compiled_cache()
+    return n
@@ -0,0 +1,38 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import calendario as cal  # noqa: E402
+
+@pytest.fixture
+def planner(tmp_path):
+    # planner.db temporal de base única. Los cachés ya llevan la ruta en la clave;
+    # se vacían igual para que cada prueba arranque en frío.
+    old_path = cal.get_db_path()
+    cal.configure(str(tmp_path / "planner.db"), shard_dir="")
+    cal.get_occ_cache().clear()
+    cal.get_figure_cache().clear()
+    cal.clear_compiled_cache()
+    cal.init_db()
+    yield cal
+    cal.get_pool().close()
+    cal.configure(old_path)
+
+@pytest.fixture
+def shard_planner(tmp_path):
+    # Particiones en tmp_path/shards; la prueba elige los baldes con configure()
+    old_path = cal.get_db_path()
+    def setup(buckets: int):
+        cal.configure(str(tmp_path / "planner.db"), shard_dir=str(tmp_path / "shards"), shard_buckets=buckets)
+        cal.get_occ_cache().clear()
+        cal.get_figure_cache().clear()
+        cal.clear_compiled_cache()
+        cal.init_db()
+        return cal
+    yield setup
+    for path in cal.all_db_paths():
+        cal.get_pool(path).close()
+    cal.configure(old_path, shard_dir="", shard_buckets=16)
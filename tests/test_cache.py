@@ -0,0 +1,47 @@
+# Caché por versión de datos: una escritura invalida, y dos bases con el mismo
+# usuario y la misma versión no comparten entradas.
+
+from datetime import date, time
+
+import calendario as cal
+
+WEEK = (date(2025, 1, 6), date(2025, 1, 12))
+
+def titles(user_id: str):
+    return sorted(cal.expand_events_frame(user_id, *WEEK)["title"])
+
+def test_write_bumps_version_and_next_read_misses(planner):
+    planner.ensure_user("ana")
+    planner.add_event_punctual("ana", "primera", None, date(2025, 1, 7), time(9), time(10))
+    cache = planner.get_occ_cache()
+    v0 = planner.get_data_version("ana")
+    assert titles("ana") == ["primera"]
+    assert titles("ana") == ["primera"]
+    before = cache.stats()
+
+    planner.add_event_punctual("ana", "segunda", None, date(2025, 1, 8), time(9), time(10))
+    assert planner.get_data_version("ana") == v0 + 1
+    assert titles("ana") == ["primera", "segunda"]
+    after = cache.stats()
+    assert (after["misses"] - before["misses"], after["hits"] - before["hits"]) == (1, 0)
+    assert titles("ana") == ["primera", "segunda"]
+    assert cache.stats()["hits"] == after["hits"] + 1
+
+def test_other_database_with_same_version_misses(planner, tmp_path):
+    # mismo usuario, misma versión (1) en las dos bases: sin la ruta en la clave
+    # la segunda devolvería lo calculado para la primera
+    planner.ensure_user("ana")
+    planner.add_event_punctual("ana", "en a", None, date(2025, 1, 7), time(9), time(10))
+    assert titles("ana") == ["en a"]
+    first = planner.get_db_path()
+    planner.configure(str(tmp_path / "otra.db"), shard_dir="")
+    try:
+        planner.init_db()
+        planner.ensure_user("ana")
+        planner.add_event_punctual("ana", "en b", None, date(2025, 1, 8), time(9), time(10))
+        assert planner.get_data_version("ana") == 1
+        assert titles("ana") == ["en b"]
+        planner.get_pool().close()
+    finally:
+        planner.configure(first, shard_dir="")
+    assert titles("ana") == ["en a"]
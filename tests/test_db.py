@@ -0,0 +1,68 @@
+# Pool de conexiones y particiones
+
+import os
+import importlib
+from datetime import date, time
+
+import pytest
+
+dbmod = importlib.import_module("calendario.db")   # `calendario.db` como atributo es la función db()
+
+def open_files(prefix: str) -> int:
+    fds = "/proc/self/fd"
+    return sum(1 for fd in os.listdir(fds) if os.path.realpath(os.path.join(fds, fd)).startswith(prefix))
+
+def test_per_user_pools_are_bounded(shard_planner, monkeypatch, tmp_path):
+    monkeypatch.setattr(dbmod, "POOL_MAX_OPEN", 4)
+    cal = shard_planner(0)   # un archivo por usuario
+    users = [f"usuaria{i}" for i in range(20)]
+    for u in users:
+        cal.ensure_user(u)
+        cal.add_event_punctual(u, f"cita {u}", None, date(2025, 1, 6), time(9), time(10))
+        assert cal.open_pool_count() <= 4
+    if os.path.isdir("/proc/self/fd"):
+        assert open_files(str(tmp_path / "shards")) <= 4 * 3   # db, -wal y -shm por pool abierto
+    # los desalojados se vuelven a abrir al usarse, con sus datos
+    for u in users:
+        assert [e["title"] for e in cal.list_events_raw(u)] == [f"cita {u}"]
+
+def test_connection_released_to_closed_pool_is_closed(tmp_path):
+    pool = dbmod.ConnectionPool(str(tmp_path / "x.db"))
+    con = pool.acquire()
+    pool.close()
+    late = pool.acquire()   # obtenido justo antes del desalojo: sigue funcionando
+    late.execute("SELECT 1")
+    pool.release(con)
+    pool.release(late)
+    assert pool.in_use == 0 and pool._idle.empty()
+
+def test_split_database_reads_back_through_router(planner, shard_planner, tmp_path):
+    from calendario.maintenance import split_database
+    users = [f"usuaria{i}" for i in range(12)]
+    for i, u in enumerate(users):
+        planner.ensure_user(u)
+        planner.add_event_punctual(u, f"cita {u}", None, date(2025, 1, 6 + i % 5), time(9), time(10))
+        planner.add_event_recurring(u, f"clase {u}", None, date(2025, 1, 6), date(2025, 3, 1), [i % 7],
+                                    time(18), time(19))
+    before = {u: planner.list_events_raw(u) for u in users}
+    planner.get_pool().close()
+    shards = tmp_path / "shards"
+    report = split_database(str(tmp_path / "planner.db"), str(shards), 4, jobs=1)
+    assert report["users"] == len(users) and not report["missing"]
+    assert dbmod.read_shard_buckets(str(shards)) == 4
+
+    cal = shard_planner(4)
+    for u in users:
+        assert cal.db_path_for(u) == str(shards / dbmod.shard_name(u, 4))
+        assert cal.list_events_raw(u) == before[u]
+
+    # Con otra cantidad de baldes no se abre nada ni se crean particiones vacías
+    files = sorted(os.listdir(shards))
+    for buckets in (8, 0):
+        with pytest.raises(ValueError, match="baldes"):
+            shard_planner(buckets)
+        for u in users:
+            with pytest.raises(ValueError, match="baldes"):
+                cal.list_events_raw(u)
+        assert sorted(os.listdir(shards)) == files
+    shard_planner(4)
@@ -0,0 +1,206 @@
+# Importación / exportación ICS y CSV contra una planner.db temporal
+
+import io
+import random
+import sqlite3
+from datetime import date, time, timedelta
+
+import pytest
+
+from calendario import first_rule_date, last_rule_date
+from calendario.interchange import IMPORT_OPEN_RULE_DAYS
+
+def vcalendar(*vevents: str) -> io.StringIO:
+    body = "".join(f"BEGIN:VEVENT\r\n{v}END:VEVENT\r\n" for v in vevents)
+    return io.StringIO(f"BEGIN:VCALENDAR\r\nVERSION:2.0\r\n{body}END:VCALENDAR\r\n")
+
+def definitions(planner, user_id: str):
+    # Forma comparable de cada definición: las reglas por su primera y última
+    # fecha real (ICS exporta DTSTART en el primer día que coincide)
+    names = {c["id"]: c["name"] for c in planner.list_categories(user_id)}
+    out = []
+    for e in planner.list_events_raw(user_id):
+        cat = names.get(e["category_id"], "")
+        if e["is_recurring"]:
+            rr = e["rrule"]
+            lo, hi = date.fromisoformat(rr["start_date"]), date.fromisoformat(rr["end_date"])
+            out.append(("R", e["title"], cat, tuple(sorted(rr["days"])), first_rule_date(rr["days"], lo, hi),
+                        last_rule_date(rr["days"], lo, hi), rr["start_time"], rr["end_time"]))
+        else:
+            out.append(("P", e["title"], cat, e["date"], e["start_time"], e["end_time"]))
+    return sorted(out)
+
+def seed_export_user(planner, rng: random.Random, user_id: str = "origen"):
+    planner.ensure_user(user_id)
+    planner.upsert_category(user_id, "Trabajo", "#123456")
+    planner.upsert_category(user_id, "Café, té; y más", "#654321")
+    cat_ids = [c["id"] for c in planner.list_categories(user_id)] + [None]
+    titles = ["Reunión", "Gimnasio, pesas; piernas", "Línea\nlarga " + "ñ" * 60, "Clase\\barra"]
+    rows = []
+    for i in range(40):
+        s = time(rng.randrange(6, 20), rng.choice((0, 15, 30, 45)))
+        e = time(s.hour + rng.randint(1, 3), s.minute)
+        row = {"title": f"{rng.choice(titles)} {i}", "category_id": rng.choice(cat_ids), "start": s, "end": e}
+        d = date(2025, 1, 6) + timedelta(days=rng.randrange(200))
+        if rng.random() < 0.5:
+            row["date"] = d
+        else:
+            row.update({"days": sorted(rng.sample(range(7), rng.randint(1, 4))), "start_date": d,
+                        "end_date": d + timedelta(days=rng.randrange(7, 120))})
+        rows.append(row)
+    planner.add_events_bulk(user_id, rows)
+    return user_id
+
+def export(planner, user_id: str, fmt: str) -> io.StringIO:
+    gen = planner.iter_ics(user_id) if fmt == "ics" else planner.iter_csv(user_id)
+    return io.StringIO("".join(gen), newline="")
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Ida y vuelta
+# ─────────────────────────────────────────────────────────────────────────────
+@pytest.mark.parametrize("fmt", ["ics", "csv"])
+def test_export_import_round_trip(planner, fmt):
+    src = seed_export_user(planner, random.Random(7))
+    planner.ensure_user("destino")
+    stats = planner.import_calendar("destino", export(planner, src, fmt), fmt)
+    assert (stats["read"], stats["inserted"], stats["duplicates"], stats["skipped"]) == (40, 40, 0, 0)
+    assert definitions(planner, "destino") == definitions(planner, src)
+
+@pytest.mark.parametrize("fmt", ["ics", "csv"])
+def test_reimport_into_same_user_is_all_duplicates(planner, fmt):
+    src = seed_export_user(planner, random.Random(8))
+    before = definitions(planner, src)
+    stats = planner.import_calendar(src, export(planner, src, fmt), fmt)
+    assert (stats["inserted"], stats["duplicates"]) == (0, 40)
+    assert definitions(planner, src) == before
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Duplicados por huella
+# ─────────────────────────────────────────────────────────────────────────────
+@pytest.mark.parametrize("batch_size", [1, 2, 100])
+def test_duplicates_within_and_across_batches(planner, batch_size):
+    planner.ensure_user("ana")
+    gym = "SUMMARY:Gimnasio\r\nDTSTART:20250106T180000\r\nDTEND:20250106T190000\r\n"
+    other = "SUMMARY:Otra\r\nDTSTART:20250107T180000\r\nDTEND:20250107T190000\r\n"
+    # la misma regla escrita de otra forma (COUNT en vez de UNTIL, otra categoría) es la misma huella
+    rule_a = ("SUMMARY:Clase\r\nDTSTART:20250106T090000\r\nDTEND:20250106T100000\r\n"
+              "RRULE:FREQ=WEEKLY;BYDAY=MO,WE;UNTIL=20250129\r\n")
+    rule_b = ("SUMMARY:Clase\r\nCATEGORIES:Estudio\r\nDTSTART:20250106T090000\r\nDTEND:20250106T100000\r\n"
+              "RRULE:FREQ=WEEKLY;BYDAY=MO,WE;COUNT=8\r\n")
+    stats = planner.import_calendar("ana", vcalendar(gym, gym, other, rule_a, gym, rule_b), "ics",
+                                    batch_size=batch_size)
+    assert (stats["read"], stats["inserted"], stats["duplicates"], stats["skipped"]) == (6, 3, 3, 0)
+    again = planner.import_calendar("ana", vcalendar(other, rule_b), "ics", batch_size=batch_size)
+    assert (again["inserted"], again["duplicates"]) == (0, 2)
+    assert sorted(e["title"] for e in planner.list_events_raw("ana")) == ["Clase", "Gimnasio", "Otra"]
+
+# ─────────────────────────────────────────────────────────────────────────────
+# UNTIL / COUNT / DURATION
+# ─────────────────────────────────────────────────────────────────────────────
+def imported_rule(planner, vevent: str):
+    planner.ensure_user("ana")
+    stats = planner.import_calendar("ana", vcalendar(vevent), "ics")
+    assert stats["inserted"] == 1, stats
+    (ev,) = planner.list_events_raw("ana")
+    return ev
+
+@pytest.mark.parametrize("rrule, days, end_date", [
+    ("FREQ=WEEKLY;BYDAY=MO,WE;UNTIL=20250129T235900", [0, 2], "2025-01-29"),
+    ("FREQ=WEEKLY;BYDAY=MO,WE;UNTIL=20250129", [0, 2], "2025-01-29"),
+    ("FREQ=WEEKLY;BYDAY=MO,WE;COUNT=5", [0, 2], "2025-01-20"),
+    ("FREQ=WEEKLY;BYDAY=WE,MO;COUNT=1", [0, 2], "2025-01-06"),
+    ("FREQ=WEEKLY;BYDAY=TU,SU;COUNT=3", [1, 6], "2025-01-14"),
+    ("FREQ=WEEKLY;COUNT=3", [0], "2025-01-20"),
+    ("FREQ=DAILY;COUNT=10", list(range(7)), "2025-01-15"),
+])
+def test_until_and_count(planner, rrule, days, end_date):
+    ev = imported_rule(planner, f"SUMMARY:R\r\nDTSTART:20250106T090000\r\nDTEND:20250106T100000\r\nRRULE:{rrule}\r\n")
+    rr = ev["rrule"]
+    assert (rr["days"], rr["start_date"], rr["end_date"]) == (days, "2025-01-06", end_date)
+
+def test_open_rule_lasts_import_open_rule_days(planner):
+    ev = imported_rule(planner, "SUMMARY:R\r\nDTSTART:20250106T090000\r\nDTEND:20250106T100000\r\n"
+                                "RRULE:FREQ=WEEKLY;BYDAY=MO\r\n")
+    end = date(2025, 1, 6) + timedelta(days=IMPORT_OPEN_RULE_DAYS)
+    assert ev["rrule"]["end_date"] == end.isoformat()
+
+@pytest.mark.parametrize("duration, end_time", [("PT45M", "09:45"), ("PT1H30M", "10:30"), ("PT2H", "11:00")])
+def test_duration_instead_of_dtend(planner, duration, end_time):
+    ev = imported_rule(planner, f"SUMMARY:D\r\nDTSTART:20250106T090000\r\nDURATION:{duration}\r\n")
+    assert (ev["date"], ev["start_time"], ev["end_time"]) == ("2025-01-06", "09:00", end_time)
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Filas inválidas: se omiten y se cuentan
+# ─────────────────────────────────────────────────────────────────────────────
+def test_malformed_vevents_are_skipped_and_counted(planner):
+    planner.ensure_user("ana")
+    ok = "DTSTART:20250106T090000\r\nDTEND:20250106T100000\r\n"
+    bad = [
+        "SUMMARY:a\r\nDTSTART:2025XX06T090000\r\nDTEND:20250106T100000\r\n",   # fecha ilegible
+        "SUMMARY:b\r\nDTSTART:20250106T09\r\nDTEND:20250106T100000\r\n",       # hora cortada
+        f"SUMMARY:c\r\n{ok}RRULE:FREQ=WEEKLY;INTERVAL=x\r\n",
+        f"SUMMARY:d\r\n{ok}RRULE:FREQ=WEEKLY;COUNT=abc\r\n",
+        f"SUMMARY:e\r\n{ok}RRULE:FREQ=WEEKLY;UNTIL=20250231\r\n",
+        f"SUMMARY:f\r\n{ok}RRULE:FREQ=WEEKLY;INTERVAL=2\r\n",                      # no soportada
+        "SUMMARY:g\r\nDTSTART;VALUE=DATE:20250106\r\n",                            # día completo
+        "SUMMARY:h\r\nDTSTART:20250106T230000\r\nDTEND:20250107T010000\r\n",     # cruza medianoche
+        "SUMMARY:i\r\nDTSTART:20250106T090000\r\n",                                # sin fin
+        "SUMMARY:j\r\nDTSTART:20250106T100000\r\nDTEND:20250106T090000\r\n",     # fin antes del inicio
+    ]
+    stats = planner.import_calendar("ana", vcalendar(*bad[:5], f"SUMMARY:bien\r\n{ok}", *bad[5:]), "ics")
+    assert (stats["read"], stats["inserted"], stats["duplicates"], stats["skipped"]) == (11, 1, 0, 10)
+    assert [e["title"] for e in planner.list_events_raw("ana")] == ["bien"]
+
+def test_malformed_csv_rows_are_skipped_and_counted(planner):
+    planner.ensure_user("ana")
+    header = ",".join(planner.CSV_COLUMNS)
+    lines = [header,
+             "1,bien,,puntual,2025-01-06,09:00,10:00,,,",
+             "2,hora mala,,puntual,2025-01-06,9h,10:00,,,",
+             "3,sin fecha,,puntual,,09:00,10:00,,,",
+             "4,dias malos,,recurrente,,09:00,10:00,lunes,2025-01-06,2025-02-01",
+             "5,dia 9,,recurrente,,09:00,10:00,0 9,2025-01-06,2025-02-01",
+             "6,rango al revés,,recurrente,,09:00,10:00,0,2025-02-06,2025-01-01",
+             "7,,,puntual,2025-01-06,09:00,10:00,,,",
+             "8,regla,Trabajo,recurrente,,09:00,10:00,0 2,2025-01-06,2025-02-01"]
+    stats = planner.import_calendar("ana", io.StringIO("\n".join(lines) + "\n"), "csv")
+    assert (stats["read"], stats["inserted"], stats["duplicates"], stats["skipped"]) == (8, 2, 0, 6)
+    assert sorted(e["title"] for e in planner.list_events_raw("ana")) == ["bien", "regla"]
+
+def test_huge_count_is_skipped_not_fatal(planner):
+    planner.ensure_user("ana")
+    fp = vcalendar("SUMMARY:Eterna\r\nDTSTART:20250106T090000\r\nDTEND:20250106T100000\r\n"
+                   "RRULE:FREQ=WEEKLY;BYDAY=MO;COUNT=2000000\r\n",
+                   "SUMMARY:Buena\r\nDTSTART:20250107T090000\r\nDTEND:20250107T100000\r\n")
+    stats = planner.import_calendar("ana", fp, "ics")
+    assert (stats["read"], stats["inserted"], stats["skipped"]) == (2, 1, 1)
+    assert [e["title"] for e in planner.list_events_raw("ana")] == ["Buena"]
+
+def test_export_stopped_halfway_leaves_connection_writable(planner, monkeypatch):
+    planner.ensure_user("ana")
+    planner.add_events_bulk("ana", [{"title": f"e{i}", "category_id": None, "date": date(2025, 1, 1) + timedelta(days=i),
+                                     "start": time(9), "end": time(10)} for i in range(200)])
+    pool, release, errors = planner.get_pool(), planner.get_pool().release, []
+
+    def checked_release(con):
+        # Cuando la conexión vuelve al pool, otro escritor avanza la base y esta
+        # conexión intenta escribir: con un cursor a medio leer falla al instante
+        other = sqlite3.connect(pool.path, isolation_level=None)
+        other.execute("INSERT OR IGNORE INTO users(id) VALUES ('otro')")
+        other.close()
+        try:
+            con.execute("BEGIN IMMEDIATE")
+            con.execute("ROLLBACK")
+        except sqlite3.OperationalError as e:
+            errors.append(str(e))
+        release(con)
+
+    monkeypatch.setattr(pool, "release", checked_release)
+    gen = planner.iter_event_definitions("ana")
+    for _ in range(5):
+        next(gen)
+    gen.close()
+    assert errors == []
+    monkeypatch.undo()
+    planner.add_event_punctual("ana", "después", None, date(2025, 9, 1), time(9), time(10))
+    assert len(planner.list_events_raw("ana")) == 201
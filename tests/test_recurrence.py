@@ -0,0 +1,167 @@
+# Reglas al azar contra un expansor de referencia que recorre los días uno por
+# uno: las formas compiladas (ordinales, next_start), la expansión por rango (lista
+# y DataFrame), next_occurrences, find_conflicts y la carga diaria tienen que
+# dar lo mismo.
+
+import random
+from datetime import date, time, datetime, timedelta
+
+import pandas as pd
+import pytest
+
+from calendario import (rule_dates, compiled_ordinals, days_to_mask, compile_event_row, next_start,
+                        first_rule_date, last_rule_date)
+
+BASE = date(2025, 1, 6)
+SEEDS = range(6)
+
+def random_days(rng: random.Random):
+    return sorted(rng.sample(range(7), rng.randint(1, 7)))
+
+def random_hours(rng: random.Random):
+    s = rng.randrange(6 * 4, 21 * 4) * 15
+    e = s + rng.choice((15, 30, 60, 90, 120))
+    return time(s // 60, s % 60), time(min(e, 23 * 60 + 59) // 60, min(e, 23 * 60 + 59) % 60)
+
+def random_row(rng: random.Random, title: str):
+    s, e = random_hours(rng)
+    if rng.random() < 0.5:
+        return {"title": title, "category_id": None, "date": BASE + timedelta(days=rng.randrange(120)),
+                "start": s, "end": e}
+    lo = BASE + timedelta(days=rng.randrange(-30, 100))
+    return {"title": title, "category_id": None, "days": random_days(rng), "start_date": lo,
+            "end_date": lo + timedelta(days=rng.randrange(0, 90)), "start": s, "end": e}
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Referencia: día por día, sin saltos por semana ni máscaras
+# ─────────────────────────────────────────────────────────────────────────────
+def ref_dates(row, lo: date, hi: date):
+    if "days" not in row:
+        return [row["date"]] if lo <= row["date"] <= hi else []
+    out, d = [], max(lo, row["start_date"])
+    while d <= min(hi, row["end_date"]):
+        if d.weekday() in row["days"]:
+            out.append(d)
+        d += timedelta(days=1)
+    return out
+
+def ref_occurrences(rows, ids, lo: date, hi: date):
+    out = [(datetime.combine(d, r["start"]), ev_id, datetime.combine(d, r["end"]))
+           for ev_id, r in zip(ids, rows) for d in ref_dates(r, lo, hi)]
+    return sorted(out)
+
+def seeded(planner, rng: random.Random, n: int):
+    user_id = f"u{rng.randrange(10 ** 6)}"
+    planner.ensure_user(user_id)
+    rows = [random_row(rng, f"e{i}") for i in range(n)]
+    return user_id, rows, planner.add_events_bulk(user_id, rows)
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Formas compiladas (sin base)
+# ─────────────────────────────────────────────────────────────────────────────
+@pytest.mark.parametrize("seed", SEEDS)
+def test_compiled_ordinals_match_rule_dates(seed):
+    rng = random.Random(seed)
+    for _ in range(300):
+        days = random_days(rng)
+        lo = BASE + timedelta(days=rng.randrange(-400, 400))
+        hi = lo + timedelta(days=rng.randrange(-3, 120))
+        expected = [d.toordinal() for d in ref_dates({"days": days, "start_date": lo, "end_date": hi}, lo, hi)]
+        assert sorted(compiled_ordinals(days_to_mask(days), lo.toordinal(), hi.toordinal())) == expected
+        assert sorted(d.toordinal() for d in rule_dates(days, lo, hi)) == expected
+        assert first_rule_date(days, lo, hi) == (date.fromordinal(expected[0]) if expected else None)
+        assert last_rule_date(days, lo, hi) == (date.fromordinal(expected[-1]) if expected else None)
+
+@pytest.mark.parametrize("seed", SEEDS)
+def test_next_start_matches_reference(seed):
+    rng = random.Random(seed)
+    for i in range(300):
+        row = random_row(rng, "x")
+        if "days" in row:
+            rr = ('{"days": %s, "start_date": "%s", "end_date": "%s", "start_time": "%s", "end_time": "%s"}'
+                  % (row["days"], row["start_date"], row["end_date"], row["start"].strftime("%H:%M"),
+                     row["end"].strftime("%H:%M")))
+            ev = compile_event_row((i, "x", None, None, None, None, 1, rr))
+        else:
+            ev = compile_event_row((i, "x", None, row["date"].isoformat(), row["start"].strftime("%H:%M"),
+                                    row["end"].strftime("%H:%M"), 0, None))
+        after = datetime.combine(BASE + timedelta(days=rng.randrange(-40, 130)), time(rng.randrange(24),
+                                                                                      rng.randrange(60)))
+        starts = [datetime.combine(d, row["start"]) for d in ref_dates(row, date.min, date.max)]
+        assert next_start(ev, after) == next((s for s in starts if s > after), None)
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Contra la base
+# ─────────────────────────────────────────────────────────────────────────────
+@pytest.mark.parametrize("seed", SEEDS)
+def test_expand_matches_reference(planner, seed):
+    rng = random.Random(seed)
+    user_id, rows, ids = seeded(planner, rng, 60)
+    for _ in range(20):
+        lo = BASE + timedelta(days=rng.randrange(-40, 130))
+        hi = lo + timedelta(days=rng.randrange(0, 45))
+        expected = ref_occurrences(rows, ids, lo, hi)
+        got = [(o.start, o.id, o.end) for o in planner.expand_events_for_range(user_id, lo, hi)]
+        assert sorted(got) == expected
+        # versión columnar (numpy): mismas ocurrencias, ya ordenadas por inicio
+        df = planner.expand_events_frame(user_id, lo, hi)
+        got = list(zip(df["start"].dt.to_pydatetime(), df["id"].tolist(), df["end"].dt.to_pydatetime()))
+        assert sorted(got) == expected
+        assert list(df["start"]) == sorted(df["start"])
+
+@pytest.mark.parametrize("seed", SEEDS)
+def test_next_occurrences_match_full_expansion(planner, seed):
+    rng = random.Random(seed)
+    user_id, rows, ids = seeded(planner, rng, 60)
+    everything = ref_occurrences(rows, ids, date(2024, 1, 1), date(2026, 1, 1))
+    for _ in range(25):
+        after = datetime.combine(BASE + timedelta(days=rng.randrange(-45, 200)),
+                                 time(rng.randrange(24), rng.randrange(60), rng.randrange(60)))
+        n = rng.choice((1, 5, 8, 40))
+        cut = after.replace(second=0, microsecond=0)
+        expected = [o for o in everything if o[0] >= cut][:n]
+        got = [(o.start, o.id, o.end) for o in planner.next_occurrences(user_id, after, n)]
+        assert got == expected
+
+@pytest.mark.parametrize("seed", SEEDS)
+def test_find_conflicts_match_expansion(planner, seed):
+    rng = random.Random(seed)
+    # muchas puntuales: las reglas largas recorren el índice por fecha y las cortas por ordinal
+    user_id, rows, ids = seeded(planner, rng, 120)
+    for _ in range(30):
+        new = random_row(rng, "nuevo")
+        new_dates = set(ref_dates(new, date.min, date.max))
+        expected = []
+        for ev_id, r in zip(ids, rows):
+            if not (r["start"] < new["end"] and r["end"] > new["start"]):
+                continue
+            common = sorted(new_dates.intersection(ref_dates(r, date.min, date.max)))
+            if common:
+                expected.append((ev_id, common[0], len(common)))
+        got = [(c["id"], c["date"], c["count"]) for c in planner.find_conflicts(user_id, new)]
+        assert sorted(got) == sorted(expected)
+
+@pytest.mark.parametrize("seed", SEEDS)
+def test_daily_load_matches_expansion(planner, seed):
+    # (día, categoría) -> (cantidad, minutos) sin generar ocurrencias, contra
+    # la suma sobre la expansión; con categorías y sin categoría mezcladas
+    rng = random.Random(seed)
+    user_id = f"u{rng.randrange(10 ** 6)}"
+    planner.ensure_user(user_id)
+    for name in ("trabajo", "salud", "ocio"):
+        planner.upsert_category(user_id, name, "#888888")
+    cat_ids = [c["id"] for c in planner.list_categories(user_id)] + [None]
+    rows = [dict(random_row(rng, f"e{i}"), category_id=rng.choice(cat_ids)) for i in range(80)]
+    planner.add_events_bulk(user_id, rows)
+    for _ in range(15):
+        lo = BASE + timedelta(days=rng.randrange(-40, 130))
+        hi = lo + timedelta(days=rng.randrange(0, 120))
+        expected = {}
+        for o in planner.expand_events_for_range(user_id, lo, hi):
+            key = (o.start.date(), o.category["id"] if o.category else None)
+            n, m = expected.get(key, (0, 0))
+            expected[key] = (n + 1, m + int((o.end - o.start).total_seconds()) // 60)
+        df = planner.daily_load_range(user_id, lo, hi)
+        got = {(d.date(), None if c is pd.NA else c): (n, m)
+               for d, c, n, m in zip(df["date"], df["category_id"], df["count"], df["minutes"])}
+        assert got == expected
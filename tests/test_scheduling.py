@@ -0,0 +1,75 @@
+# FreeBusy contra la búsqueda lineal que reemplazó (find_slot_in_day de antes:
+# ordenar los bloques que tocan la ventana y avanzar un cursor), y el plan por
+# lotes con only_next.
+
+import random
+from datetime import date, time, datetime, timedelta
+
+import pytest
+
+from calendario import FreeBusy
+from calendario.recurrence import overlaps, minutes_between
+
+DAY = datetime(2025, 1, 6)
+SEEDS = range(6)
+
+def ref_slot(busy, win_s, win_e, duration_min):
+    busy_sorted = sorted([b for b in busy if overlaps(b[0], b[1], win_s, win_e)], key=lambda x: x[0])
+    cursor = win_s
+    for (b_s, b_e) in busy_sorted:
+        if cursor < b_s and minutes_between(cursor, b_s) >= duration_min:
+            return cursor, cursor + timedelta(minutes=duration_min)
+        cursor = max(cursor, b_e)
+    if minutes_between(cursor, win_e) >= duration_min:
+        return cursor, cursor + timedelta(minutes=duration_min)
+    return None
+
+def ref_is_free(busy, s, e):
+    return not any(b_s < b_e and overlaps(b_s, b_e, s, e) for b_s, b_e in busy)
+
+def random_span(rng: random.Random, max_len: int = 180):
+    # minutos enteros; a veces vacío o invertido (FreeBusy los ignora)
+    s = DAY + timedelta(minutes=rng.randrange(0, 24 * 60, rng.choice((1, 5, 15))))
+    return s, s + timedelta(minutes=rng.randrange(-15, max_len))
+
+@pytest.mark.parametrize("seed", SEEDS)
+def test_freebusy_matches_linear_scan(seed):
+    rng = random.Random(seed)
+    for _ in range(500):
+        busy = [random_span(rng) for _ in range(rng.randrange(0, 14))]
+        if rng.random() < 0.5:
+            fb = FreeBusy(busy)
+        else:
+            fb = FreeBusy()
+            for s, e in busy:
+                fb.add(s, e)
+        assert all(s < e for s, e in zip(fb.starts, fb.ends))
+        assert all(e < s for e, s in zip(fb.ends, fb.starts[1:]))
+        valid = [(s, e) for s, e in busy if s < e]
+        for _ in range(4):
+            win_s, win_e = random_span(rng, 16 * 60)
+            dur = rng.choice((5, 15, 30, 45, 60, 90, 120))
+            got = fb.first_gap(win_s, win_e, dur)
+            assert got == ref_slot(valid, win_s, win_e, dur)
+            if got:
+                assert fb.is_free(*got)
+            s, e = random_span(rng)
+            if s < e:
+                assert fb.is_free(s, e) == ref_is_free(busy, s, e)
+
+def test_plan_batch_only_next(planner):
+    planner.ensure_user("ana")
+    wk0 = date(2025, 1, 6)
+    planner.add_event_recurring("ana", "trabajo", None, wk0, wk0 + timedelta(days=27), [0, 1, 2, 3, 4],
+                                time(9), time(17))
+    acts = [{"title": "correr", "category_id": None, "duration_min": 60, "days": [0, 2, 4],
+             "win_start": time(7), "win_end": time(20), "per_week": 2},
+            {"title": "leer", "category_id": None, "duration_min": 90, "days": [],
+             "win_start": time(8), "win_end": time(23), "per_week": 3}]
+    full = planner.plan_batch("ana", acts, wk0, 4, True, False)
+    assert len(full) == 4 * (2 + 3)
+    first = planner.plan_batch("ana", acts, wk0, 4, True, False, only_next=True)
+    assert first == full[:1]
+    assert first[0]["start"] == min(p["start"] for p in full)
+    # el recorte no toca el plan completo guardado en caché
+    assert planner.plan_batch("ana", acts, wk0, 4, True, False) == full
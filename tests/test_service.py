@@ -0,0 +1,71 @@
+# next_gap del servicio contra una búsqueda minuto a minuto sobre la expansión
+
+import random
+from datetime import date, time, datetime, timedelta
+
+import calendario as cal
+
+BASE = date(2025, 1, 6)
+
+def seed_user(planner, rng: random.Random, user_id: str, n: int):
+    planner.ensure_user(user_id)
+    rows = []
+    for i in range(n):
+        s = rng.randrange(6 * 4, 21 * 4) * 15
+        e = min(s + rng.choice((30, 60, 90, 120, 240)), 23 * 60 + 59)
+        row = {"title": f"e{i}", "category_id": None, "start": time(s // 60, s % 60), "end": time(e // 60, e % 60)}
+        if rng.random() < 0.6:
+            row["date"] = BASE + timedelta(days=rng.randrange(40))
+        else:
+            lo = BASE + timedelta(days=rng.randrange(-10, 30))
+            row.update(days=sorted(rng.sample(range(7), rng.randint(1, 5))), start_date=lo,
+                       end_date=lo + timedelta(days=rng.randrange(60)))
+        rows.append(row)
+    planner.add_events_bulk(user_id, rows)
+
+def ref_next_gap(occs, after, duration_min, win_start, win_end, days, horizon_days):
+    busy = {}
+    for o in occs:
+        day = busy.setdefault(o.start.date(), set())
+        day.update(range(o.start.hour * 60 + o.start.minute, o.end.hour * 60 + o.end.minute))
+    for k in range(horizon_days + 1):
+        d = after.date() + timedelta(days=k)
+        if days and d.weekday() not in days:
+            continue
+        lo = win_start.hour * 60 + win_start.minute
+        if d == after.date():
+            lo = max(lo, after.hour * 60 + after.minute)
+        run = 0
+        for m in range(lo, win_end.hour * 60 + win_end.minute):
+            run = 0 if m in busy.get(d, ()) else run + 1
+            if run == duration_min:
+                start = datetime.combine(d, time()) + timedelta(minutes=m - duration_min + 1)
+                return start, start + timedelta(minutes=duration_min)
+    return None
+
+def test_next_gap_matches_minute_scan(planner):
+    rng = random.Random(7)
+    users = [f"u{i}" for i in range(4)]
+    for i, u in enumerate(users):
+        seed_user(planner, rng, u, 30 * (i + 1))
+    occs = {u: planner.expand_events_for_range(u, BASE - timedelta(days=7), BASE + timedelta(days=70)) for u in users}
+    found = 0
+    for _ in range(200):
+        u = rng.choice(users)
+        after = datetime.combine(BASE + timedelta(days=rng.randrange(-3, 40)),
+                                 time(rng.randrange(24), rng.randrange(0, 60, 5)))
+        dur = rng.choice((15, 30, 60, 90, 180, 300))
+        ws = rng.randrange(5 * 60, 12 * 60, 15)
+        we = min(ws + rng.randrange(60, 14 * 60, 15), 23 * 60 + 45)
+        win_start, win_end = time(ws // 60, ws % 60), time(we // 60, we % 60)
+        days = tuple(sorted(rng.sample(range(7), rng.randint(1, 7)))) if rng.random() < 0.5 else ()
+        horizon = rng.choice((0, 1, 3, 7, 20))
+        got = cal.next_gap(u, after, dur, win_start, win_end, days, horizon)
+        ref = ref_next_gap(occs[u], after, dur, win_start, win_end, days, horizon)
+        if ref:
+            found += 1
+            assert (got["start"], got["end"]) == (ref[0].isoformat(timespec="minutes"),
+                                                  ref[1].isoformat(timespec="minutes"))
+        else:
+            assert (got["start"], got["end"]) == (None, None)
+    assert 50 < found < 200   # hay casos con y sin hueco
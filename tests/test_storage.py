@@ -0,0 +1,84 @@
+# Escrituras: ventana materializada de ocurrencias (opcional) e ids de add_events_bulk
+
+import importlib
+from datetime import date, time, timedelta
+
+import pytest
+
+from calendario import rule_dates
+
+storage = importlib.import_module("calendario.storage")
+
+TODAY = date.today()
+
+@pytest.fixture
+def materialized(planner, monkeypatch):
+    monkeypatch.setattr(storage, "MATERIALIZE_OCCURRENCES", True)
+    monkeypatch.setattr(storage, "OCC_EXTEND_STEP_DAYS", 30)
+    return planner
+
+def window(cal, user_id):
+    with cal.db(user_id=user_id) as con:
+        since, until = con.execute("SELECT since, until FROM occ_horizon WHERE user_id=?", (user_id,)).fetchone()
+    return date.fromisoformat(since), date.fromisoformat(until)
+
+def materialized_starts(cal, user_id, event_id):
+    with cal.db(user_id=user_id) as con:
+        return [r[0] for r in con.execute("SELECT start FROM occurrences WHERE user_id=? AND event_id=? ORDER BY start",
+                                          (user_id, event_id))]
+
+def expected_starts(days, lo, hi, start="18:00"):
+    return sorted(f"{d.isoformat()}T{start}" for d in rule_dates(days, lo, hi))
+
+def test_materialized_window_extends_and_trims_on_delete(materialized):
+    cal = materialized
+    cal.ensure_user("ana")
+    r_lo, r_hi = TODAY - timedelta(days=700), TODAY + timedelta(days=900)
+    rule = cal.add_event_recurring("ana", "clase", None, r_lo, r_hi, [0, 3], time(18), time(19))
+    far = cal.add_event_punctual("ana", "viaje", None, TODAY + timedelta(days=600), time(8), time(9))
+    since, until = window(cal, "ana")
+    assert (since, until) == (TODAY - timedelta(days=storage.OCC_PAST_DAYS),
+                              TODAY + timedelta(days=storage.OCC_HORIZON_DAYS))
+    assert materialized_starts(cal, "ana", rule) == expected_starts([0, 3], since, until)
+    assert len(materialized_starts(cal, "ana", far)) == 1   # las puntuales, siempre
+
+    # leer más allá amplía la ventana de a pasos hasta cubrir el pedido, sin huecos ni duplicados
+    ahead = (TODAY + timedelta(days=590), TODAY + timedelta(days=610))
+    df = cal.list_occurrences_materialized("ana", *ahead)
+    assert window(cal, "ana") == (since, ahead[1])
+    assert materialized_starts(cal, "ana", rule) == expected_starts([0, 3], since, ahead[1])
+    expanded = cal.expand_events_frame.uncached("ana", *ahead)
+    assert df[["id", "start", "end"]].values.tolist() == expanded[["id", "start", "end"]].values.tolist()
+    assert far in set(df["id"])
+
+    behind = (TODAY - timedelta(days=200), TODAY - timedelta(days=190))
+    cal.list_occurrences_materialized("ana", *behind)
+    assert window(cal, "ana") == (behind[0], ahead[1])
+    assert materialized_starts(cal, "ana", rule) == expected_starts([0, 3], behind[0], ahead[1])
+
+    # borrar la regla quita todas sus filas; la puntual queda
+    cal.delete_event("ana", rule)
+    assert materialized_starts(cal, "ana", rule) == []
+    assert list(cal.list_occurrences_materialized("ana", *ahead)["id"]) == [far]
+    assert cal.occurrences_frame("ana", *ahead)["id"].tolist() == [far]
+
+def test_add_events_bulk_ids_match_rows(planner):
+    # ids de sqlite_sequence: uno por fila, en orden, aunque se borre el último
+    # evento o escriba otro usuario entre lotes
+    planner.ensure_user("ana"); planner.ensure_user("beto")
+    wk0 = date(2025, 1, 6)
+    def batch(prefix, n):
+        return [{"title": f"{prefix}{i}", "category_id": None, "start": time(9), "end": time(10),
+                 **({"days": [i % 7], "start_date": wk0, "end_date": wk0 + timedelta(days=30)} if i % 3 == 0
+                    else {"date": wk0 + timedelta(days=i)})} for i in range(n)]
+    first = planner.add_events_bulk("ana", batch("a", 7))
+    planner.delete_event("ana", first[-1])
+    other = planner.add_events_bulk("beto", batch("b", 3))
+    second = planner.add_events_bulk("ana", batch("c", 5))
+    assert planner.add_events_bulk("ana", []) == []
+    ids = first + other + second
+    assert ids == list(range(first[0], first[0] + 15))   # AUTOINCREMENT no reutiliza el borrado
+    expected = dict(zip(first + second, [f"a{i}" for i in range(7)] + [f"c{i}" for i in range(5)]))
+    del expected[first[-1]]
+    assert {e["id"]: e["title"] for e in planner.list_events_raw("ana")} == expected
+    assert {e["id"]: e["title"] for e in planner.list_events_raw("beto")} == dict(zip(other, ["b0", "b1", "b2"]))